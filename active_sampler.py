@@ -0,0 +1,223 @@
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+from scipy.stats import qmc
+
+from node_data import find_case_folders, case_peaks, node_data_path, tip_response
+
+# ==========================================
+# --- CONFIGURATION (ADAPTIVE DESIGN OF EXPERIMENTS) ---
+# ==========================================
+MIN_PRESSURE = 1          # Pa, same floor as the drivers
+MAX_PRESSURE = 100000     # Pa
+ROUND_TO = 500            # Pa, keeps folder names readable and cases re-usable
+
+INITIAL_SAMPLES = 12      # Space-filling LHS start, instead of 216 grid cases
+BATCH_SIZE = 4            # Cases proposed per round (one Mechanical session's worth)
+NUM_CANDIDATES = 4000     # Random candidates scored per round
+CURVATURE_WEIGHT = 0.5    # How much nonlinearity counts against raw uncertainty
+FAILURE_RADIUS = 0.08     # Normalized distance around a diverged case that is not proposed again
+
+# Stopping criterion: the worst predicted std is this small a fraction of the response range
+STOP_STD_FRACTION = 0.02
+MAX_CASES = 80            # Hard budget, still ~3x cheaper than the full 6x6x6 grid
+
+NEXT_CASES_FILE = "next_cases.csv"
+
+# ==========================================
+# --- GAUSSIAN-PROCESS SURROGATE ---
+# ==========================================
+def normalize(pressures):
+    return (np.asarray(pressures, dtype=float) - MIN_PRESSURE) / float(MAX_PRESSURE - MIN_PRESSURE)
+
+def rbf_kernel(a, b, lengthscales):
+    d = (a[:, None, :] - b[None, :, :]) / lengthscales
+    return np.exp(-0.5 * np.sum(d * d, axis=2))
+
+class TipSurrogate:
+    """Independent GP per tip displacement component, sharing one set of length scales."""
+
+    def __init__(self, X, Y, noise=1e-6):
+        self.X = X
+        self.y_mean = Y.mean(axis=0)
+        self.y_std = Y.std(axis=0) + 1e-12
+        self.Y = (Y - self.y_mean) / self.y_std
+        self.noise = noise
+        self.lengthscales = self._fit_lengthscales()
+        self._factorize()
+
+    def _factorize(self):
+        K = rbf_kernel(self.X, self.X, self.lengthscales) + self.noise * np.eye(len(self.X))
+        self.L = np.linalg.cholesky(K)
+        self.alpha = np.linalg.solve(self.L.T, np.linalg.solve(self.L, self.Y))
+
+    def _fit_lengthscales(self):
+        """Grid search over isotropic-then-per-axis length scales by marginal likelihood."""
+        best, best_ll = None, -np.inf
+        grid = [0.1, 0.2, 0.35, 0.5, 0.8, 1.2]
+        for l1 in grid:
+            for l2 in grid:
+                for l3 in grid:
+                    ls = np.array([l1, l2, l3])
+                    K = rbf_kernel(self.X, self.X, ls) + self.noise * np.eye(len(self.X))
+                    try:
+                        L = np.linalg.cholesky(K)
+                    except np.linalg.LinAlgError:
+                        continue
+                    alpha = np.linalg.solve(L.T, np.linalg.solve(L, self.Y))
+                    ll = -0.5 * np.sum(self.Y * alpha) - self.Y.shape[1] * np.sum(np.log(np.diag(L)))
+                    if ll > best_ll:
+                        best, best_ll = ls, ll
+        return best if best is not None else np.full(3, 0.5)
+
+    def predict(self, Xq):
+        """Predictive mean (m) and total std (m, summed over components) at normalized points."""
+        Ks = rbf_kernel(Xq, self.X, self.lengthscales)
+        mean = Ks @ self.alpha * self.y_std + self.y_mean
+        v = np.linalg.solve(self.L, Ks.T)
+        var = np.clip(1.0 - np.sum(v * v, axis=0), 0.0, None)
+        std = np.sqrt(var)[:, None] * self.y_std
+        return mean, std.sum(axis=1)
+
+    def add_fantasy(self, x):
+        """Kriging believer: pretend x was solved at its predicted mean so a batch spreads out."""
+        mean, _ = self.predict(x[None, :])
+        self.X = np.vstack([self.X, x])
+        self.Y = np.vstack([self.Y, (mean - self.y_mean) / self.y_std])
+        self._factorize()
+
+    def curvature(self, Xq, h=0.03):
+        """Magnitude of the finite-difference Laplacian of the mean, i.e. where the response bends."""
+        center, _ = self.predict(Xq)
+        lap = np.zeros_like(center)
+        for axis in range(3):
+            step = np.zeros(3)
+            step[axis] = h
+            up, _ = self.predict(np.clip(Xq + step, 0, 1))
+            down, _ = self.predict(np.clip(Xq - step, 0, 1))
+            lap += (up - 2 * center + down) / (h * h)
+        return np.linalg.norm(lap, axis=1)
+
+# ==========================================
+# --- DATA & PROPOSALS ---
+# ==========================================
+def collect_observations(run_folders):
+    """Returns (solved peaks in Pa, tip responses in m, failed peaks in Pa) from previous rounds."""
+    solved, responses = [], []
+    for folder in find_case_folders(run_folders):
+        peaks = case_peaks(folder)
+        if peaks is None: continue
+        solved.append(peaks)
+        responses.append(tip_response(node_data_path(folder)))
+
+    failed = []
+    for run in run_folders:
+        log = os.path.join(run, "failed_cases.txt")
+        if not os.path.exists(log): continue
+        with open(log, "r") as f:
+            for line in f:
+                try:
+                    parts = line.split("|")[0].split(":")[1].split(",")
+                    failed.append(tuple(float(p.split("=")[1]) for p in parts))
+                except (IndexError, ValueError):
+                    continue
+    return np.array(solved).reshape(-1, 3), np.array(responses).reshape(-1, 3), np.array(failed).reshape(-1, 3)
+
+def to_pressures(x):
+    """Maps normalized points back to rounded Pa values, keeping the 1 Pa floor."""
+    p = MIN_PRESSURE + np.asarray(x) * (MAX_PRESSURE - MIN_PRESSURE)
+    p = np.round(p / ROUND_TO) * ROUND_TO
+    return np.clip(p, MIN_PRESSURE, MAX_PRESSURE).astype(int)
+
+def initial_design(seed):
+    sampler = qmc.LatinHypercube(d=3, seed=seed)
+    return to_pressures(sampler.random(n=INITIAL_SAMPLES))
+
+def unattempted(cases, solved, failed):
+    """The cases not yet solved or failed (within rounding), so a diverged LHS point is not proposed again."""
+    attempted = np.vstack([solved, failed])
+    if not len(attempted):
+        return cases
+    dist = np.abs(cases[:, None, :] - attempted[None, :, :]).max(axis=2).min(axis=1)
+    return cases[dist > ROUND_TO / 2.0]
+
+def propose_batch(solved, responses, failed, seed):
+    """Scores random candidates by uncertainty + curvature and greedily picks a spread-out batch."""
+    rng = np.random.default_rng(seed)
+    X = normalize(solved)
+    model = TipSurrogate(X, responses)
+
+    candidates = rng.random((NUM_CANDIDATES, 3))
+    if len(failed):
+        dist = np.linalg.norm(candidates[:, None, :] - normalize(failed)[None, :, :], axis=2).min(axis=1)
+        candidates = candidates[dist > FAILURE_RADIUS]
+
+    _, std = model.predict(candidates)
+    response_range = np.ptp(np.linalg.norm(responses, axis=1)) + 1e-12
+    max_std_fraction = std.max() / response_range
+
+    curv = model.curvature(candidates)
+    curv = curv / (curv.max() + 1e-12)
+
+    batch = []
+    for _ in range(BATCH_SIZE):
+        _, std = model.predict(candidates)
+        score = std / (std.max() + 1e-12) + CURVATURE_WEIGHT * curv
+        best = int(np.argmax(score))
+        batch.append(candidates[best])
+        model.add_fantasy(candidates[best])
+    return to_pressures(np.array(batch)), max_std_fraction
+
+def write_cases(path, cases):
+    """Writes the case list in the format simulate.py reads through LOAD_CASES_FILE."""
+    with open(path, "w") as f:
+        f.write("P1(Pa), P2(Pa), P3(Pa)\n")
+        for p in cases:
+            f.write("{}, {}, {}\n".format(*p))
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Proposes the next most informative (P1, P2, P3) cases to solve.",
+                                     epilog="Solve the proposed cases with simulate.py (LOAD_CASES_FILE) and run again until it prints STOP.")
+    parser.add_argument("runs", nargs="*", help="Run_* folders (or a dataset root) from previous rounds")
+    parser.add_argument("--out", default=NEXT_CASES_FILE, help="Case list for simulate.py's LOAD_CASES_FILE")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_folders = []
+    for path in args.runs:
+        nested = sorted(glob.glob(os.path.join(path, "Run_*")))
+        run_folders.extend(nested if nested else [path])
+
+    solved, responses, failed = collect_observations(run_folders)
+    print("Observed {} solved and {} failed cases.".format(len(solved), len(failed)))
+
+    remaining = unattempted(initial_design(args.seed), solved, failed) if len(solved) < INITIAL_SAMPLES else []
+    if len(remaining):
+        cases = remaining
+        print("Not enough data for a surrogate yet; proposing {} of the {}-point LHS start.".format(len(cases), INITIAL_SAMPLES))
+    elif len(solved) < 2:
+        print("STOP: every LHS start point was attempted but only {} solved; a surrogate needs at least 2.".format(len(solved)))
+        return 1
+    elif len(solved) + len(failed) >= MAX_CASES:
+        print("STOP: case budget of {} reached.".format(MAX_CASES))
+        return 0
+    else:
+        cases, std_fraction = propose_batch(solved, responses, failed, args.seed + len(solved))
+        print("Worst predicted tip std: {:.1%} of the response range (stop below {:.1%}).".format(std_fraction, STOP_STD_FRACTION))
+        if std_fraction < STOP_STD_FRACTION:
+            print("STOP: surrogate is converged; no further cases needed.")
+            return 0
+
+    write_cases(args.out, cases)
+    for p in cases:
+        print("    P1={}, P2={}, P3={}".format(*p))
+    print("Saved {} cases to: {}".format(len(cases), args.out))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
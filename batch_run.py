@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import glob
+import runpy
+import argparse
+import datetime
+import subprocess
+
+from sweep_spec import SpecError, load_spec, spec_hash, build_cases, read_solved, screen_profiles
+
+# ==========================================
+# --- CONFIGURATION (HEADLESS BATCH RUNS) ---
+# ==========================================
+ANSYS_VERSION = "242"
+# None = %AWP_ROOT<version>%\aisol\bin\winx64\AnsysWBU.exe
+MECHANICAL_EXE = None
+# Mechanical without the GUI: the engine script runs against the project and the process exits when it returns
+LAUNCH_ARGS = ["-DSApplet", "-AppModeMech", "-b", "-nosplash", "-notabctrl"]
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENGINE_SCRIPT = os.path.join(CODE_DIR, "sweep_engine.py")
+OUTPUT_ROOT = os.path.join(os.path.expanduser("~"), "Desktop", "SoftRobot_Dataset_Hysteresis")
+POLL_SECONDS = 10
+# A worker whose leak watch projects Mechanical's memory limit stops with status "restart" and is started again
+# in a fresh process, which skips the cases it already handled. After this many relaunches it counts as an error.
+MAX_RELAUNCHES = 5
+
+# Exit codes
+EXIT_OK = 0            # Every case solved and exported
+EXIT_CASES_FAILED = 1  # The sweep ran to the end but some cases failed (see failed_cases.txt)
+EXIT_ERROR = 2         # A worker crashed, timed out or never reported a status
+
+EPILOG = """exit codes: 0 every case solved, 1 some cases failed, 2 a worker crashed, timed out or never reported.
+
+Each worker is a batch-mode Mechanical running sweep_engine.py on its share of the cases. Cases already in
+solved_cases.jsonl or the result cache are copied instead of solved; finished cases carry a _COMPLETE.json marker,
+and --resume skips those. A worker whose memory trends into SOFTROBOT_LEAK_LIMIT_GB is relaunched.
+
+environment: SOFTROBOT_MAX_SOLVER_CORES, SOFTROBOT_RESULT_CACHE (0 = off), SOFTROBOT_CACHE_MAX_GB,
+SOFTROBOT_LEAK_LIMIT_GB; with --dry-run also SOFTROBOT_FAKE_FAIL_ABOVE (Pa) and SOFTROBOT_FAKE_LEAK_MB."""
+
+# ==========================================
+# --- WORKERS ---
+# ==========================================
+def mechanical_exe(version=ANSYS_VERSION):
+    if MECHANICAL_EXE:
+        return MECHANICAL_EXE
+    root = os.environ.get("AWP_ROOT" + version)
+    if not root:
+        raise RuntimeError("AWP_ROOT{} is not set; pass --exe with the path to AnsysWBU.exe.".format(version))
+    return os.path.join(root, "aisol", "bin", "winx64", "AnsysWBU.exe")
+
+def worker_env(spec_path, run_folder, index, workers):
+    """Everything sweep_engine.py reads, passed through the environment (the engine has no argv in Mechanical)."""
+    env = dict(os.environ)
+    env.update({
+        "SOFTROBOT_SWEEP": os.path.abspath(spec_path),
+        "SOFTROBOT_RUN_FOLDER": run_folder,
+        "SOFTROBOT_OUTPUT": os.path.dirname(run_folder),
+        "SOFTROBOT_STATUS": status_path(run_folder, index),
+        "SOFTROBOT_WORKER_INDEX": str(index),
+        "SOFTROBOT_WORKER_COUNT": str(workers),
+        "SOFTROBOT_CODE_DIR": CODE_DIR,
+    })
+    return env
+
+def status_path(run_folder, index):
+    return os.path.join(run_folder, "_status_worker_{}.json".format(index))
+
+def launch_workers(exe, project, spec_path, run_folder, workers, timeout_hours, indices=None):
+    """Starts one headless Mechanical per worker (or per worker in indices) and waits for all of them, killing any past the timeout."""
+    procs = []
+    for index in (range(workers) if indices is None else indices):
+        log = open(os.path.join(run_folder, "worker_{}.log".format(index)), "a")
+        cmd = [exe] + LAUNCH_ARGS + ["-script", ENGINE_SCRIPT, "-file", os.path.abspath(project)]
+        proc = subprocess.Popen(cmd, env=worker_env(spec_path, run_folder, index, workers), stdout=log, stderr=subprocess.STDOUT)
+        procs.append((proc, log))
+        print("    Worker {}: PID {}".format(index, proc.pid))
+
+    deadline = time.time() + timeout_hours * 3600
+    while any(proc.poll() is None for proc, _ in procs):
+        if time.time() > deadline:
+            for proc, _ in procs:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+            print("    Timeout after {:.1f} h; remaining workers killed.".format(timeout_hours))
+            break
+        time.sleep(POLL_SECONDS)
+    for _, log in procs:
+        log.close()
+    return [proc.returncode for proc, _ in procs]
+
+def dry_run_workers(spec_path, run_folder, workers, indices=None):
+    """Runs the engine in this process against fake_extapi, one worker (or one worker in indices) after another."""
+    import fake_extapi
+    codes = []
+    for index in (range(workers) if indices is None else indices):
+        os.environ.update(worker_env(spec_path, run_folder, index, workers))
+        script_globals = fake_extapi.install()
+        try:
+            runpy.run_path(ENGINE_SCRIPT, init_globals=script_globals, run_name="__main__")
+            codes.append(0)
+        except Exception as e:
+            print("    Worker {} crashed: {}".format(index, e))
+            codes.append(1)
+    return codes
+
+def read_status(run_folder, index):
+    path = status_path(run_folder, index)
+    if not os.path.exists(path): return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def run_workers(launch, run_folder, workers):
+    """Runs every worker via launch(indices), relaunching the ones that stopped for a leak-watch restart."""
+    codes = launch(list(range(workers)))
+    for relaunch in range(1, MAX_RELAUNCHES + 1):
+        restart = [i for i in range(workers) if (read_status(run_folder, i) or {}).get("status") == "restart"]
+        if not restart: break
+        for i in restart:
+            print("    Worker {}: {}; relaunching ({}/{}).".format(i, read_status(run_folder, i).get("restart_reason", "leak watch"), relaunch, MAX_RELAUNCHES))
+        for i, code in zip(restart, launch(restart)):
+            codes[i] = code
+    return codes
+
+def collect_status(run_folder, workers, codes=None):
+    """Worker summaries plus the batch exit code; codes are the workers' process exit codes (last launch)."""
+    summaries, code = [], EXIT_OK
+    for index in range(workers):
+        exit_code = codes[index] if codes else None
+        summary = read_status(run_folder, index) or {"worker": index, "status": "missing"}
+        summary["exit_code"] = exit_code
+        summaries.append(summary)
+        if summary["status"] not in ("ok", "failed"):
+            code = EXIT_ERROR # "running" means the worker died mid-sweep, "restart" that it ran out of relaunches
+        elif exit_code:
+            # The status file was written but the process still ended badly (e.g. while saving or shutting down)
+            summary["error"] = "exited with code {} after finishing".format(exit_code)
+            code = EXIT_ERROR
+        elif summary["status"] == "failed" and code == EXIT_OK:
+            code = EXIT_CASES_FAILED
+    return summaries, code
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Runs a sweep spec (sweeps/*.json) in headless Mechanical and exits with its status.",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=EPILOG)
+    parser.add_argument("spec", help="Sweep spec, e.g. sweeps/grid_424.json")
+    parser.add_argument("--project", help="Mechanical project (.mechdb / .wbpj) with the pressure loads and results set up")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent Mechanical instances splitting the cases")
+    parser.add_argument("--output", default=OUTPUT_ROOT)
+    parser.add_argument("--exe", help="Path to AnsysWBU.exe")
+    parser.add_argument("--version", default=ANSYS_VERSION)
+    parser.add_argument("--timeout", type=float, default=48.0, help="Hours before unfinished workers are killed")
+    parser.add_argument("--dry-run", action="store_true", help="Execute against the fake ExtAPI instead of Mechanical")
+    parser.add_argument("--check", action="store_true", help="Only validate the spec and count the cases still to solve")
+    parser.add_argument("--resume", metavar="RUN_FOLDER", help="Finish an earlier run of this spec; committed cases are skipped")
+    parser.add_argument("--repair-profiles", action="store_true", help="Write check_profiles.py repairs of rejected csv profiles and solve those")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        args.output = os.path.join(args.output, "DryRun") # Fake results must never be reused by real sweeps
+    try:
+        spec = load_spec(args.spec)
+        cases = build_cases(spec, args.spec)
+    except SpecError as e:
+        print(e)
+        return EXIT_ERROR
+    rejected = screen_profiles(spec, cases, args.spec, args.repair_profiles)
+    if args.repair_profiles:
+        cases = build_cases(spec, args.spec) # Picks up the *_repaired.csv copies
+    if rejected:
+        for case, violations in rejected:
+            print("Profile {} fails check_profiles.py: {}".format(case["label"], "; ".join(violations)))
+        print("{} of {} profiles rejected; fix them{} before sweeping.".format(
+            len(rejected), len(cases), "" if spec["sweep"]["type"] == "random_walk" else " or pass --repair-profiles"))
+        return EXIT_ERROR
+    solved = read_solved(args.output)
+    keys = set(c["key"] for c in cases)
+    print("Spec '{}' is valid (hash {}): {} cases, {} distinct, {} already solved under {}".format(
+        spec["name"], spec_hash(spec), len(cases), len(keys), len(keys & set(solved)), args.output))
+    if args.check:
+        return EXIT_OK
+
+    run_folder = os.path.abspath(args.resume or os.path.join(args.output, spec["output"]["run_prefix"] + datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")))
+    os.makedirs(run_folder, exist_ok=True)
+    print("Sweep '{}' with {} worker(s) -> {}".format(spec["name"], args.workers, run_folder))
+
+    start = time.time()
+    if args.dry_run:
+        codes = run_workers(lambda indices: dry_run_workers(args.spec, run_folder, args.workers, indices), run_folder, args.workers)
+    else:
+        if not args.project:
+            parser.error("--project is required unless --dry-run is given")
+        exe = args.exe or mechanical_exe(args.version)
+        codes = run_workers(lambda indices: launch_workers(exe, args.project, args.spec, run_folder, args.workers,
+                                                           max(args.timeout - (time.time() - start) / 3600.0, 0.0), indices), run_folder, args.workers)
+
+    summaries, code = collect_status(run_folder, args.workers, codes)
+    solved = sum(s.get("solved", 0) for s in summaries)
+    complete = sum(s.get("complete", 0) for s in summaries)
+    reused = sum(s.get("reused", 0) for s in summaries)
+    cached = sum(s.get("cached", 0) for s in summaries)
+    failed = sum(len(s.get("failed", [])) for s in summaries)
+    print("\nFinished in {:.1f} min: {} solved, {} reused from earlier sweeps, {} from the result cache, {} already committed, {} failed, {} committed case folders.".format(
+        (time.time() - start) / 60.0, solved, reused, cached, complete, failed, len(glob.glob(os.path.join(run_folder, "*", "_COMPLETE.json")))))
+    lookups = cached + solved + failed
+    if lookups:
+        print("Result cache: {:.0%} hit rate, ~{:.1f} min of solving saved ({:.1f} min solved).".format(
+            cached / float(lookups), sum(s.get("saved_seconds", 0.0) for s in summaries) / 60.0,
+            sum(s.get("solved_seconds", 0.0) for s in summaries) / 60.0))
+    for s in summaries:
+        if s["status"] not in ("ok", "failed") or s["exit_code"]:
+            print("    Worker {}: {} (exit code {}) {}".format(s["worker"], s["status"], s["exit_code"], s.get("error", "")))
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import struct
+import shutil
+import hashlib
+
+# ==========================================
+# --- CONFIGURATION (CASE COMMITS) ---
+# ==========================================
+# A case is exported into `<case folder>.partial`, verified, fsynced, stamped with a completion marker and only
+# then renamed into place, so a crash mid-export never leaves a folder that looks finished. Resuming is a check
+# for the marker. The Mechanical drivers and sweep_engine.py import this file from the code folder.
+STAGING_SUFFIX = ".partial"
+REPLACED_SUFFIX = ".replaced" # An older uncommitted attempt, moved aside while the new one is renamed into place
+CASE_MARKER = "_COMPLETE.json"
+HASH_BLOCK_BYTES = 1 << 20
+
+# ==========================================
+# --- OUTPUT CHECKS ---
+# ==========================================
+def count_node_frames(file_path):
+    """Rows per frame of a NodeData/SubstepData CSV (frames are consecutive rows sharing a time), streamed."""
+    counts, last_t = [], None
+    with open(file_path, "r") as f:
+        f.readline()
+        for line in f:
+            t = line[:line.find(",")]
+            if not t.strip(): continue
+            if t != last_t:
+                counts.append(0)
+                last_t = t
+            counts[-1] += 1
+    return counts
+
+def count_rows(file_path):
+    with open(file_path, "r") as f:
+        return sum(1 for line in f if line.strip()) - 1
+
+def avi_frame_count(file_path):
+    """dwTotalFrames from the AVI main header, or None if the header is missing or the RIFF chunk is cut short."""
+    with open(file_path, "rb") as f:
+        head = f.read(4096)
+    pos = head.find(b"avih")
+    if head[:4] != b"RIFF" or pos < 0 or len(head) < pos + 28:
+        return None
+    if os.path.getsize(file_path) < struct.unpack("<I", head[4:8])[0] + 8:
+        return None # Truncated: the file ends before its first RIFF chunk does
+    return struct.unpack("<I", head[pos + 24:pos + 28])[0]
+
+def verify_case(folder, base_name, profile_rows=None, node_frames=None, video_frames=None, views=(), node_file="_NodeData.csv"):
+    """Checks the outputs of one case; returns {"frames", "nodes", "warnings"} or raises with everything that is wrong.
+
+    profile_rows: PressureProfile rows (VIDEO_FRAMES + 1); node_frames: NodeData frames; video_frames: frames per
+    view AVI. None skips that check. Every NodeData frame must hold the same, non-zero number of nodes. A video
+    with another frame count than video_frames is only a warning: Mechanical's exporter does not always write
+    exactly the NumberOfFrames it was given, but a missing or truncated video still fails the case.
+    """
+    problems, warnings, stats = [], [], {"frames": 0, "nodes": 0}
+    if profile_rows is not None:
+        path = os.path.join(folder, base_name + "_PressureProfile.csv")
+        if not os.path.exists(path): problems.append("no PressureProfile")
+        elif count_rows(path) != profile_rows: problems.append("PressureProfile has {} rows, expected {}".format(count_rows(path), profile_rows))
+    if node_file:
+        path = os.path.join(folder, base_name + node_file)
+        counts = count_node_frames(path) if os.path.exists(path) else []
+        if not counts: problems.append("no {} rows".format(node_file[1:]))
+        elif node_frames is not None and len(counts) != node_frames: problems.append("{} has {} frames, expected {}".format(node_file[1:], len(counts), node_frames))
+        if counts and min(counts) != max(counts): problems.append("{} node counts vary from {} to {} per frame".format(node_file[1:], min(counts), max(counts)))
+        if counts: stats = {"frames": len(counts), "nodes": max(counts)}
+    for view in views:
+        path = os.path.join(folder, base_name + "_View" + view + ".avi")
+        frames = avi_frame_count(path) if os.path.exists(path) else None
+        if frames is None: problems.append("View{} video missing or truncated".format(view))
+        elif video_frames is not None and frames != video_frames: warnings.append("View{} video has {} frames, expected {}".format(view, frames, video_frames))
+    if problems:
+        raise Exception("Incomplete outputs: " + "; ".join(problems))
+    for warning in warnings:
+        print("      [Commit]: WARNING: {}".format(warning))
+    stats["warnings"] = warnings
+    return stats
+
+# ==========================================
+# --- STAGING & COMMIT ---
+# ==========================================
+def staging_folder(case_folder):
+    return case_folder.rstrip("\\/") + STAGING_SUFFIX
+
+def is_complete(case_folder):
+    """The resume check: only committed folders carry the marker."""
+    return os.path.exists(os.path.join(case_folder, CASE_MARKER))
+
+def prepare_staging(case_folder):
+    """Empty staging folder for a case (the leftovers of an interrupted attempt are discarded)."""
+    stage = staging_folder(case_folder)
+    if os.path.exists(stage): shutil.rmtree(stage)
+    os.makedirs(stage)
+    return stage
+
+def file_sha1(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        block = f.read(HASH_BLOCK_BYTES)
+        while block:
+            digest.update(block)
+            block = f.read(HASH_BLOCK_BYTES)
+    return digest.hexdigest()
+
+def fsync_file(file_path):
+    with open(file_path, "ab") as f:
+        f.flush()
+        os.fsync(f.fileno())
+
+def commit_case(case_folder, stats, info=None):
+    """Fsyncs and checksums the staged files, writes the marker and renames the staging folder to case_folder.
+
+    stats comes from verify_case; info is any extra JSON-able detail for the marker (case number, key...).
+    """
+    stage = staging_folder(case_folder)
+    files = {}
+    for name in sorted(os.listdir(stage)):
+        path = os.path.join(stage, name)
+        fsync_file(path)
+        files[name] = {"size": os.path.getsize(path), "sha1": file_sha1(path)}
+    marker = dict(info or {})
+    marker.update({"frames": stats["frames"], "nodes": stats["nodes"], "files": files, "time": time.strftime("%Y-%m-%d %H:%M:%S")})
+    if stats.get("warnings"): marker["warnings"] = stats["warnings"]
+    with open(os.path.join(stage, CASE_MARKER), "w") as f:
+        json.dump(marker, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    # Uncommitted outputs of an older attempt are moved aside, not deleted first, so case_folder is only ever
+    # missing for the instant between two renames; the aside copy is removed once the new one is in place
+    replaced = case_folder.rstrip("\\/") + REPLACED_SUFFIX
+    if os.path.exists(replaced): shutil.rmtree(replaced) # Left by a crash between the renames
+    if os.path.exists(case_folder): os.rename(case_folder, replaced)
+    os.rename(stage, case_folder)
+    if os.path.exists(replaced): shutil.rmtree(replaced)
+    return marker
@@ -0,0 +1,272 @@
+import os
+import re
+import sys
+import json
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+from scipy.signal import butter, filtfilt
+
+# ==========================================
+# --- CONFIGURATION (PHYSICS-FEASIBILITY LIMITS) ---
+# ==========================================
+# Every limit below was paid for with a diverged 2-hour solve. All pressures in kPa.
+FPS = 30                    # Frame-indexed CSVs (Frame, Chamber_1..3) are played back at 30 FPS
+MIN_PRESSURE = 0.001        # Exactly 1 Pa safety floor to prevent vacuum crashing
+MAX_PRESSURE = 100.0        # Peak the grid sweeps solve (simulate.py MAX_PRESSURE); sustained creep is the hold limit's job
+MAX_START_PRESSURE = 5.0    # Profiles must fade in from the floor, never start loaded
+MAX_SLEW_RATE = 100.0       # kPa/s, steeper ramps send a "solver shockwave" through the mesh
+CUTOFF_HZ = 12.0            # Stay safely under the 15 Hz Nyquist limit of the 30 FPS camera
+MAX_HIGH_FREQ_ENERGY = 0.02 # Fraction of (de-meaned) signal energy allowed above CUTOFF_HZ
+MAX_ASYMMETRY = 90.0        # kPa spread between the most and least inflated bellow
+HOLD_PRESSURE = 60.0        # kPa above which a sustained hold starts to creep
+MAX_HOLD_ENERGY = 300.0     # kPa*s of pressure above HOLD_PRESSURE integrated over the profile
+FADE_IN_TIME = 1.0          # Envelope used when repairing a loaded start
+
+# Tuned thresholds are written here and picked up automatically on the next run
+LIMITS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profile_limits.json")
+FAILURE_WEIGHT = 3.0        # One admitted divergence costs as much as rejecting 3 good cases
+
+DEFAULT_LIMITS = {
+    "min_pressure": MIN_PRESSURE,
+    "max_pressure": MAX_PRESSURE,
+    "max_start_pressure": MAX_START_PRESSURE,
+    "max_slew_rate": MAX_SLEW_RATE,
+    "cutoff_hz": CUTOFF_HZ,
+    "max_high_freq_energy": MAX_HIGH_FREQ_ENERGY,
+    "max_asymmetry": MAX_ASYMMETRY,
+    "hold_pressure": HOLD_PRESSURE,
+    "max_hold_energy": MAX_HOLD_ENERGY,
+}
+
+FAILURE_LINE = re.compile(r"Case\s+(\d+):\s*P1=([\d.eE+-]+),\s*P2=([\d.eE+-]+),\s*P3=([\d.eE+-]+)\s*\|\s*Error:\s*(.*)")
+CASE_FOLDER = re.compile(r"Case_(\d+)_3bellows_([\d.]+)_([\d.]+)_([\d.]+)$")
+
+# ==========================================
+# --- PROFILE LOADING ---
+# ==========================================
+def load_limits():
+    """Returns the default limits, overridden by any thresholds tuned from failure logs."""
+    limits = dict(DEFAULT_LIMITS)
+    if os.path.exists(LIMITS_FILE):
+        with open(LIMITS_FILE, "r") as f:
+            limits.update(json.load(f))
+    return limits
+
+def load_profile(csv_path):
+    """Reads any of our 3-channel profile CSVs and returns (time [s], pressures [kPa] as N x 3)."""
+    df = pd.read_csv(csv_path, skipinitialspace=True)
+    first_col = df.columns[0].strip().lower()
+    values = df.iloc[:, :4].to_numpy(dtype=float)
+
+    if first_col.startswith("frame"):
+        # Frame-indexed generator output (LHS, PRBS, chirp sweeps) is played back at 30 FPS
+        t = values[:, 0] / FPS
+    else:
+        t = values[:, 0]
+    return t, values[:, 1:4]
+
+def save_profile(csv_path, t, pressures):
+    """Writes a profile in the same 'Time [s], P1 [kPa]...' format the simulators parse."""
+    df = pd.DataFrame({'Time [s]': t, 'P1 [kPa]': pressures[:, 0], 'P2 [kPa]': pressures[:, 1], 'P3 [kPa]': pressures[:, 2]})
+    df.to_csv(csv_path, index=False)
+
+# ==========================================
+# --- FEASIBILITY CHECKS ---
+# ==========================================
+def profile_features(t, pressures, limits):
+    """Computes every quantity the limits are checked against in one vectorized pass."""
+    dt = np.diff(t)
+    dt[dt <= 0] = np.inf # Duplicate timestamps carry no slew information
+
+    slew = np.abs(np.diff(pressures, axis=0)) / dt[:, None]
+    spread = pressures.max(axis=1) - pressures.min(axis=1)
+
+    excess = np.clip(pressures - limits["hold_pressure"], 0.0, None)
+    hold_energy = (0.5 * (excess[1:] + excess[:-1]) * np.diff(t)[:, None]).sum(axis=0)
+
+    return {
+        "peak_pressure": float(pressures.max()),
+        "min_pressure": float(pressures.min()),
+        "start_pressure": float(pressures[0].max()),
+        "max_slew_rate": float(slew.max()) if len(slew) else 0.0,
+        "high_freq_energy": float(high_frequency_fraction(t, pressures, limits["cutoff_hz"])),
+        "max_asymmetry": float(spread.max()),
+        "hold_energy": float(hold_energy.max()),
+    }
+
+def high_frequency_fraction(t, pressures, cutoff_hz):
+    """Fraction of the signal energy above the cutoff, worst channel, after resampling to a uniform grid."""
+    if len(t) < 4 or t[-1] <= t[0]:
+        return 0.0
+    dt = np.median(np.diff(t))
+    uniform_t = np.arange(t[0], t[-1] + 0.5 * dt, dt)
+    fractions = []
+    for ch in range(3):
+        signal = np.interp(uniform_t, t, pressures[:, ch])
+        spectrum = np.abs(np.fft.rfft(signal - signal.mean())) ** 2
+        freqs = np.fft.rfftfreq(len(signal), dt)
+        total = spectrum.sum()
+        fractions.append(spectrum[freqs > cutoff_hz].sum() / total if total > 0 else 0.0)
+    return max(fractions)
+
+def validate_profile(t, pressures, limits=None):
+    """Returns (features, list of human-readable violations). An empty list means the profile is solver-safe."""
+    limits = limits or load_limits()
+    feats = profile_features(t, pressures, limits)
+    violations = []
+
+    if feats["peak_pressure"] > limits["max_pressure"]:
+        violations.append("Peak {:.1f} kPa > {:.1f} kPa creep limit".format(feats["peak_pressure"], limits["max_pressure"]))
+    if feats["min_pressure"] < limits["min_pressure"]:
+        violations.append("Min {:.4f} kPa < 1 Pa vacuum floor".format(feats["min_pressure"]))
+    if feats["start_pressure"] > limits["max_start_pressure"]:
+        violations.append("Starts loaded at {:.1f} kPa (no fade-in)".format(feats["start_pressure"]))
+    if feats["max_slew_rate"] > limits["max_slew_rate"]:
+        violations.append("Slew {:.1f} kPa/s > {:.1f} kPa/s".format(feats["max_slew_rate"], limits["max_slew_rate"]))
+    if feats["high_freq_energy"] > limits["max_high_freq_energy"]:
+        violations.append("{:.1%} of energy above {:.0f} Hz".format(feats["high_freq_energy"], limits["cutoff_hz"]))
+    if feats["max_asymmetry"] > limits["max_asymmetry"]:
+        violations.append("Asymmetry {:.1f} kPa > {:.1f} kPa".format(feats["max_asymmetry"], limits["max_asymmetry"]))
+    if feats["hold_energy"] > limits["max_hold_energy"]:
+        violations.append("Hold energy {:.0f} kPa*s above {:.0f} kPa".format(feats["hold_energy"], limits["hold_pressure"]))
+
+    return feats, violations
+
+# ==========================================
+# --- REPAIR ---
+# ==========================================
+def repair_profile(t, pressures, limits=None):
+    """Pulls a profile back inside the limits. Hold energy cannot be repaired without changing the experiment."""
+    limits = limits or load_limits()
+    p = pressures.copy()
+
+    # 1. Strip content above the cutoff with the same Butterworth filter the generators use
+    if len(t) > 15 and t[-1] > t[0]:
+        dt = np.median(np.diff(t))
+        nyquist = 0.5 / dt
+        if limits["cutoff_hz"] < nyquist:
+            b, a = butter(4, limits["cutoff_hz"] / nyquist, btype='low')
+            uniform_t = np.arange(t[0], t[-1] + 0.5 * dt, dt)
+            for ch in range(3):
+                smooth = filtfilt(b, a, np.interp(uniform_t, t, p[:, ch]))
+                p[:, ch] = np.interp(t, uniform_t, smooth)
+
+    # 2. Compress the channels towards their mean wherever the spread is too large
+    mean = p.mean(axis=1, keepdims=True)
+    spread = p.max(axis=1, keepdims=True) - p.min(axis=1, keepdims=True)
+    scale = np.minimum(1.0, limits["max_asymmetry"] / np.maximum(spread, 1e-12))
+    p = mean + (p - mean) * scale
+
+    # 3. Hard physical bounds
+    p = np.clip(p, limits["min_pressure"], limits["max_pressure"])
+
+    # 4. Fade in from the floor if the profile starts loaded
+    if p[0].max() > limits["max_start_pressure"]:
+        envelope = np.clip((t - t[0]) / FADE_IN_TIME, 0.0, 1.0)[:, None]
+        p = limits["min_pressure"] + (p - limits["min_pressure"]) * envelope
+
+    # 5. Rate-limit each channel (sequential by nature, but only touches N x 3 floats)
+    max_step = limits["max_slew_rate"] * np.diff(t) * (1.0 - 1e-9) # Stay strictly under the limit after round-off
+    for i in range(1, len(t)):
+        p[i] = np.clip(p[i], p[i - 1] - max_step[i - 1], p[i - 1] + max_step[i - 1])
+
+    return p
+
+# ==========================================
+# --- THRESHOLD TUNING FROM FAILED SOLVES ---
+# ==========================================
+def collect_peak_outcomes(run_folders):
+    """Pairs every grid case's peak pressures (kPa) with its outcome: 1 = failed, 0 = solved and exported."""
+    records = {}
+    for run in run_folders:
+        failure_log = os.path.join(run, "failed_cases.txt")
+        if os.path.exists(failure_log):
+            with open(failure_log, "r") as f:
+                for line in f:
+                    m = FAILURE_LINE.search(line)
+                    if m:
+                        peaks = tuple(float(v) / 1000.0 for v in m.group(2, 3, 4))
+                        records[(run, int(m.group(1)))] = (peaks, 1)
+        for folder in glob.glob(os.path.join(run, "Case_*")):
+            m = CASE_FOLDER.search(os.path.basename(folder))
+            if m and glob.glob(os.path.join(folder, "*_NodeData.csv")):
+                peaks = tuple(float(v) / 1000.0 for v in m.group(2, 3, 4))
+                records.setdefault((run, int(m.group(1))), (peaks, 0))
+    peaks = np.array([r[0] for r in records.values()]).reshape(-1, 3)
+    failed = np.array([r[1] for r in records.values()], dtype=int)
+    return peaks, failed
+
+def best_threshold(metric, failed):
+    """Picks the cut that maximises (good cases kept - FAILURE_WEIGHT * failures admitted)."""
+    candidates = np.unique(metric)
+    admitted = metric[None, :] <= candidates[:, None]
+    score = (admitted & (failed == 0)).sum(axis=1) - FAILURE_WEIGHT * (admitted & (failed == 1)).sum(axis=1)
+    return float(candidates[np.argmax(score)])
+
+def tune_limits(run_folders):
+    """Re-derives the peak and asymmetry limits from recorded grid failures and saves them to LIMITS_FILE."""
+    peaks, failed = collect_peak_outcomes(run_folders)
+    if failed.sum() == 0 or failed.sum() == len(failed):
+        print("Need both failed and successful cases to tune; limits unchanged.")
+        return load_limits()
+
+    tuned = {
+        "max_pressure": best_threshold(peaks.max(axis=1), failed),
+        "max_asymmetry": best_threshold(peaks.max(axis=1) - peaks.min(axis=1), failed),
+    }
+    print("Tuned from {} cases ({} failed): {}".format(len(failed), failed.sum(), tuned))
+
+    limits = load_limits()
+    limits.update(tuned)
+    with open(LIMITS_FILE, "w") as f:
+        json.dump(limits, f, indent=2)
+    return limits
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Rejects or repairs pressure profiles that are likely to diverge in Ansys.",
+                                     epilog="batch_run.py runs the same checks on csv and random-walk sweeps before launching.")
+    parser.add_argument("paths", nargs="*", help="Profile CSVs or folders of CSVs to check")
+    parser.add_argument("--repair", action="store_true", help="Write a *_repaired.csv next to every rejected profile")
+    parser.add_argument("--tune", nargs="+", metavar="RUN_FOLDER", help="Re-tune limits from failed_cases.txt in these Run_* folders")
+    args = parser.parse_args()
+
+    limits = tune_limits(args.tune) if args.tune else load_limits()
+
+    csv_files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            csv_files.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+        else:
+            csv_files.append(path)
+
+    rejected = skipped = 0
+    for csv_path in csv_files:
+        if csv_path.endswith("_repaired.csv") or csv_path.endswith("_NodeData.csv"):
+            skipped += 1
+            continue
+        t, pressures = load_profile(csv_path)
+        _, violations = validate_profile(t, pressures, limits)
+        if not violations:
+            print("PASS    {}".format(os.path.basename(csv_path)))
+            continue
+
+        rejected += 1
+        print("REJECT  {}: {}".format(os.path.basename(csv_path), "; ".join(violations)))
+        if args.repair:
+            repaired = repair_profile(t, pressures, limits)
+            _, remaining = validate_profile(t, repaired, limits)
+            out_path = os.path.splitext(csv_path)[0] + "_repaired.csv"
+            save_profile(out_path, t, repaired)
+            status = "still failing: " + "; ".join(remaining) if remaining else "now passes"
+            print("        -> Repaired into {} ({})".format(os.path.basename(out_path), status))
+
+    print("\n{} of {} profiles rejected ({} repaired copies and node-data files skipped).".format(rejected, len(csv_files) - skipped, skipped))
+    return 1 if rejected else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
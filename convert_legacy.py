@@ -0,0 +1,162 @@
+import os
+import sys
+import glob
+import json
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ==========================================
+# --- CONFIGURATION (LEGACY NODEDATA CONVERSION) ---
+# ==========================================
+CHUNK_ROWS = 2000000      # Rows parsed per chunk (~250 MB of pandas frame), bounds memory per worker
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+OUT_DIR = "NodeData_Columnar"
+
+# Every NodeData variant shares these leading columns; only the trailing pressure columns differ
+BASE_COLUMNS = ["Time(s)", "NodeID", "X_und(m)", "Y_und(m)", "Z_und(m)", "DefX(m)", "DefY(m)", "DefZ(m)", "Strain"]
+OUTPUT_COLUMNS = ["time", "node_id", "x_und", "y_und", "z_und", "def_x", "def_y", "def_z", "strain", "p1", "p2", "p3"]
+OUTPUT_DTYPES = [np.float64, np.int32] + [np.float32] * 10
+
+# Trailing pressure columns -> what they mean. Written by:
+#   Peak_P*  simulate.py, simulate_3131.py, resume_script.py, old/hysteresis_final.py
+#   P*       old/hysteresis/hysteresis_final.py, hysteresis_view_fix.py (peak values, older name)
+#   Inst_P*  old/hysteresis/hysteresis_instantaneous_velo.py
+#   (none)   random_walk.py
+SCHEMAS = {
+    ("Peak_P1(Pa)", "Peak_P2(Pa)", "Peak_P3(Pa)"): "peak",
+    ("P1(Pa)", "P2(Pa)", "P3(Pa)"): "peak",
+    ("Inst_P1(Pa)", "Inst_P2(Pa)", "Inst_P3(Pa)"): "instantaneous",
+    (): "none",
+}
+
+# ==========================================
+# --- SCHEMA DETECTION ---
+# ==========================================
+def detect_schema(csv_path):
+    """Returns (pressure kind, column names) from the header line, or (None, columns) for an unknown layout."""
+    with open(csv_path, "r") as f:
+        columns = [c.strip() for c in f.readline().split(",")]
+    if columns[:len(BASE_COLUMNS)] != BASE_COLUMNS:
+        return None, columns
+    return SCHEMAS.get(tuple(columns[len(BASE_COLUMNS):])), columns
+
+# ==========================================
+# --- CONVERSION ---
+# ==========================================
+def output_dir(csv_path, root, out_root):
+    rel = os.path.relpath(os.path.abspath(csv_path), os.path.abspath(root))
+    return os.path.join(out_root, os.path.splitext(rel)[0] + ".cols")
+
+def write_part(part_path, chunk, kind):
+    """One chunk as a compressed set of typed columns. Written to a temp name and renamed into place."""
+    arrays = {}
+    for src, name, dtype in zip(BASE_COLUMNS, OUTPUT_COLUMNS, OUTPUT_DTYPES):
+        arrays[name] = chunk[src].to_numpy(dtype=dtype)
+    if kind == "none":
+        for name in OUTPUT_COLUMNS[-3:]:
+            arrays[name] = np.full(len(chunk), np.nan, dtype=np.float32)
+    else:
+        trailing = chunk.columns[len(BASE_COLUMNS):len(BASE_COLUMNS) + 3]
+        for src, name in zip(trailing, OUTPUT_COLUMNS[-3:]):
+            arrays[name] = chunk[src].to_numpy(dtype=np.float32)
+    tmp = part_path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, part_path)
+
+def convert_file(csv_path, root, out_root, chunk_rows=CHUNK_ROWS):
+    """Streams one CSV into <out>/<relative path>.cols/part_NNNNN.npz + schema.json.
+
+    Work in progress lives in a .partial folder; finished parts are kept, so an interrupted file
+    resumes at its first missing part. The folder is renamed into place only once complete.
+    """
+    final_dir = output_dir(csv_path, root, out_root)
+    if os.path.exists(os.path.join(final_dir, "schema.json")):
+        return "skipped", final_dir, 0
+
+    kind, columns = detect_schema(csv_path)
+    if kind is None:
+        return "unknown schema ({})".format(", ".join(columns)), csv_path, 0
+
+    partial_dir = final_dir + ".partial"
+    marker = os.path.join(partial_dir, "chunk_rows.txt")
+    # Parts from a previous attempt only line up if they were cut at the same chunk size
+    if os.path.exists(partial_dir) and (not os.path.exists(marker) or open(marker).read().strip() != str(chunk_rows)):
+        shutil.rmtree(partial_dir)
+    if not os.path.exists(partial_dir):
+        os.makedirs(partial_dir)
+        with open(marker, "w") as f:
+            f.write(str(chunk_rows))
+
+    rows, part = 0, 0
+    reader = pd.read_csv(csv_path, skipinitialspace=True, chunksize=chunk_rows, engine="c",
+                         dtype={"NodeID": np.int64})
+    for chunk in reader:
+        chunk.columns = [c.strip() for c in chunk.columns]
+        part_path = os.path.join(partial_dir, "part_{:05d}.npz".format(part))
+        if not os.path.exists(part_path):
+            write_part(part_path, chunk, kind)
+        rows += len(chunk)
+        part += 1
+
+    schema = {"source": os.path.abspath(csv_path), "source_size": os.path.getsize(csv_path), "pressure_kind": kind,
+              "source_columns": columns, "columns": OUTPUT_COLUMNS, "dtypes": [np.dtype(d).name for d in OUTPUT_DTYPES],
+              "pressure_units": "Pa", "rows": rows, "parts": part, "chunk_rows": chunk_rows}
+    with open(os.path.join(partial_dir, "schema.json"), "w") as f:
+        json.dump(schema, f, indent=1)
+    if os.path.exists(final_dir): shutil.rmtree(final_dir)
+    os.rename(partial_dir, final_dir)
+    return "converted", final_dir, rows
+
+def read_columnar(cols_dir, columns=None):
+    """Loads a converted file back as a dict of column arrays (optionally only some columns)."""
+    with open(os.path.join(cols_dir, "schema.json"), "r") as f:
+        schema = json.load(f)
+    names = columns or schema["columns"]
+    parts = [np.load(os.path.join(cols_dir, "part_{:05d}.npz".format(i))) for i in range(schema["parts"])]
+    return dict((name, np.concatenate([p[name] for p in parts])) for name in names)
+
+def convert_tree(roots, out_root, workers=WORKERS, chunk_rows=CHUNK_ROWS):
+    jobs = []
+    for root in roots:
+        for csv_path in sorted(glob.glob(os.path.join(root, "**", "*_NodeData.csv"), recursive=True)):
+            jobs.append((csv_path, root))
+    print("Found {} NodeData files; converting with {} workers".format(len(jobs), workers))
+
+    src_bytes, total_rows, failures = 0, 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = dict((pool.submit(convert_file, path, root, out_root, chunk_rows), path) for path, root in jobs)
+        for i, future in enumerate(as_completed(futures)):
+            path = futures[future]
+            try:
+                status, _, rows = future.result()
+            except Exception as e:
+                status, rows = "error: {}".format(e), 0
+            if status not in ("converted", "skipped"):
+                failures += 1
+            elif status == "converted":
+                src_bytes += os.path.getsize(path)
+                total_rows += rows
+            print("    [{}/{}] {}: {}".format(i + 1, len(jobs), os.path.relpath(path), status))
+
+    out_bytes = sum(os.path.getsize(p) for p in glob.glob(os.path.join(out_root, "**", "*.npz"), recursive=True))
+    print("\nConverted {:,} rows; {:.1f} MB of CSV this run; {:.1f} MB columnar output in total".format(
+        total_rows, src_bytes / 1e6, out_bytes / 1e6))
+    return failures
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Streams legacy NodeData CSVs of any variant into a uniform compressed columnar format.")
+    parser.add_argument("roots", nargs="+", help="Folders searched recursively for *_NodeData.csv")
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    return 1 if convert_tree(args.roots, args.out, args.workers, args.chunk_rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+
+from check_profiles import load_profile, save_profile, load_limits, validate_profile
+
+# ==========================================
+# --- CONFIGURATION (STATE-SPACE COVERAGE) ---
+# ==========================================
+FPS = 30                  # Profiles are resampled to the video rate so every second of data weighs the same
+MAX_PRESSURE = 100.0      # kPa; binning range, the old grids reach 100 kPa
+PRESSURE_BINS = 5         # Per bellow: 0-20, 20-40 ... 80-100 kPa
+# Mean pressure rate (kPa/s) across the bellows: fast unload, unload, hold, load, fast load
+RATE_EDGES = [-np.inf, -10.0, -0.5, 0.5, 10.0, np.inf]
+RATE_LABELS = ["fast unload", "unload", "hold", "load", "fast load"]
+RATE_TARGETS = [-15.0, -4.0, 0.0, 4.0, 15.0]   # kPa/s used when a proposal crosses a cell
+MIN_SECONDS = 1.0         # A cell with less data than this counts as under-sampled
+
+# Fill proposals stay inside the check_profiles.py limits (authoritative, incl. profile_limits.json): cells are
+# crossed below its peak pressure, and a cell that would break a limit starts a new profile or is dropped
+HOLD_DWELL = 1.5          # s spent inside a "hold" cell
+TRANSIT_RATE = 20.0       # kPa/s between cells, matches MAX_SLEW_RATE in random_walk.py
+MAX_PROFILE_DURATION = 30.0
+MIN_PRESSURE = 0.001      # kPa, the drivers' 1 Pa floor
+OUT_DIR = "Coverage_Fill_Profiles"
+
+# ==========================================
+# --- SAMPLES & HISTOGRAM ---
+# ==========================================
+def is_profile_csv(csv_path):
+    """True for 3-channel pressure profiles (PressureProfile, Frame/Chamber generators, Time/P1 files)."""
+    with open(csv_path, "r") as f:
+        columns = [c.strip().lower() for c in f.readline().split(",")]
+    return len(columns) >= 4 and columns[0].startswith(("time", "frame")) and columns[1].startswith(("p1", "chamber"))
+
+def find_profiles(paths):
+    found = []
+    for path in paths:
+        candidates = [path] if os.path.isfile(path) else glob.glob(os.path.join(path, "**", "*.csv"), recursive=True)
+        found.extend(p for p in sorted(candidates) if is_profile_csv(p))
+    return found
+
+def profile_samples(csv_path):
+    """(samples x 4) of P1, P2, P3 (kPa) and mean rate (kPa/s) at FPS."""
+    t, p = load_profile(csv_path)
+    order = np.argsort(t, kind="stable")
+    t, p = t[order], p[order]
+    keep = np.concatenate([[True], np.diff(t) > 0])
+    t, p = t[keep], p[keep]
+    if len(t) < 2:
+        return np.empty((0, 4))
+    grid = np.arange(t[0], t[-1] + 1e-9, 1.0 / FPS)
+    dense = np.stack([np.interp(grid, t, p[:, ch]) for ch in range(3)], axis=1)
+    rate = np.gradient(dense, grid, axis=0).mean(axis=1) if len(grid) > 1 else np.zeros(len(grid))
+    return np.column_stack([dense, rate])
+
+def histogram(samples):
+    """Seconds of data per (P1, P2, P3, rate) cell."""
+    p_edges = np.linspace(0.0, MAX_PRESSURE, PRESSURE_BINS + 1)
+    clipped = samples.copy()
+    clipped[:, :3] = np.clip(clipped[:, :3], 0.0, MAX_PRESSURE - 1e-9)
+    counts, _ = np.histogramdd(clipped, bins=[p_edges] * 3 + [np.asarray(RATE_EDGES)])
+    return counts / FPS
+
+def cell_centre(index):
+    width = MAX_PRESSURE / PRESSURE_BINS
+    return np.array([(i + 0.5) * width for i in index[:3]]), RATE_TARGETS[index[3]]
+
+# ==========================================
+# --- FILL PROPOSALS ---
+# ==========================================
+def cell_span(index, max_pressure):
+    """(low, high) kPa per bellow of the part of a cell below max_pressure."""
+    width = MAX_PRESSURE / PRESSURE_BINS
+    low = np.array([i * width for i in index[:3]])
+    return low, np.minimum(low + width, max_pressure)
+
+def reachable(index, limits):
+    """Whether a fill profile can visit the cell without breaking the peak, slew or asymmetry limits."""
+    low, high = cell_span(index, limits["max_pressure"])
+    middle = 0.5 * (low + high)
+    return bool((low < limits["max_pressure"]).all() and abs(RATE_TARGETS[index[3]]) <= limits["max_slew_rate"]
+                and middle.max() - middle.min() <= limits["max_asymmetry"])
+
+def cell_traversal(index, max_pressure=MAX_PRESSURE):
+    """Points (t, P1, P2, P3) that pass through one cell (below max_pressure) at its rate, starting at t=0.
+
+    A crossing shorter than MIN_SECONDS (fast rates in a cell cut short by the peak limit) is repeated, going
+    back to its start at TRANSIT_RATE in between.
+    """
+    low, high = cell_span(index, max_pressure)
+    middle, rate = 0.5 * (low + high), RATE_TARGETS[index[3]]
+    if rate == 0.0:
+        return np.array([[0.0] + list(middle), [HOLD_DWELL] + list(middle)])
+    half = 0.45 * (high - low).min()
+    span = 2 * half / abs(rate)
+    direction = np.sign(rate)
+    start, end = middle - direction * half, middle + direction * half
+    points = [[0.0] + list(start), [span] + list(end)]
+    for _ in range(int(np.ceil(MIN_SECONDS / span)) - 1):
+        t = points[-1][0] + 2 * half / TRANSIT_RATE
+        points += [[t] + list(start), [t + span] + list(end)]
+    return np.array(points)
+
+def return_home(points):
+    """Closes a profile with a TRANSIT_RATE ramp back to the 1 Pa floor."""
+    home = np.abs(points[-1][1:] - MIN_PRESSURE).max() / TRANSIT_RATE
+    return np.array(points + [np.array([points[-1][0] + max(home, 1.0 / FPS), MIN_PRESSURE, MIN_PRESSURE, MIN_PRESSURE])])
+
+def propose_fills(empty_cells, limits=None):
+    """Chains under-sampled cells nearest-first into profiles that pass check_profiles.validate_profile.
+
+    Transit between cells runs at TRANSIT_RATE, and every profile starts and ends at the 1 Pa floor. A profile
+    is closed before the next cell would take it past MAX_PROFILE_DURATION or break a limit (typically the
+    sustained-hold energy of high-pressure cells). Returns (profiles, cells dropped because no profile can visit them).
+    """
+    limits = limits or load_limits()
+    remaining = [tuple(c) for c in empty_cells if reachable(c, limits)]
+    dropped = len(empty_cells) - len(remaining)
+    profiles = []
+    while remaining:
+        points = [np.array([0.0, MIN_PRESSURE, MIN_PRESSURE, MIN_PRESSURE])]
+        while remaining:
+            here = points[-1][1:]
+            starts = np.array([cell_traversal(c, limits["max_pressure"])[0, 1:] for c in remaining])
+            nearest = int(np.argmin(np.abs(starts - here).max(axis=1)))
+            segment = cell_traversal(remaining[nearest], limits["max_pressure"])
+            t0 = points[-1][0] + max(np.abs(segment[0, 1:] - here).max() / TRANSIT_RATE, 1.0 / FPS)
+            extended = points + [np.concatenate([[t0 + row[0]], row[1:]]) for row in segment]
+            closed = return_home(extended)
+            if closed[-1, 0] > MAX_PROFILE_DURATION or validate_profile(closed[:, 0], closed[:, 1:], limits)[1]:
+                if len(points) > 1: break
+                remaining.pop(nearest) # Fails even on its own
+                dropped += 1
+                continue
+            points = extended
+            remaining.pop(nearest)
+        if len(points) > 1:
+            profiles.append(return_home(points))
+    return profiles, dropped
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Coverage of the (P1, P2, P3, dP/dt) state space across all profiles.")
+    parser.add_argument("paths", nargs="+", help="Dataset roots, profile folders or profile CSVs")
+    parser.add_argument("--propose", action="store_true", help="Write fill profiles for the under-sampled cells")
+    parser.add_argument("--out", default=OUT_DIR)
+    args = parser.parse_args()
+
+    profiles = find_profiles(args.paths)
+    if not profiles:
+        print("No profile CSVs found.")
+        return 1
+    samples = np.vstack([profile_samples(p) for p in profiles])
+    seconds = histogram(samples)
+    total = seconds.size
+
+    print("Coverage of {} profiles ({:.0f} s of data) over {}^3 pressure x {} rate cells:".format(
+        len(profiles), len(samples) / float(FPS), PRESSURE_BINS, len(RATE_LABELS)))
+    print("    Visited:       {:>4} / {} ({:.1%})".format(int((seconds > 0).sum()), total, (seconds > 0).mean()))
+    print("    Under-sampled: {:>4} (< {:.1f} s)".format(int(((seconds > 0) & (seconds < MIN_SECONDS)).sum()), MIN_SECONDS))
+    print("    Empty:         {:>4}".format(int((seconds == 0).sum())))
+    for r, label in enumerate(RATE_LABELS):
+        layer = seconds[..., r]
+        print("    {:<12} {:>5.1%} of cells visited, {:>8.0f} s".format(label, (layer > 0).mean(), layer.sum()))
+
+    sparse = np.argwhere(seconds < MIN_SECONDS)
+    print("\nMost under-sampled regions (mean pressure, direction):")
+    by_level = {}
+    for cell in sparse:
+        centre, _ = cell_centre(cell)
+        key = (int(round(centre.mean() // 20)), RATE_LABELS[cell[3]])
+        by_level[key] = by_level.get(key, 0) + 1
+    for (level, label), count in sorted(by_level.items(), key=lambda kv: -kv[1])[:10]:
+        print("    {:>3}-{:<3} kPa  {:<12} {} cells".format(level * 20, level * 20 + 20, label, count))
+
+    if args.propose and len(sparse):
+        fills, dropped = propose_fills(sparse)
+        if not os.path.exists(args.out): os.makedirs(args.out)
+        for i, fill in enumerate(fills):
+            save_profile(os.path.join(args.out, "Coverage_Fill_{:02d}.csv".format(i + 1)), fill[:, 0], fill[:, 1:])
+        added = histogram(np.vstack([samples] + [profile_samples(os.path.join(args.out, "Coverage_Fill_{:02d}.csv".format(i + 1))) for i in range(len(fills))]))
+        print("\nProposed {} fill profiles ({:.0f} s of simulation) in: {}".format(len(fills), sum(f[-1, 0] for f in fills), args.out))
+        print("    Cells with >= {:.1f} s: {:.1%} -> {:.1%}".format(MIN_SECONDS, (seconds >= MIN_SECONDS).mean(), (added >= MIN_SECONDS).mean()))
+        if dropped:
+            print("    {} of {} under-sampled cells skipped: no profile within the check_profiles limits can visit them".format(dropped, len(sparse)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
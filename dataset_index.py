@@ -0,0 +1,289 @@
+import io
+import os
+import re
+import sys
+import glob
+import json
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# --- CONFIGURATION (DATASET INDEX) ---
+# ==========================================
+INDEX_FILE = "dataset_index.sqlite"
+SCAN_BLOCK = 64 * 1024 * 1024   # Bytes read per block while locating frame boundaries
+FPS = 30
+
+CASE_FOLDER = re.compile(r"Case_(\d+)_(.+)$")
+GRID_NAME = re.compile(r"3bellows_([\d.]+)_([\d.]+)_([\d.]+)$")
+FAILURE_LINE = re.compile(r"(?:Random\s+)?Case\s+(\d+)(?::\s*P1=([\d.eE+-]+),\s*P2=([\d.eE+-]+),\s*P3=([\d.eE+-]+))?\s*\|\s*Error:\s*(.*)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY, path TEXT UNIQUE, name TEXT
+);
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY, run_id INTEGER, case_num INTEGER, folder TEXT UNIQUE, base_name TEXT,
+    p1 REAL, p2 REAL, p3 REAL, status TEXT, error TEXT,
+    node_csv TEXT, node_csv_size INTEGER, node_csv_mtime REAL, header TEXT,
+    profile_csv TEXT, tip_csv TEXT, videos TEXT,
+    frames INTEGER, rows_per_frame INTEGER, duration REAL, fps REAL, variant TEXT
+);
+CREATE TABLE IF NOT EXISTS frames (
+    case_id INTEGER, frame INTEGER, time REAL, offset INTEGER, length INTEGER, rows INTEGER,
+    PRIMARY KEY (case_id, frame)
+);
+CREATE INDEX IF NOT EXISTS cases_by_peaks ON cases (p1, p2, p3);
+"""
+
+# ==========================================
+# --- FRAME BOUNDARY SCAN ---
+# ==========================================
+def line_time(raw_line):
+    return float(raw_line.split(b",", 1)[0])
+
+def scan_frames_slow(csv_path):
+    """Line-by-line fallback: one (time, offset, length, rows) entry per block of equal timestamps."""
+    frames = []
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        offset = len(header)
+        current, start, rows = None, offset, 0
+        for line in f:
+            if not line.strip():
+                offset += len(line)
+                continue
+            t = line_time(line)
+            if t != current:
+                if current is not None:
+                    frames.append((current, start, offset - start, rows))
+                current, start, rows = t, offset, 0
+            rows += 1
+            offset += len(line)
+        if current is not None:
+            frames.append((current, start, offset - start, rows))
+    return header.decode().strip(), frames
+
+def scan_frames(csv_path):
+    """Locates every frame's byte range without parsing values.
+
+    The exporters write the same node set every frame, so after counting the rows of the first frame
+    the remaining boundaries are found by counting newlines block by block with numpy. Every boundary
+    is then confirmed by its timestamp; anything irregular falls back to the line-by-line scan.
+    """
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        first_time, rows_per_frame = None, 0
+        for line in f:
+            t = line_time(line)
+            if first_time is None: first_time = t
+            if t != first_time: break
+            rows_per_frame += 1
+    if rows_per_frame == 0:
+        return header.decode().strip(), []
+
+    starts, line_no = [], 0
+    with open(csv_path, "rb") as f:
+        f.seek(len(header))
+        base = len(header)
+        while True:
+            block = f.read(SCAN_BLOCK)
+            if not block: break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            # Offset of the line that starts after each newline in this block
+            next_starts = base + newlines + 1
+            line_numbers = line_no + 1 + np.arange(len(newlines))
+            starts.extend(next_starts[line_numbers % rows_per_frame == 0].tolist())
+            line_no += len(newlines)
+            base += len(block)
+        file_end = base
+
+    boundaries = [len(header)] + [s for s in starts if s < file_end]
+    frames = []
+    with open(csv_path, "rb") as f:
+        times = []
+        for b in boundaries:
+            f.seek(b)
+            times.append(line_time(f.readline()))
+        for i, b in enumerate(boundaries):
+            end = boundaries[i + 1] if i + 1 < len(boundaries) else file_end
+            rows = rows_per_frame if i + 1 < len(boundaries) else (line_no - rows_per_frame * i)
+            frames.append((times[i], b, end - b, rows))
+
+    regular = all(times[i] < times[i + 1] for i in range(len(times) - 1))
+    if regular and len(frames) > 1:
+        # The row before each boundary must still belong to the previous frame
+        with open(csv_path, "rb") as f:
+            for i in range(1, len(boundaries)):
+                f.seek(max(boundaries[i] - 256, 0))
+                tail = f.read(boundaries[i] - max(boundaries[i] - 256, 0)).rstrip(b"\r\n").rsplit(b"\n", 1)[-1]
+                if line_time(tail) != times[i - 1]:
+                    regular = False
+                    break
+    if not regular or frames[-1][3] <= 0:
+        return scan_frames_slow(csv_path)
+    return header.decode().strip(), frames
+
+# ==========================================
+# --- INDEX BUILD ---
+# ==========================================
+def profile_variant(duration, frames):
+    """Names the profile family by its length, e.g. '2s' for the 60-frame recovery runs."""
+    if duration is None: return None
+    return "{:g}s".format(round(duration))
+
+def read_failures(run):
+    failures = {}
+    log = os.path.join(run, "failed_cases.txt")
+    if os.path.exists(log):
+        with open(log, "r") as f:
+            for line in f:
+                m = FAILURE_LINE.search(line)
+                if m:
+                    peaks = tuple(float(v) for v in m.group(2, 3, 4)) if m.group(2) else (None, None, None)
+                    failures[int(m.group(1))] = (peaks, m.group(5).strip())
+    return failures
+
+def index_case(conn, run_id, folder, case_num, base_name):
+    """Indexes one case folder (or a run folder that holds its outputs directly). Unchanged files are skipped."""
+    node_csvs = glob.glob(os.path.join(folder, "*_NodeData.csv"))
+    profile = glob.glob(os.path.join(folder, "*_PressureProfile.csv"))
+    tip = glob.glob(os.path.join(folder, "*_TipDisplacement.csv"))
+    videos = sorted(os.path.basename(v) for v in glob.glob(os.path.join(folder, "*.avi")))
+    if not (node_csvs or tip):
+        return False
+
+    node_csv = node_csvs[0] if node_csvs else None
+    size = os.path.getsize(node_csv) if node_csv else None
+    mtime = os.path.getmtime(node_csv) if node_csv else None
+    row = conn.execute("SELECT id, node_csv_size, node_csv_mtime FROM cases WHERE folder = ?", (folder,)).fetchone()
+    if row and row[1] == size and row[2] == mtime:
+        return False
+
+    m = GRID_NAME.search(base_name or "")
+    peaks = tuple(float(v) for v in m.groups()) if m else (None, None, None)
+
+    header, frames = scan_frames(node_csv) if node_csv else (None, [])
+    duration = frames[-1][0] if frames else None
+    n_frames = len(frames) if frames else None
+    status = "complete" if (node_csv and frames and len(videos) >= 4) else "partial"
+
+    if row:
+        conn.execute("DELETE FROM frames WHERE case_id = ?", (row[0],))
+        conn.execute("DELETE FROM cases WHERE id = ?", (row[0],))
+    cur = conn.execute(
+        "INSERT INTO cases (run_id, case_num, folder, base_name, p1, p2, p3, status, node_csv, node_csv_size, node_csv_mtime,"
+        " header, profile_csv, tip_csv, videos, frames, rows_per_frame, duration, fps, variant)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (run_id, case_num, folder, base_name, peaks[0], peaks[1], peaks[2], status, node_csv, size, mtime, header,
+         profile[0] if profile else None, tip[0] if tip else None, json.dumps(videos), n_frames,
+         frames[0][3] if frames else None, duration, (n_frames / duration) if duration else None,
+         profile_variant(duration, n_frames)))
+    conn.executemany("INSERT INTO frames VALUES (?, ?, ?, ?, ?, ?)",
+                     [(cur.lastrowid, i, t, off, length, rows) for i, (t, off, length, rows) in enumerate(frames)])
+    return True
+
+def build_index(roots, db_path):
+    """Scans Run_* folders under the given roots into the SQLite catalog (incrementally)."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    updated = 0
+    for root in roots:
+        runs = sorted(glob.glob(os.path.join(root, "Run_*"))) or [root]
+        for run in runs:
+            run = os.path.abspath(run)
+            conn.execute("INSERT OR IGNORE INTO runs (path, name) VALUES (?, ?)", (run, os.path.basename(run)))
+            run_id = conn.execute("SELECT id FROM runs WHERE path = ?", (run,)).fetchone()[0]
+
+            for folder in sorted(glob.glob(os.path.join(run, "Case_*"))):
+                if folder.endswith((".partial", ".replaced")): continue # Staging or superseded folder, never a committed case
+                m = CASE_FOLDER.search(os.path.basename(folder))
+                if m and index_case(conn, run_id, folder, int(m.group(1)), m.group(2)):
+                    updated += 1
+            # Single-run outputs (persistent excitation) live directly in the run folder
+            if index_case(conn, run_id, run, None, os.path.basename(run)):
+                updated += 1
+
+            for case_num, (peaks, error) in read_failures(run).items():
+                existing = conn.execute("SELECT id FROM cases WHERE run_id = ? AND case_num = ?", (run_id, case_num)).fetchone()
+                if existing:
+                    conn.execute("UPDATE cases SET error = ? WHERE id = ?", (error, existing[0]))
+                    continue
+                folder = os.path.join(run, "#failed_case_{}".format(case_num))
+                conn.execute("INSERT OR REPLACE INTO cases (run_id, case_num, folder, p1, p2, p3, status, error) VALUES (?, ?, ?, ?, ?, ?, 'failed', ?)",
+                             (run_id, case_num, folder, peaks[0], peaks[1], peaks[2], error))
+            conn.commit()
+    conn.close()
+    return updated
+
+# ==========================================
+# --- RANDOM-ACCESS LOADER ---
+# ==========================================
+class DatasetIndex:
+    """Seeks straight to any (case, frame) slice of a NodeData CSV using the catalog's byte offsets."""
+
+    def __init__(self, db_path=INDEX_FILE):
+        self.conn = sqlite3.connect(db_path)
+
+    def find_cases(self, p1=None, p2=None, p3=None, variant=None, status="complete"):
+        """Case ids matching the given peaks (Pa) / profile variant / status."""
+        clauses, params = [], []
+        for col, val in (("p1", p1), ("p2", p2), ("p3", p3), ("variant", variant), ("status", status)):
+            if val is not None:
+                clauses.append("{} = ?".format(col))
+                params.append(val)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return [r[0] for r in self.conn.execute("SELECT id FROM cases" + where + " ORDER BY id", params)]
+
+    def case_info(self, case_id):
+        cur = self.conn.execute("SELECT * FROM cases WHERE id = ?", (case_id,))
+        return dict(zip([d[0] for d in cur.description], cur.fetchone()))
+
+    def load_frames(self, case_id, start, stop=None):
+        """DataFrame of frames [start, stop) read with one seek, in the original column layout."""
+        stop = start + 1 if stop is None else stop
+        info = self.conn.execute("SELECT node_csv, header FROM cases WHERE id = ?", (case_id,)).fetchone()
+        rng = self.conn.execute("SELECT MIN(offset), MAX(offset + length) FROM frames WHERE case_id = ? AND frame >= ? AND frame < ?",
+                                (case_id, start, stop)).fetchone()
+        if info is None or rng[0] is None:
+            raise IndexError("Case {} has no frames in [{}, {})".format(case_id, start, stop))
+        with open(info[0], "rb") as f:
+            f.seek(rng[0])
+            raw = f.read(rng[1] - rng[0])
+        return pd.read_csv(io.BytesIO(info[1].encode() + b"\n" + raw), skipinitialspace=True)
+
+    def load_frame(self, case_id, frame):
+        return self.load_frames(case_id, frame, frame + 1)
+
+    def summary(self):
+        return self.conn.execute("SELECT variant, status, COUNT(*), SUM(frames) FROM cases GROUP BY variant, status ORDER BY variant, status").fetchall()
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="SQLite catalog and random-access loader for SoftRobot_Dataset_Hysteresis.")
+    parser.add_argument("--db", default=INDEX_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="Scan dataset roots or Run_* folders (incremental)")
+    b.add_argument("roots", nargs="+")
+    sub.add_parser("summary", help="Case counts per profile variant and status")
+    g = sub.add_parser("get", help="Print one frame of one case")
+    g.add_argument("case_id", type=int)
+    g.add_argument("frame", type=int)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        updated = build_index(args.roots, args.db)
+        print("Indexed {} new or changed cases into {}".format(updated, args.db))
+    elif args.command == "summary":
+        for variant, status, count, frames in DatasetIndex(args.db).summary():
+            print("    {:<6} {:<9} {:>5} cases {:>9} frames".format(variant or "-", status, count, frames or 0))
+    else:
+        print(DatasetIndex(args.db).load_frame(args.case_id, args.frame).to_string(max_rows=20))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
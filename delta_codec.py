@@ -0,0 +1,219 @@
+import io
+import os
+import sys
+import gzip
+import json
+import lzma
+import time
+import zlib
+import base64
+import struct
+import argparse
+import numpy as np
+import pandas as pd
+
+from node_data import CHANNELS, read_node_data
+
+# ==========================================
+# --- CONFIGURATION (DELTA / QUANTIZATION CODEC) ---
+# ==========================================
+# Max absolute reconstruction error per channel: DefX, DefY, DefZ (m), Strain
+ERROR_BOUNDS = [1e-6, 1e-6, 1e-6, 1e-6]
+KEYFRAME_INTERVAL = 30    # One keyframe per second at 30 FPS; a random frame costs at most 29 delta sums
+CODEC = "lzma"            # "lzma" (smaller) or "zlib" (faster)
+
+MAGIC = b"NDZ1"
+EXTENSION = ".ndz"
+
+# ==========================================
+# --- ENCODING ---
+# ==========================================
+def zigzag(q):
+    """Signed -> unsigned so small negative deltas stay small (0, -1, 1, -2 ... -> 0, 1, 2, 3 ...)."""
+    return ((q << 1) ^ (q >> 63)).astype(np.uint64)
+
+def unzigzag(u):
+    u = u.astype(np.uint64)
+    return ((u >> np.uint64(1)).astype(np.int64)) ^ -((u & np.uint64(1)).astype(np.int64))
+
+def pack_block(symbols, codec):
+    """Narrowest unsigned type, byte-plane shuffle (high bytes of small deltas are all zero), then entropy coding."""
+    peak = int(symbols.max()) if symbols.size else 0
+    dtype = np.uint8 if peak < 2 ** 8 else np.uint16 if peak < 2 ** 16 else np.uint32 if peak < 2 ** 32 else np.uint64
+    raw = symbols.astype(dtype)
+    shuffled = raw.view(np.uint8).reshape(-1, raw.itemsize).T.tobytes()
+    payload = lzma.compress(shuffled, preset=6) if codec == "lzma" else zlib.compress(shuffled, 9)
+    return payload, np.dtype(dtype).name
+
+def unpack_block(payload, dtype, count, codec):
+    shuffled = lzma.decompress(payload) if codec == "lzma" else zlib.decompress(payload)
+    itemsize = np.dtype(dtype).itemsize
+    raw = np.frombuffer(shuffled, dtype=np.uint8).reshape(itemsize, count).T.copy().view(dtype).ravel()
+    return raw
+
+def encode(csv_path, out_path=None, bounds=ERROR_BOUNDS, keyframe_interval=KEYFRAME_INTERVAL, codec=CODEC):
+    """Encodes one NodeData CSV: per-channel quantization, then a keyframe plus inter-frame deltas per block.
+
+    Deltas are taken between quantized frames, so errors never accumulate along a block.
+    """
+    out_path = out_path or os.path.splitext(csv_path)[0] + EXTENSION
+    times, node_ids, coords, values = read_node_data(csv_path)
+    steps = 2.0 * np.asarray(bounds, dtype=float)
+    missing = np.isnan(values[:, :, 0])
+    q = np.round(np.nan_to_num(values) / steps).astype(np.int64)   # F x N x 4
+
+    index = []
+    with open(out_path, "wb") as f:
+        f.write(MAGIC)
+        for start in range(0, len(times), keyframe_interval):
+            block = q[start:start + keyframe_interval]
+            deltas = np.concatenate([block[:1], np.diff(block, axis=0)], axis=0)
+            # Channel-major order keeps each channel's (similar-magnitude) deltas adjacent
+            payload, dtype = pack_block(zigzag(deltas.transpose(2, 0, 1).ravel()), codec)
+            mask = zlib.compress(np.packbits(missing[start:start + keyframe_interval]).tobytes(), 9)
+            index.append({"offset": f.tell(), "length": len(payload), "mask_length": len(mask),
+                          "first_frame": start, "frames": len(block), "dtype": dtype})
+            f.write(payload)
+            f.write(mask)
+
+        footer = json.dumps({
+            "codec": codec, "steps": steps.tolist(), "bounds": list(bounds), "channels": CHANNELS,
+            "times": times.tolist(), "blocks": index,
+            "node_ids": base64.b64encode(node_ids.astype(np.int64).tobytes()).decode(),
+            "coords": base64.b64encode(coords.astype(np.float64).tobytes()).decode(),
+        }).encode()
+        f.write(footer)
+        f.write(struct.pack("<Q", len(footer)))
+    return out_path
+
+# ==========================================
+# --- RANDOM-ACCESS DECODING ---
+# ==========================================
+class DeltaReader:
+    """Decodes any frame by unpacking its block and summing deltas from the block's keyframe."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(4) != MAGIC:
+                raise ValueError("{} is not an encoded NodeData file.".format(path))
+            f.seek(-8, os.SEEK_END)
+            length = struct.unpack("<Q", f.read(8))[0]
+            f.seek(-8 - length, os.SEEK_END)
+            meta = json.loads(f.read(length).decode())
+        self.codec = meta["codec"]
+        self.steps = np.array(meta["steps"])
+        self.times = np.array(meta["times"])
+        self.blocks = meta["blocks"]
+        self.node_ids = np.frombuffer(base64.b64decode(meta["node_ids"]), dtype=np.int64)
+        self.coords = np.frombuffer(base64.b64decode(meta["coords"]), dtype=np.float64).reshape(-1, 3)
+        self._cached = (None, None)
+
+    def _block(self, b):
+        if self._cached[0] == b:
+            return self._cached[1]
+        info = self.blocks[b]
+        n_nodes = len(self.node_ids)
+        with open(self.path, "rb") as f:
+            f.seek(info["offset"])
+            payload = f.read(info["length"])
+            mask = f.read(info["mask_length"])
+        count = info["frames"] * n_nodes * 4
+        deltas = unzigzag(unpack_block(payload, info["dtype"], count, self.codec)).reshape(4, info["frames"], n_nodes)
+        values = np.cumsum(deltas, axis=1).transpose(1, 2, 0) * self.steps
+        missing = np.unpackbits(np.frombuffer(zlib.decompress(mask), dtype=np.uint8))[:info["frames"] * n_nodes]
+        values[missing.reshape(info["frames"], n_nodes).astype(bool)] = np.nan
+        self._cached = (b, values)
+        return values
+
+    def frame(self, k):
+        """Values (N x 4) of frame k."""
+        b = int(np.searchsorted([blk["first_frame"] for blk in self.blocks], k, side="right")) - 1
+        return self._block(b)[k - self.blocks[b]["first_frame"]]
+
+    def read_all(self):
+        """(times, node_ids, coords, values F x N x 4), like node_data.read_node_data."""
+        return self.times, self.node_ids, self.coords, np.concatenate([self._block(b) for b in range(len(self.blocks))])
+
+# ==========================================
+# --- BENCHMARK ---
+# ==========================================
+def benchmark(csv_path, bounds=ERROR_BOUNDS, codec=CODEC):
+    """Size, error and decode speed of the codec versus the same CSV gzip'd."""
+    csv_size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as f:
+        gz = gzip.compress(f.read(), 6)
+
+    start = time.time()
+    encoded = encode(csv_path, os.path.splitext(csv_path)[0] + ".bench" + EXTENSION, bounds, codec=codec)
+    encode_s = time.time() - start
+
+    start = time.time()
+    pd.read_csv(io.BytesIO(gzip.decompress(gz)), skipinitialspace=True)
+    gzip_decode_s = time.time() - start
+
+    start = time.time()
+    reader = DeltaReader(encoded)
+    _, _, _, decoded = reader.read_all()
+    decode_s = time.time() - start
+
+    probes = np.random.default_rng(0).integers(0, len(reader.times), 20)
+    start = time.time()
+    for k in probes:
+        DeltaReader(encoded).frame(int(k))
+    frame_ms = 1000 * (time.time() - start) / len(probes)
+
+    _, _, _, original = read_node_data(csv_path)
+    errors = np.nanmax(np.abs(decoded - original), axis=(0, 1))
+
+    size = os.path.getsize(encoded)
+    os.remove(encoded)
+    print("{}".format(os.path.basename(csv_path)))
+    print("    CSV        {:>10.2f} MB".format(csv_size / 1e6))
+    print("    CSV + gzip {:>10.2f} MB ({:.1f}x)   full decode {:.2f} s".format(len(gz) / 1e6, csv_size / float(len(gz)), gzip_decode_s))
+    print("    Delta {:<4} {:>10.2f} MB ({:.1f}x)   full decode {:.2f} s, random frame {:.1f} ms, encode {:.2f} s".format(
+        codec, size / 1e6, csv_size / float(size), decode_s, frame_ms, encode_s))
+    for name, err, bound in zip(CHANNELS, errors, bounds):
+        print("    Max error {:<8} {:.2e} (bound {:.0e})".format(name, err, bound))
+    return size, len(gz)
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Keyframe + quantized-delta encoding of NodeData CSVs.")
+    parser.add_argument("--disp-bound", type=float, default=ERROR_BOUNDS[0], help="Max displacement error (m)")
+    parser.add_argument("--strain-bound", type=float, default=ERROR_BOUNDS[3], help="Max strain error")
+    parser.add_argument("--codec", choices=["lzma", "zlib"], default=CODEC)
+    sub = parser.add_subparsers(dest="command", required=True)
+    e = sub.add_parser("encode")
+    e.add_argument("csvs", nargs="+")
+    d = sub.add_parser("decode")
+    d.add_argument("path")
+    d.add_argument("--frame", type=int, help="Print one frame instead of the summary")
+    b = sub.add_parser("bench", help="Compare against gzip'd CSV")
+    b.add_argument("csvs", nargs="+")
+    args = parser.parse_args()
+    bounds = [args.disp_bound] * 3 + [args.strain_bound]
+
+    if args.command == "encode":
+        for csv_path in args.csvs:
+            out = encode(csv_path, bounds=bounds, codec=args.codec)
+            print("    {} -> {} ({:.1f}x)".format(os.path.basename(csv_path), os.path.basename(out),
+                                                  os.path.getsize(csv_path) / float(os.path.getsize(out))))
+    elif args.command == "decode":
+        reader = DeltaReader(args.path)
+        if args.frame is not None:
+            values = reader.frame(args.frame)
+            print("Time {:.4f} s".format(reader.times[args.frame]))
+            for nid, row in zip(reader.node_ids[:20], values[:20]):
+                print("    {} {}".format(nid, " ".join("{:.6e}".format(v) for v in row)))
+        else:
+            print("{} frames x {} nodes in {} blocks ({})".format(len(reader.times), len(reader.node_ids), len(reader.blocks), reader.codec))
+    else:
+        for csv_path in args.csvs:
+            benchmark(csv_path, bounds, args.codec)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+import os
+import re
+import sys
+import csv
+import glob
+import json
+import argparse
+
+# ==========================================
+# --- CONFIGURATION (FAILURE-RISK MODEL) ---
+# ==========================================
+# The feature and prediction helpers below are plain Python so the Mechanical drivers
+# (IronPython, no numpy) can evaluate the saved model. Only training needs numpy.
+HOLD_PRESSURE = 60.0    # kPa, same creep threshold as check_profiles.py; saved with the model as a feature parameter
+L2_PENALTY = 1.0        # Ridge strength for both the classifier and the solve-time regressor
+CV_FOLDS = 5
+MODEL_FILE = "failure_model.json"
+
+FEATURE_NAMES = ["peak_max", "peak_min", "peak_mean", "max_asymmetry", "max_slew_rate", "hold_energy", "duration"]
+
+FAILURE_LINE = re.compile(r"Case\s+(\d+):\s*P1=([\d.eE+-]+),\s*P2=([\d.eE+-]+),\s*P3=([\d.eE+-]+)\s*\|\s*Error:\s*(.*)")
+# random_walk.py ("Random Case N | Error: ...") and sweep_engine.py ("Case N: <label> | Error: ...") lines
+OTHER_FAILURE_LINE = re.compile(r"^(?:Random )?Case\s+(\d+)\b.*?\|\s*Error:\s*(.*)")
+CASE_FOLDER = re.compile(r"Case_(\d+)_3bellows_([\d.]+)_([\d.]+)_([\d.]+)$")
+FAILED_PROFILE_FOLDER = "failed_profiles" # The drivers keep the applied profile of every failed case here
+
+# Load schedules of the grid drivers (knot times in s, fraction of the peak), by run folder prefix. Used for
+# failures in runs where no case solved, so there is no exported profile to scale.
+GRID_SHAPES = [
+    (re.compile(r"Run_424_Profile_"), [0.0, 4.0, 6.0, 10.0], [0.0, 1.0, 1.0, 0.0]),             # simulate.py
+    (re.compile(r"Run_8s_Profile_"), [0.0, 3.0, 4.0, 7.0, 8.0], [0.0, 1.0, 1.0, 0.0, 0.0]),     # simulate_3131.py
+    (re.compile(r"Run_\d{4}-\d{2}-\d{2}_"), [0.0, 1.0, 2.0], [0.0, 1.0, 0.0]),                  # resume_script.py
+]
+GRID_FPS = 30
+GRID_FLOOR = 0.001 # kPa, the drivers' 1 Pa MIN_PRESSURE
+
+# ==========================================
+# --- FEATURES & PREDICTION (IRONPYTHON-SAFE) ---
+# ==========================================
+def profile_features(times, p1, p2, p3, hold_pressure=HOLD_PRESSURE):
+    """Summarises a sampled 3-channel profile (seconds, kPa) into the model's feature vector."""
+    channels = [p1, p2, p3]
+    peaks = [max(ch) for ch in channels]
+    spread = max(max(a, b, c) - min(a, b, c) for a, b, c in zip(p1, p2, p3))
+
+    max_slew, hold_energy = 0.0, 0.0
+    for i in range(1, len(times)):
+        dt = times[i] - times[i - 1]
+        if dt <= 0: continue
+        for ch in channels:
+            max_slew = max(max_slew, abs(ch[i] - ch[i - 1]) / dt)
+            # Trapezoidal integral of pressure above the creep threshold, summed over the 3 bellows
+            hold_energy += 0.5 * (max(ch[i] - hold_pressure, 0.0) + max(ch[i - 1] - hold_pressure, 0.0)) * dt
+
+    return [max(peaks), min(peaks), sum(peaks) / 3.0, spread, max_slew, hold_energy, times[-1] - times[0]]
+
+def load_model(model_path):
+    """Reads a model saved by train()."""
+    with open(model_path, "r") as f:
+        return json.load(f)
+
+def model_features(model, times, p1, p2, p3):
+    """profile_features with the parameters the model was trained with."""
+    params = model.get("feature_params", {})
+    return profile_features(times, p1, p2, p3, params.get("hold_pressure", HOLD_PRESSURE))
+
+def _standardize(model, features):
+    return [(x - m) / s for x, m, s in zip(features, model["mean"], model["std"])]
+
+def predict_failure_risk(model, features):
+    """Probability (0-1) that a case with these features diverges or times out."""
+    z = model["classifier"]["bias"] + sum(w * x for w, x in zip(model["classifier"]["weights"], _standardize(model, features)))
+    z = max(min(z, 50.0), -50.0)
+    return 1.0 / (1.0 + 2.718281828459045 ** (-z))
+
+def predict_solve_time(model, features):
+    """Expected wall-clock solve time in seconds for a case that does converge."""
+    log_t = model["regressor"]["bias"] + sum(w * x for w, x in zip(model["regressor"]["weights"], _standardize(model, features)))
+    return 2.718281828459045 ** log_t
+
+# ==========================================
+# --- DATASET FROM PAST RUNS ---
+# ==========================================
+def read_pressure_profile(csv_path):
+    """Reads a *_PressureProfile.csv into (times, p1, p2, p3) lists in seconds and kPa."""
+    times, p1, p2, p3 = [], [], [], []
+    with open(csv_path, "r") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if len(row) < 4: continue
+            times.append(float(row[0])); p1.append(float(row[1])); p2.append(float(row[2])); p3.append(float(row[3]))
+    return times, p1, p2, p3
+
+def scaled_profile(template, peaks):
+    """Rebuilds a grid case's profile by scaling each channel of a solved case from the same run."""
+    times, t1, t2, t3 = template
+    out = [times]
+    for ch, peak in zip([t1, t2, t3], peaks):
+        ch_peak = max(ch)
+        ch_floor = min(ch)
+        if ch_peak - ch_floor <= 0:
+            # Channel held at the floor in the template, so its shape is unknown; assume it follows the busiest channel
+            ref = max([t1, t2, t3], key=lambda c: max(c) - min(c))
+            ch, ch_peak, ch_floor = ref, max(ref), min(ref)
+        out.append([ch_floor + (v - ch_floor) * (peak - ch_floor) / max(ch_peak - ch_floor, 1e-12) for v in ch])
+    return out
+
+def _interpolate(t, knots, values):
+    for i in range(1, len(knots)):
+        if t <= knots[i]:
+            return values[i - 1] + (values[i] - values[i - 1]) * (t - knots[i - 1]) / (knots[i] - knots[i - 1])
+    return values[-1]
+
+def grid_profile(run, peaks):
+    """Rebuilds a grid case's profile from its driver's schedule, or None if the run is not a known grid run."""
+    name = os.path.basename(os.path.normpath(run))
+    for pattern, knots, shape in GRID_SHAPES:
+        if not pattern.match(name): continue
+        frames = int(round(knots[-1] * GRID_FPS))
+        times = [knots[-1] * i / float(frames) for i in range(frames + 1)]
+        return [times] + [[GRID_FLOOR + (peak - GRID_FLOOR) * _interpolate(t, knots, shape) for t in times] for peak in peaks]
+    return None
+
+def read_solve_log(run):
+    """Returns {case_num: (status, solve_seconds)} from the driver's solve_log.csv, if the run has one."""
+    log_path = os.path.join(run, "solve_log.csv")
+    entries = {}
+    if not os.path.exists(log_path):
+        return entries
+    with open(log_path, "r") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if len(row) < 6: continue
+            entries[int(row[0])] = (row[4].strip(), float(row[5]))
+    return entries
+
+def collect_dataset(run_folders):
+    """Builds (features, failed, solve_seconds) rows from every failure log, solve log and exported case.
+
+    A failed case's profile is the copy the driver kept in failed_profiles/. Grid failures logged without one
+    are rebuilt by scaling a solved case of the same run, or from the driver's schedule; anything else (random
+    walks and sweep cases from before failed_profiles/) cannot be rebuilt and is counted and left out.
+    """
+    rows, unrecoverable = [], 0
+    for run in run_folders:
+        solve_log = read_solve_log(run)
+        cases = {}
+        template = None
+
+        for path in sorted(glob.glob(os.path.join(run, FAILED_PROFILE_FOLDER, "Case_*_PressureProfile.csv"))):
+            cases[int(os.path.basename(path).split("_")[1])] = (read_pressure_profile(path), 1)
+
+        for folder in sorted(glob.glob(os.path.join(run, "Case_*"))):
+            if folder.endswith((".partial", ".replaced")): continue # Staging or superseded folder, never a committed case
+            profiles = glob.glob(os.path.join(folder, "*_PressureProfile.csv"))
+            if not profiles: continue
+            case_num = int(os.path.basename(folder).split("_")[1])
+            profile = read_pressure_profile(profiles[0])
+            cases[case_num] = (profile, 0) # A committed folder outranks a failed_profiles/ copy from an earlier session
+            if template is None and CASE_FOLDER.search(os.path.basename(folder)):
+                template = profile
+
+        failure_log = os.path.join(run, "failed_cases.txt")
+        if os.path.exists(failure_log):
+            with open(failure_log, "r") as f:
+                for line in f:
+                    grid = FAILURE_LINE.search(line)
+                    m = grid or OTHER_FAILURE_LINE.search(line)
+                    if not m: continue
+                    case_num = int(m.group(1))
+                    if case_num in cases or m.groups()[-1].startswith("Stopped"): continue # Stops never attempted the solve
+                    profile = None
+                    if grid:
+                        peaks = [float(v) / 1000.0 for v in grid.group(2, 3, 4)]
+                        profile = scaled_profile(template, peaks) if template is not None else grid_profile(run, peaks)
+                    if profile is None:
+                        unrecoverable += 1
+                        continue
+                    cases[case_num] = (profile, 1)
+
+        for case_num, (profile, failed) in cases.items():
+            status, seconds = solve_log.get(case_num, (None, float("nan")))
+            if status is not None:
+                failed = 0 if status == "Success" else 1
+            rows.append((profile_features(*profile), failed, seconds))
+
+    if unrecoverable:
+        print("Warning: {} failed cases have no saved profile and no known schedule; they are left out of the dataset.".format(unrecoverable))
+    return rows
+
+# ==========================================
+# --- TRAINING ---
+# ==========================================
+def fit_logistic(X, y):
+    """L2-regularised logistic regression by Newton's method (IRLS), on standardized features."""
+    import numpy as np
+    Xb = np.hstack([np.ones((len(X), 1)), X])
+    w = np.zeros(Xb.shape[1])
+    penalty = L2_PENALTY * np.eye(Xb.shape[1])
+    penalty[0, 0] = 0.0 # Never shrink the bias
+    for _ in range(50):
+        p = 1.0 / (1.0 + np.exp(-np.clip(Xb @ w, -50, 50)))
+        grad = Xb.T @ (p - y) + penalty @ w
+        hess = (Xb * (p * (1 - p))[:, None]).T @ Xb + penalty
+        step = np.linalg.solve(hess, grad)
+        w -= step
+        if np.abs(step).max() < 1e-8: break
+    return w
+
+def fit_ridge(X, y):
+    """Closed-form ridge regression, on standardized features."""
+    import numpy as np
+    Xb = np.hstack([np.ones((len(X), 1)), X])
+    penalty = L2_PENALTY * np.eye(Xb.shape[1])
+    penalty[0, 0] = 0.0
+    return np.linalg.solve(Xb.T @ Xb + penalty, Xb.T @ y)
+
+def cross_validate(X, y):
+    """K-fold accuracy and recall of the failure classifier."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    folds = np.array_split(rng.permutation(len(y)), min(CV_FOLDS, len(y)))
+    correct, caught = 0, 0
+    for fold in folds:
+        train_idx = np.setdiff1d(np.arange(len(y)), fold)
+        if len(np.unique(y[train_idx])) < 2: continue
+        w = fit_logistic(X[train_idx], y[train_idx])
+        pred = (np.hstack([np.ones((len(fold), 1)), X[fold]]) @ w) > 0
+        correct += (pred == y[fold]).sum()
+        caught += (pred & (y[fold] == 1)).sum()
+    return correct / float(len(y)), caught / float(max(y.sum(), 1))
+
+def train(run_folders, model_path):
+    """Fits the failure classifier and solve-time regressor and saves both as one JSON model."""
+    import numpy as np
+    rows = collect_dataset(run_folders)
+    if not rows:
+        print("No cases found in the given run folders.")
+        return None
+
+    X = np.array([r[0] for r in rows], dtype=float)
+    y = np.array([r[1] for r in rows], dtype=float)
+    seconds = np.array([r[2] for r in rows], dtype=float)
+    print("Dataset: {} cases, {} failed, {} with recorded solve times.".format(len(y), int(y.sum()), int(np.isfinite(seconds).sum())))
+
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    std[std == 0] = 1.0
+    Xs = (X - mean) / std
+
+    if 0 < y.sum() < len(y):
+        w_cls = fit_logistic(Xs, y)
+        acc, recall = cross_validate(Xs, y)
+        print("Classifier {}-fold CV: accuracy {:.1%}, failures caught {:.1%}".format(CV_FOLDS, acc, recall))
+    else:
+        # Every case went the same way, so the best we can do is the base rate
+        base = min(max(y.mean(), 1e-3), 1 - 1e-3)
+        w_cls = np.zeros(X.shape[1] + 1)
+        w_cls[0] = np.log(base / (1 - base))
+        print("Only one outcome present; classifier falls back to the base failure rate.")
+
+    timed = np.isfinite(seconds) & (y == 0) & (seconds > 0)
+    if timed.sum() > X.shape[1]:
+        w_reg = fit_ridge(Xs[timed], np.log(seconds[timed]))
+        resid = np.log(seconds[timed]) - np.hstack([np.ones((timed.sum(), 1)), Xs[timed]]) @ w_reg
+        print("Solve-time regressor: RMS error x{:.2f} on {} solved cases".format(float(np.exp(np.sqrt(np.mean(resid ** 2)))), int(timed.sum())))
+    else:
+        w_reg = np.zeros(X.shape[1] + 1)
+        w_reg[0] = np.log(np.nanmedian(seconds[timed])) if timed.any() else 0.0
+        print("Too few solve_log.csv timings; regressor predicts the median solve time.")
+
+    model = {
+        "features": FEATURE_NAMES,
+        "mean": mean.tolist(),
+        "std": std.tolist(),
+        "classifier": {"bias": float(w_cls[0]), "weights": w_cls[1:].tolist()},
+        "regressor": {"bias": float(w_reg[0]), "weights": w_reg[1:].tolist()},
+        "feature_params": {"hold_pressure": HOLD_PRESSURE},
+        "num_cases": int(len(y)),
+        "num_failed": int(y.sum()),
+    }
+    with open(model_path, "w") as f:
+        json.dump(model, f, indent=2)
+    print("Model saved to: " + model_path)
+    return model
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Trains a failure-risk / solve-time model from past Run_* folders.",
+                                     epilog="simulate.py loads failure_model.json from the dataset folder, solves the safest cases first and skips those above MAX_FAILURE_RISK.")
+    parser.add_argument("runs", nargs="+", help="Run_* folders, or a dataset root containing them")
+    parser.add_argument("--model", default=MODEL_FILE, help="Where to write the JSON model")
+    args = parser.parse_args()
+
+    run_folders = []
+    for path in args.runs:
+        nested = sorted(glob.glob(os.path.join(path, "Run_*")))
+        run_folders.extend(nested if nested else [path])
+
+    return 0 if train(run_folders, args.model) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import os
+import sys
+import types
+import struct
+import tempfile
+
+# ==========================================
+# --- CONFIGURATION (FAKE MECHANICAL) ---
+# ==========================================
+# A CPython stand-in for the parts of ExtAPI the drivers touch, so sweep_engine.py can be dry-run without
+# Mechanical (batch_run.py --dry-run). The "solve" is instant and the results come from a linear toy model.
+MESH_SHAPE = (4, 4, 6)     # Nodes along x, y, z
+MESH_SPACING = 0.01        # m
+COMPLIANCE = 2e-7          # m of deflection per Pa at the tip
+# Solves fail when any bellow exceeds this pressure (Pa), to exercise the failure paths; unset = never fail
+FAIL_ABOVE = float(os.environ.get("SOFTROBOT_FAKE_FAIL_ABOVE") or "inf")
+# Every working-set reading grows by SOFTROBOT_FAKE_LEAK_MB, to exercise the leak watch and relaunch; unset = flat
+BASE_WORKING_SET_GB = 2.0
+# Material of the fake bellows; change SOFTROBOT_FAKE_MATERIAL to check that the result cache keys on the model
+MATERIAL = os.environ.get("SOFTROBOT_FAKE_MATERIAL") or "Ecoflex 00-30"
+
+# ==========================================
+# --- .NET / ENUM STAND-INS ---
+# ==========================================
+class Enum(object):
+    def __init__(self, *names):
+        for name in names:
+            setattr(self, name, name)
+
+class Quantity(object):
+    """Quantity("4 [s]"), Quantity(4, "s") or Quantity(4.0)."""
+    def __init__(self, value, unit=None):
+        if isinstance(value, str) and unit is None:
+            number, _, rest = value.partition("[")
+            value, unit = float(number), rest.rstrip("] ")
+        self.Value = float(value)
+        self.Unit = unit
+
+    def __repr__(self):
+        return "Quantity({} [{}])".format(self.Value, self.Unit)
+
+class Vector3D(object):
+    def __init__(self, x, y, z):
+        self.X, self.Y, self.Z = x, y, z
+
+def make_system():
+    system = types.ModuleType("System")
+    system.Environment = types.SimpleNamespace(
+        GetEnvironmentVariable=os.environ.get,
+        GetFolderPath=lambda folder: tempfile.gettempdir(),
+        SpecialFolder=types.SimpleNamespace(Desktop="Desktop"),
+        ProcessorCount=os.cpu_count() or 1,
+    )
+    system.GC = types.SimpleNamespace(Collect=lambda: None, GetTotalMemory=lambda force: 0)
+    system.Diagnostics = types.SimpleNamespace(Process=types.SimpleNamespace(GetCurrentProcess=current_process, GetProcessesByName=lambda name: []))
+    return system
+
+process_samples = [0] # Working-set readings since the fake Mechanical "started"
+
+def current_process():
+    process_samples[0] += 1
+    leak_gb = float(os.environ.get("SOFTROBOT_FAKE_LEAK_MB") or "0") / 1000.0
+    working_set = int((BASE_WORKING_SET_GB + leak_gb * process_samples[0]) * 1e9)
+    return types.SimpleNamespace(Refresh=lambda: None, WorkingSet64=working_set, PrivateMemorySize64=working_set, HandleCount=1000)
+
+# ==========================================
+# --- MODEL TREE ---
+# ==========================================
+class Node(object):
+    def __init__(self, nid, x, y, z):
+        self.Id, self.X, self.Y, self.Z = nid, x, y, z
+
+class Collection(list):
+    @property
+    def Count(self):
+        return len(self)
+
+class Load(object):
+    def __init__(self, name):
+        self.Name = name
+        self.Suppressed = False
+        self.Children = []
+        self.Magnitude = types.SimpleNamespace(Inputs=[types.SimpleNamespace(DiscreteValues=[])],
+                                               Output=types.SimpleNamespace(DiscreteValues=[]))
+
+    def value_at(self, t):
+        times = [q.Value for q in self.Magnitude.Inputs[0].DiscreteValues]
+        values = [q.Value for q in self.Magnitude.Output.DiscreteValues]
+        if not times: return 0.0
+        if t <= times[0]: return values[0]
+        for i in range(len(times) - 1):
+            if times[i] <= t <= times[i + 1]:
+                return values[i] + (values[i + 1] - values[i]) * (t - times[i]) / (times[i + 1] - times[i])
+        return values[-1]
+
+class Result(object):
+    """Deformation/strain object whose PlotData is the toy model evaluated at DisplayTime."""
+    def __init__(self, name, model, component):
+        self.Name, self.model, self.component = name, model, component
+        self.DisplayTime = Quantity(0.0, "s")
+        self.DeformationScaling = 1
+        self.Location = None
+        self.PlotData = None
+
+    def evaluate(self):
+        if self.model.Solution.ObjectState != "Solved":
+            self.PlotData = None
+            return
+        t = self.DisplayTime.Value
+        p = [load.value_at(t) for load in self.model.loads]
+        nodes, values = [], []
+        height = MESH_SPACING * (MESH_SHAPE[2] - 1)
+        for node in self.model.MeshData.Nodes:
+            lever = (node.Z / height) ** 2
+            # Each bellow pushes the tip away from its own side; all three extend it
+            dx = COMPLIANCE * lever * (p[0] - 0.5 * (p[1] + p[2]))
+            dy = COMPLIANCE * lever * 0.866 * (p[1] - p[2])
+            dz = 0.2 * COMPLIANCE * lever * sum(p) / 3.0
+            value = {"x": dx, "y": dy, "z": dz, "total": (dx * dx + dy * dy + dz * dz) ** 0.5,
+                     "strain": 1e-6 * sum(p) * (1.0 - node.Z / height)}[self.component]
+            nodes.append(node.Id)
+            values.append(value)
+        self.PlotData = {"Node": nodes, "Values": values}
+
+    def Activate(self):
+        pass
+
+    def EvaluateAllResults(self):
+        self.model.Solution.EvaluateAllResults()
+
+    def ExportAnimation(self, path, fmt):
+        """Writes just the RIFF/AVI header chunks, with the frame count in avih like a real export."""
+        frames = ExtAPI.Graphics.ResultAnimationOptions.NumberOfFrames
+        avih = struct.pack("<14I", 33333, 0, 0, 0x10, frames, 0, 1, 0, 64, 64, 0, 0, 0, 0)
+        hdrl = b"hdrl" + b"avih" + struct.pack("<I", len(avih)) + avih
+        body = b"AVI " + b"LIST" + struct.pack("<I", len(hdrl)) + hdrl
+        with open(path, "wb") as f:
+            f.write(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+class Solution(object):
+    def __init__(self, model):
+        self.Name = "Solution"
+        self.model = model
+        self.ObjectState = "NotSolved"
+        self.Children = [Result("Total Deformation", model, "total"), Result("Deformation X", model, "x"),
+                         Result("Deformation Y", model, "y"), Result("Deformation Z", model, "z"),
+                         Result("Equivalent Elastic Strain", model, "strain")]
+
+    def ClearGeneratedData(self):
+        self.ObjectState = "NotSolved"
+
+    def EvaluateAllResults(self):
+        for res in self.Children:
+            res.evaluate()
+
+class AnalysisSettings(object):
+    """Records every step setting so a dry run can be inspected."""
+    def __init__(self):
+        self.Name = "Analysis Settings"
+        self.NumberOfSteps = 1
+        self.steps = {}
+        self.LargeDeflection = False
+        self.LineSearch = None
+        self.SolverType = None
+
+    def _set(self, key, step, value):
+        self.steps.setdefault(step, {})[key] = value
+
+    def SetStepEndTime(self, step, q): self._set("end_time", step, q.Value)
+    def SetAutomaticTimeStepping(self, step, v): self._set("auto", step, v)
+    def SetInitialSubsteps(self, step, n): self._set("initial", step, n)
+    def SetMinimumSubsteps(self, step, n): self._set("minimum", step, n)
+    def SetMaximumSubsteps(self, step, n): self._set("maximum", step, n)
+
+class Analysis(object):
+    def __init__(self):
+        self.AnalysisSettings = AnalysisSettings()
+        self.loads = [Load("Pressure"), Load("Pressure 2"), Load("Pressure 3")]
+        self.Children = [types.SimpleNamespace(Name="Fixed Support", Suppressed=False, Children=[])] + self.loads
+        nx, ny, nz = MESH_SHAPE
+        nodes = [Node(1 + i + nx * (j + ny * k), i * MESH_SPACING, j * MESH_SPACING, k * MESH_SPACING)
+                 for k in range(nz) for j in range(ny) for i in range(nx)]
+        self.MeshData = types.SimpleNamespace(Nodes=Collection(nodes), Elements=Collection(range((nx - 1) * (ny - 1) * (nz - 1))))
+        self.Solution = Solution(self)
+        self.WorkingDir = tempfile.gettempdir()
+        self.solve_count = 0
+
+    def Solve(self):
+        self.solve_count += 1
+        peak = max(q.Value for load in self.loads for q in load.Magnitude.Output.DiscreteValues)
+        self.Solution.ObjectState = "SolveFailed" if peak > FAIL_ABOVE else "Solved"
+
+    def AddCommandSnippet(self):
+        snippet = types.SimpleNamespace(Name="Commands (APDL)", Input="")
+        self.Children.append(snippet)
+        return snippet
+
+class Materials(object):
+    def __init__(self):
+        self.Children = [types.SimpleNamespace(Name=MATERIAL, Children=[])]
+
+    def Export(self, path):
+        with open(path, "w") as f:
+            f.write('<EngineeringData exported="2026-01-01T12:00:00"><Material name="{}"/></EngineeringData>\n'.format(MATERIAL))
+
+# ==========================================
+# --- INSTALL ---
+# ==========================================
+ExtAPI = None
+
+def install():
+    """Registers the fake System/Ansys modules and returns the script globals (ExtAPI, Quantity) for runpy."""
+    global ExtAPI
+    enums = types.ModuleType("Ansys.Mechanical.DataModel.Enums")
+    enums.GraphicsAnimationExportFormat = Enum("AVI", "MP4", "GIF")
+    enums.ObjectState = Enum("Solved", "SolveFailed", "NotSolved")
+    enums.AutomaticTimeStepping = Enum("On", "Off", "ProgramControlled")
+    enums.ViewOrientationType = Enum("Front", "Back", "Top", "Bottom", "Left", "Right", "Iso")
+    enums.LineSearchType = Enum("On", "Off", "ProgramControlled")
+    enums.SolverType = Enum("Iterative", "Direct", "ProgramControlled")
+    math = types.ModuleType("Ansys.ACT.Math")
+    math.Vector3D = Vector3D
+    common = types.ModuleType("Ansys.ACT.Interfaces.Common")
+    common.SelectionTypeEnum = Enum("MeshNodes", "GeometryEntities")
+    modules = {"System": make_system(), "Ansys.Mechanical.DataModel.Enums": enums, "Ansys.ACT.Math": math,
+               "Ansys.ACT.Interfaces.Common": common}
+    for name in ["Ansys", "Ansys.Mechanical", "Ansys.Mechanical.DataModel", "Ansys.ACT", "Ansys.ACT.Interfaces"]:
+        modules[name] = types.ModuleType(name)
+    sys.modules.update(modules)
+    process_samples[0] = 0
+
+    analysis = Analysis()
+    camera = types.SimpleNamespace(ViewVector=None, UpVector=None, SceneHeight=None, SetFit=lambda: None)
+    ExtAPI = types.SimpleNamespace(
+        DataModel=types.SimpleNamespace(Project=types.SimpleNamespace(Model=types.SimpleNamespace(
+            Analyses=[analysis], Materials=Materials(), Connections=types.SimpleNamespace(Children=[]),
+            Geometry=types.SimpleNamespace(Children=[types.SimpleNamespace(Name="Bellows", Material=MATERIAL, Suppressed=False, Children=[])])))),
+        Graphics=types.SimpleNamespace(Camera=camera, ResultAnimationOptions=types.SimpleNamespace(NumberOfFrames=0, Duration=None)),
+        Application=types.SimpleNamespace(SolveConfigurations={"My Computer": types.SimpleNamespace(
+            Default=True, SolveProcessSettings=types.SimpleNamespace(MaxNumberOfCores=1, DistributeSolution=False))}),
+    )
+    return {"ExtAPI": ExtAPI, "Quantity": Quantity}
@@ -0,0 +1,145 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+from check_profiles import save_profile, load_limits, validate_profile
+
+# ==========================================
+# --- CONFIGURATION (RANDOM WALK BATCH) ---
+# ==========================================
+# check_profiles.py (with any tuned profile_limits.json) is authoritative for the solver-safe limits: the walks are
+# drawn inside its peak pressure, and a candidate that fails validate_profile is never kept.
+LIMITS = load_limits()
+MIN_PRESSURE = 1.0                              # Pa
+MAX_PRESSURE = min(90000.0, LIMITS["max_pressure"] * 1000.0)  # Pa, random_walk.py's 90 kPa walk ceiling unless tuned lower
+NUM_RANDOM_VIDEOS = 15
+DURATION = 30.0
+WAYPOINT_INTERVAL = 3.0
+FPS = 30
+
+MAX_SLEW_RATE = min(20000.0, LIMITS["max_slew_rate"] * 1000.0)  # Pa/s between waypoints; a full 0-90 kPa swing takes at least 4.5 s
+MAX_ASYMMETRY = min(80000.0, LIMITS["max_asymmetry"] * 1000.0)  # Pa, largest spread between the three bellows at any waypoint
+CONSTRAINT_PASSES = 4     # Forward/backward slew + asymmetry projections before the final check
+
+# Waypoint distribution: "uniform", "beta" (BETA_SHAPE < 1 favours the extremes, > 1 the middle) or "levels"
+DISTRIBUTION = "uniform"
+BETA_SHAPE = 0.7
+LEVELS = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]   # Fractions of the range, the simulate.py grid levels
+
+CANDIDATE_FACTOR = 40     # Candidates generated per video that is kept
+COVERAGE_BINS = 8         # Per axis; coverage = fraction of the 8x8x8 (P1, P2, P3) cells a walk visits
+
+OUT_DIR = "RandomWalk_Profiles"
+
+# ==========================================
+# --- BATCH GENERATION ---
+# ==========================================
+def waypoint_times():
+    times = list(np.arange(0.0, DURATION, WAYPOINT_INTERVAL))
+    return np.array(times + [DURATION])
+
+def draw_waypoints(rng, n_walks, n_points):
+    """(walks, waypoints, 3) raw targets in Pa from the configured distribution."""
+    shape = (n_walks, n_points, 3)
+    if DISTRIBUTION == "beta":
+        u = rng.beta(BETA_SHAPE, BETA_SHAPE, shape)
+    elif DISTRIBUTION == "levels":
+        u = np.asarray(LEVELS)[rng.integers(0, len(LEVELS), shape)]
+    else:
+        u = rng.random(shape)
+    return MIN_PRESSURE + u * (MAX_PRESSURE - MIN_PRESSURE)
+
+def apply_constraints(p, times):
+    """Projects every walk onto the slew and asymmetry limits, vectorized over walks and channels.
+
+    The first and last waypoints are pinned to MIN_PRESSURE like the original generator.
+    """
+    step = MAX_SLEW_RATE * np.diff(times)   # Max change allowed into each waypoint
+    p[:, 0], p[:, -1] = MIN_PRESSURE, MIN_PRESSURE
+    for _ in range(CONSTRAINT_PASSES):
+        for k in range(1, p.shape[1]):            # Forward: reachable from the previous waypoint
+            p[:, k] = np.clip(p[:, k], p[:, k - 1] - step[k - 1], p[:, k - 1] + step[k - 1])
+        for k in range(p.shape[1] - 2, -1, -1):   # Backward: can still get down to the final 1 Pa
+            p[:, k] = np.clip(p[:, k], p[:, k + 1] - step[k], p[:, k + 1] + step[k])
+        mean = p.mean(axis=2, keepdims=True)
+        spread = p.max(axis=2, keepdims=True) - p.min(axis=2, keepdims=True)
+        squeeze = np.minimum(1.0, MAX_ASYMMETRY / np.maximum(spread, 1e-9))
+        p = mean + (p - mean) * squeeze
+        p = np.clip(p, MIN_PRESSURE, MAX_PRESSURE)
+        p[:, 0], p[:, -1] = MIN_PRESSURE, MIN_PRESSURE
+    return p
+
+def feasible(p, times):
+    """Walks within the slew and asymmetry projections that also pass check_profiles (peak, hold energy, ...)."""
+    step = MAX_SLEW_RATE * np.diff(times)
+    slew_ok = np.all(np.abs(np.diff(p, axis=1)) <= step[None, :, None] * (1 + 1e-9), axis=(1, 2))
+    spread_ok = np.all(p.max(axis=2) - p.min(axis=2) <= MAX_ASYMMETRY * (1 + 1e-9), axis=1)
+    ok = slew_ok & spread_ok
+    for i in np.flatnonzero(ok):
+        ok[i] = not validate_profile(times, p[i] / 1000.0, LIMITS)[1]
+    return ok
+
+def visited_cells(p, times):
+    """Boolean (walks, cells) map of the (P1, P2, P3) grid cells each walk passes through at frame rate."""
+    frame_times = np.arange(0.0, DURATION + 1e-9, 1.0 / FPS)
+    idx = np.clip(np.searchsorted(times, frame_times, side="right") - 1, 0, len(times) - 2)
+    w = ((frame_times - times[idx]) / (times[idx + 1] - times[idx]))[None, :, None]
+    dense = p[:, idx] * (1 - w) + p[:, idx + 1] * w                      # walks x frames x 3
+    cells = np.clip(((dense - MIN_PRESSURE) / (MAX_PRESSURE - MIN_PRESSURE) * COVERAGE_BINS).astype(int), 0, COVERAGE_BINS - 1)
+    flat = cells[:, :, 0] * COVERAGE_BINS ** 2 + cells[:, :, 1] * COVERAGE_BINS + cells[:, :, 2]
+    visited = np.zeros((len(p), COVERAGE_BINS ** 3), dtype=bool)
+    visited[np.repeat(np.arange(len(p)), flat.shape[1]), flat.ravel()] = True
+    return visited
+
+def select_for_coverage(visited, count):
+    """Greedy max-coverage: each pick adds the most not-yet-visited cells."""
+    covered = np.zeros(visited.shape[1], dtype=bool)
+    picks, coverage = [], []
+    for _ in range(min(count, len(visited))):
+        gain = (visited & ~covered).sum(axis=1)
+        gain[picks] = -1
+        best = int(np.argmax(gain))
+        picks.append(best)
+        covered |= visited[best]
+        coverage.append(covered.mean())
+    return picks, coverage
+
+def generate(seed, count=NUM_RANDOM_VIDEOS):
+    """Returns (waypoint times, selected walks (count, waypoints, 3) in Pa, cumulative coverage, random baseline)."""
+    rng = np.random.default_rng(seed)
+    times = waypoint_times()
+    candidates = apply_constraints(draw_waypoints(rng, count * CANDIDATE_FACTOR, len(times)), times)
+    candidates = candidates[feasible(candidates, times)]
+    if len(candidates) < count:
+        raise ValueError("Only {} of {} candidates pass check_profiles; raise CANDIDATE_FACTOR".format(len(candidates), count * CANDIDATE_FACTOR))
+    visited = visited_cells(candidates, times)
+    picks, coverage = select_for_coverage(visited, count)
+    baseline = visited[:count].any(axis=0).mean() # What the first `count` unselected walks would have covered
+    return times, candidates[picks], coverage, baseline
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Seeded, constrained, coverage-selected random walks for random_walk.py.",
+                                     epilog="Point PROFILE_DIR in random_walk.py at the output folder.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=NUM_RANDOM_VIDEOS)
+    parser.add_argument("--out", default=OUT_DIR)
+    args = parser.parse_args()
+
+    times, walks, coverage, baseline = generate(args.seed, args.count)
+    if not os.path.exists(args.out): os.makedirs(args.out)
+    for i, walk in enumerate(walks):
+        save_profile(os.path.join(args.out, "RandomWalk_{:02d}.csv".format(i + 1)), times, walk / 1000.0)
+
+    print("Generated {} walks (seed {}) in: {}".format(len(walks), args.seed, args.out))
+    print("    Coverage of the {}^3 pressure grid: {:.1%} (unselected walks: {:.1%})".format(COVERAGE_BINS, coverage[-1], baseline))
+    for target in (0.5, 0.75, 0.9):
+        reached = [i + 1 for i, c in enumerate(coverage) if c >= target * coverage[-1]]
+        print("    {:.0%} of the final coverage after {} walks".format(target, reached[0]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,544 @@
+import os
+import re
+import json
+import time
+import hashlib
+import System
+import result_cache
+from Ansys.Mechanical.DataModel.Enums import SolverType
+from Ansys.ACT.Interfaces.Common import SelectionTypeEnum
+
+# ==========================================
+# --- CONFIGURATION (SHARED MECHANICAL HELPERS) ---
+# ==========================================
+# Model-tree helpers every Mechanical script uses. The drivers and sweep_engine.py import this file from the
+# code folder (SOFTROBOT_CODE_DIR, default the Desktop). ExtAPI is a global of the script Mechanical runs, not
+# of imported modules, so the functions that need it take it as their first argument.
+NODE_SET_FILE = "node_subset_{}{}_{}.json" # Under the dataset root: mode, mode detail, mesh fingerprint
+
+# Solver processes: concurrent Mechanical sessions on one machine split its cores and memory between them
+SOLVE_CONFIGURATION = "My Computer"
+THREADS_PER_CORE = 2             # ProcessorCount counts logical CPUs; MAPDL only scales on physical cores
+DISTRIBUTED_MIN_DURATION = 20.0  # s; shorter cases solve shared-memory, where DMP start-up costs more than it saves
+DISTRIBUTED_MIN_CORES = 4
+INCORE_MIN_MEMORY_GB = 16.0      # RAM share per session needed to keep the equation solver in core
+MACHINE_MEMORY_GB = 64.0         # Fallback if the physical memory cannot be read
+MEMORY_SNIPPET_NAME = "Solver Memory Mode"
+
+# Model signature: properties read from every material/geometry/connection object and every analysis child that
+# is not one of the driven pressure loads, so results are never reused across model edits the mesh does not show
+SIGNATURE_PROPERTIES = ["DataModelObjectCategory", "Suppressed", "Material", "ContactType", "ContactBehavior",
+                        "Formulation", "FrictionCoefficient", "Magnitude", "Input"]
+MATERIAL_EXPORT_FILE = "softrobot_materials_{}.xml"  # In the temp folder; hashed without its timestamps
+
+# Resource governor: the queue pauses before the output or solver scratch drive fills up (after pruning this
+# session's scratch files and evicting least recently used result cache entries)
+MIN_FREE_DISK_GB = 20.0       # Pause the queue below this on the output or scratch volume...
+RESUME_FREE_DISK_GB = 30.0    # ...and resume once this much is free again
+MAX_MEMORY_GB = 48.0          # Mechanical + MAPDL working set that triggers a deep cleanup before the next case
+GOVERNOR_POLL_SECONDS = 60
+MAX_PAUSE_HOURS = 12.0        # Give up (and end the run cleanly) if space never comes back
+SCRATCH_SAMPLE_SECONDS = 30   # Walking the scratch folder is slow, so its size is sampled less often
+SOLVER_PROCESS_NAMES = ["ANSYS", "ansys"]
+# Solver files deleted from the scratch folder after every case (ClearGeneratedData sometimes leaves locked leftovers).
+# The scratch folder is the analysis' own solver working directory, and only files written since start_governor
+# are deleted; without a working directory there is no pruning or scratch sampling at all.
+SCRATCH_PRUNE_EXTENSIONS = [".rst", ".esav", ".osav", ".full", ".emat", ".mode", ".db", ".dbb", ".ldhi", ".rdb"]
+TELEMETRY_FILE = "run_telemetry.csv"  # Per run folder: peak resource usage of every case
+
+# Memory-leak watch: process memory, .NET heap and handles per case phase, with a trend of the post-cleanup working
+# set over the session. The GUI drivers checkpoint and stop; sweep_engine.py stops for a relaunch by batch_run.py.
+LEAK_MEMORY_LIMIT_GB = 60.0   # Working set at which the session is expected to crash
+LEAK_MIN_CASES = 5            # Post-cleanup samples needed before the trend is trusted
+LEAK_STOP_CASES = 3           # Stop when the trend reaches the limit within this many cases
+MEMORY_TRACE_FILE = "memory_trace.csv"          # Per run folder
+CHECKPOINT_FILE = "restart_checkpoint_{}.json"  # Under the dataset root, one per driver
+TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?|\d{1,2}/\d{1,2}/\d{4}( \d{1,2}:\d{2}(:\d{2})?( [AP]M)?)?")
+
+# ==========================================
+# --- MODEL TREE ---
+# ==========================================
+def find_object(parent, name):
+    """Utility to grab an object from the Ansys Mechanical Project Tree by name."""
+    for child in parent.Children:
+        if child.Name == name: return child
+    return None
+
+def mesh_fingerprint(mesh_data):
+    """Cheap identity of the mesh so cached node sets and results are never reused on a re-meshed model."""
+    total = 0.0
+    nodes = mesh_data.Nodes
+    for i in range(nodes.Count):
+        node = nodes[i]
+        total += node.X + 2.0 * node.Y + 3.0 * node.Z
+    return "{}_{}_{:.9e}".format(nodes.Count, mesh_data.Elements.Count, total)
+
+def object_rows(parent, skip_names, recurse=True):
+    """[name, property=value, ...] for the children of parent (and their children), in tree order."""
+    rows = []
+    for child in parent.Children:
+        if child.Name in skip_names: continue
+        row = [child.Name]
+        for prop in SIGNATURE_PROPERTIES:
+            try: value = getattr(child, prop, None)
+            except Exception: value = None
+            if value is not None: row.append("{}={}".format(prop, value))
+        rows.append(row)
+        if recurse: rows.extend(object_rows(child, skip_names))
+    return rows
+
+def material_signature(materials):
+    """Hash of the exported engineering data (timestamps removed), or the material names if it cannot be exported."""
+    try:
+        path = os.path.join(System.IO.Path.GetTempPath(), MATERIAL_EXPORT_FILE.format(os.getpid()))
+        materials.Export(path)
+        with open(path, "r") as f:
+            text = TIMESTAMP.sub("", f.read())
+        os.remove(path)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+    except Exception:
+        return sorted(child.Name for child in materials.Children)
+
+def model_signature(ext_api, analysis_obj, load_names=()):
+    """Short hash of the model setup that changes results without changing the mesh: materials and their assignment,
+    contacts, and the supports/loads of the analysis other than load_names (the pressures every case sets itself)."""
+    model = ext_api.DataModel.Project.Model
+    skip = set(load_names) | set([MEMORY_SNIPPET_NAME, analysis_obj.Solution.Name, analysis_obj.AnalysisSettings.Name])
+    identity = {"analysis": object_rows(analysis_obj, skip, recurse=False)}
+    for name in ("Materials", "Geometry", "Connections"):
+        parent = getattr(model, name, None)
+        if parent is None: continue
+        identity[name.lower()] = material_signature(parent) if name == "Materials" else object_rows(parent, skip)
+    text = json.dumps(identity, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+def load_signature(load_obj):
+    times = ["{:.4f}".format(float(q.Value)) for q in load_obj.Magnitude.Inputs[0].DiscreteValues]
+    pressures = ["{:.2f}".format(float(q.Value)) for q in load_obj.Magnitude.Output.DiscreteValues]
+    return [times, pressures]
+
+def step_signature(settings):
+    steps = []
+    for step in range(1, settings.NumberOfSteps + 1):
+        steps.append(["{:.4f}".format(float(settings.GetStepEndTime(step).Value)), settings.GetInitialSubsteps(step),
+                      settings.GetMinimumSubsteps(step), settings.GetMaximumSubsteps(step)])
+    return [str(settings.SolverType), steps]
+
+def result_cache_identity(ext_api, analysis_obj, mesh_data, loads, export_settings):
+    """Everything that determines a driver case's outputs (result_cache.py), read back from the tree right before the solve."""
+    return {"mesh": mesh_fingerprint(mesh_data),
+            "model": model_signature(ext_api, analysis_obj, [load_obj.Name for load_obj in loads]),
+            "loads": [load_signature(load_obj) for load_obj in loads], "steps": step_signature(analysis_obj.AnalysisSettings),
+            "exports": export_settings}
+
+# ==========================================
+# --- EXPORTED NODE SUBSET ---
+# ==========================================
+def surface_node_ids(ext_api, mesh_data):
+    """Every node that lies on a geometry face, i.e. the outer and inner skin of the bellows."""
+    ids = set()
+    for assembly in ext_api.DataModel.GeoData.Assemblies:
+        for part in assembly.Parts:
+            for body in part.Bodies:
+                for face in body.Faces:
+                    region = mesh_data.MeshRegionById(face.Id)
+                    if region: ids.update(region.NodeIds)
+    return ids
+
+def named_selection_node_ids(ext_api, mesh_data, name):
+    """Nodes of a named selection scoped either to mesh nodes or to geometry (faces, edges, vertices)."""
+    selections = ext_api.DataModel.Project.Model.NamedSelections
+    ns = find_object(selections, name) if selections else None
+    if ns is None: raise Exception("Named selection '{}' not found".format(name))
+    location = ns.Location
+    if location.SelectionType == SelectionTypeEnum.MeshNodes:
+        return set(location.Ids)
+    ids = set()
+    for geo_id in location.Ids:
+        region = mesh_data.MeshRegionById(geo_id)
+        if region: ids.update(region.NodeIds)
+    return ids
+
+def farthest_point_sample(mesh_data, candidate_ids, count):
+    """Greedy farthest-point sampling: each pick is the candidate farthest from all previous picks."""
+    ids = sorted(candidate_ids)
+    points = []
+    for nid in ids:
+        node = mesh_data.NodeById(nid)
+        points.append((node.X, node.Y, node.Z))
+    if count >= len(ids): return set(ids)
+
+    picked = [0]
+    min_dist = [1e30] * len(ids)
+    while len(picked) < count:
+        px, py, pz = points[picked[-1]]
+        best, best_dist = 0, -1.0
+        for j in range(len(ids)):
+            x, y, z = points[j]
+            d = (x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2
+            if d < min_dist[j]: min_dist[j] = d
+            if min_dist[j] > best_dist: best, best_dist = j, min_dist[j]
+        picked.append(best)
+    return set(ids[j] for j in picked)
+
+node_sets = {}
+
+def select_export_nodes(ext_api, mesh_data, mode, sample_count, named_selection, cache_folder):
+    """Returns the node IDs to export (None = all nodes), computed once per mesh and cached on disk.
+
+    mode is "all", "surface" (nodes on geometry faces), "fps" (sample_count surface nodes spread out by
+    farthest-point sampling) or "named" (the nodes of the named selection called named_selection).
+    """
+    if mode == "all": return None
+    detail = sample_count if mode == "fps" else named_selection if mode == "named" else ""
+    cache_path = os.path.join(cache_folder, NODE_SET_FILE.format(mode, detail, mesh_fingerprint(mesh_data)))
+    if cache_path in node_sets: return node_sets[cache_path]
+
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as f:
+            ids = set(json.load(f))
+    else:
+        print("      [Nodes]: Building '{}' node set (once per mesh)...".format(mode))
+        if mode == "surface":
+            ids = surface_node_ids(ext_api, mesh_data)
+        elif mode == "fps":
+            ids = farthest_point_sample(mesh_data, surface_node_ids(ext_api, mesh_data), sample_count)
+        elif mode == "named":
+            ids = named_selection_node_ids(ext_api, mesh_data, named_selection)
+        else:
+            raise Exception("Unknown NODE_SELECTION '{}'".format(mode))
+        with open(cache_path, "w") as f:
+            json.dump(sorted(ids), f)
+    print("      [Nodes]: Exporting {} of {} nodes ({}).".format(len(ids), mesh_data.Nodes.Count, mode))
+    node_sets[cache_path] = ids
+    return ids
+
+def scope_results_to_nodes(ext_api, results, node_ids):
+    """Scopes the exported results to the node subset so Mechanical only evaluates those nodes."""
+    if node_ids is None: return
+    selection = ext_api.SelectionManager.CreateSelectionInfo(SelectionTypeEnum.MeshNodes)
+    selection.Ids = sorted(node_ids)
+    for res in results:
+        try: res.Location = selection
+        except Exception as e: print("Warning: Could not scope '{}' to the node subset. {}".format(res.Name, e))
+
+# ==========================================
+# --- SOLVER PROCESSES ---
+# ==========================================
+def machine_memory_gb():
+    try:
+        import clr
+        clr.AddReference("Microsoft.VisualBasic")
+        from Microsoft.VisualBasic.Devices import ComputerInfo
+        return ComputerInfo().TotalPhysicalMemory / 1e9
+    except Exception:
+        return MACHINE_MEMORY_GB
+
+def configure_solver_processes(ext_api, analysis_obj, duration, workers=1, max_cores=None):
+    """Sets cores, distributed/shared memory and in-core/out-of-core for a case of `duration` seconds.
+
+    Cores and memory are this session's share of the machine, so `workers` parallel sessions never oversubscribe
+    it. max_cores is the licence cap (4 without HPC packs); None = the session's full share.
+    """
+    workers = max(1, workers)
+    cores = max(1, System.Environment.ProcessorCount // THREADS_PER_CORE // workers)
+    if max_cores: cores = min(cores, max_cores)
+    distributed = duration >= DISTRIBUTED_MIN_DURATION and cores >= DISTRIBUTED_MIN_CORES
+    memory_mode = "INCORE" if machine_memory_gb() / workers >= INCORE_MIN_MEMORY_GB else "OOC"
+    
+    config = ext_api.Application.SolveConfigurations[SOLVE_CONFIGURATION]
+    config.SolveProcessSettings.MaxNumberOfCores = cores
+    config.SolveProcessSettings.DistributeSolution = distributed
+    config.Default = True
+    
+    # The memory mode is an equation-solver option, so it goes in through a command snippet
+    if analysis_obj.AnalysisSettings.SolverType == SolverType.Iterative:
+        command = "PCGOPT,,,,,,{}".format(memory_mode)
+    else:
+        command = "{},,{}".format("DSPOPTION" if distributed else "BCSOPTION", memory_mode)
+    snippet = find_object(analysis_obj, MEMORY_SNIPPET_NAME)
+    if snippet is None:
+        snippet = analysis_obj.AddCommandSnippet()
+        snippet.Name = MEMORY_SNIPPET_NAME
+    snippet.Input = command
+    
+    print("      [Solver]: {} cores, {} memory, {} ({} sessions on {} logical CPUs).".format(
+        cores, "distributed" if distributed else "shared", memory_mode.lower(), workers, System.Environment.ProcessorCount))
+    return cores, distributed, memory_mode
+
+# ==========================================
+# --- RESOURCE GOVERNOR ---
+# ==========================================
+def drive_free_gb(folder):
+    """Free space (GB) on the volume holding the given folder."""
+    try:
+        drive = System.IO.DriveInfo(System.IO.Path.GetPathRoot(folder))
+        return drive.AvailableFreeSpace / 1e9
+    except Exception:
+        return None
+
+def folder_size_gb(folder):
+    total = 0
+    for root, dirs, files in os.walk(folder):
+        for name in files:
+            try: total += os.path.getsize(os.path.join(root, name))
+            except OSError: pass
+    return total / 1e9
+
+def memory_usage_gb():
+    """Working set (GB) of Mechanical plus every running MAPDL solver process."""
+    total = 0
+    me = System.Diagnostics.Process.GetCurrentProcess()
+    me.Refresh()
+    total += me.WorkingSet64
+    for name in SOLVER_PROCESS_NAMES:
+        for proc in System.Diagnostics.Process.GetProcessesByName(name):
+            try: total += proc.WorkingSet64
+            except Exception: pass
+    return total / 1e9
+
+def get_scratch_folder(analysis_obj):
+    """The analysis' solver working directory, or None if Mechanical does not report a usable one.
+
+    There is deliberately no fallback: a shared folder such as %TEMP% must never be walked or pruned.
+    """
+    try:
+        folder = analysis_obj.WorkingDir
+    except Exception:
+        return None
+    if not folder or not os.path.isdir(folder): return None
+    folder = os.path.normcase(os.path.abspath(folder))
+    desktop = System.Environment.GetFolderPath(System.Environment.SpecialFolder.Desktop)
+    shared = [os.path.normcase(os.path.abspath(f)) for f in (System.IO.Path.GetTempPath(), desktop) if f]
+    if folder in shared or os.path.dirname(folder) == folder:
+        return None # The temp folder, the Desktop or a drive root
+    return folder
+
+# One driver session: its output folder, scratch folder, result cache and the current case's peak usage
+governor = {}
+
+def start_governor(analysis_obj, output_folder, cache_dir=None):
+    """Sets up the governor for a driver session; returns the scratch folder (None = no pruning or scratch sampling).
+
+    cache_dir is the result cache evicted from when the output drive runs low (None = no eviction, no Cache(GB) column).
+    Imported modules outlive a script run in Mechanical, so every run starts its own session here.
+    """
+    governor.clear()
+    governor.update({"output": output_folder, "scratch": get_scratch_folder(analysis_obj), "cache": cache_dir, "start": time.time(), "usage": {}})
+    if governor["scratch"] is None:
+        print("Warning: No solver working directory reported; scratch pruning and scratch sampling are off.")
+    return governor["scratch"]
+
+def reset_case_usage():
+    governor["usage"] = {"peak_memory": 0.0, "peak_scratch": 0.0, "min_free_output": 1e9, "min_free_scratch": 1e9, "last_scratch_sample": 0.0}
+    sample_resources()
+
+def sample_resources():
+    """Updates the current case's peak memory / scratch size and lowest free space. Called from the solve loop."""
+    usage, scratch = governor.get("usage"), governor.get("scratch")
+    if not usage: return
+    usage["peak_memory"] = max(usage["peak_memory"], memory_usage_gb())
+    for key, folder in (("min_free_output", governor["output"]), ("min_free_scratch", scratch)):
+        free = drive_free_gb(folder) if folder else None
+        if free is not None: usage[key] = min(usage[key], free)
+    if scratch and time.time() - usage["last_scratch_sample"] > SCRATCH_SAMPLE_SECONDS:
+        usage["peak_scratch"] = max(usage["peak_scratch"], folder_size_gb(scratch))
+        usage["last_scratch_sample"] = time.time()
+
+def prune_scratch_files():
+    """Deletes heavy solver files this session left in the scratch folder; locked files are skipped. Returns GB freed."""
+    freed = 0
+    scratch = governor.get("scratch")
+    if not scratch: return 0.0
+    for root, dirs, files in os.walk(scratch):
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in SCRATCH_PRUNE_EXTENSIONS: continue
+            file_path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(file_path) < governor["start"]: continue # Not written by this session's solves
+                size = os.path.getsize(file_path)
+                os.remove(file_path)
+                freed += size
+            except OSError:
+                pass # Still held by the solver; the next prune gets it
+    return freed / 1e9
+
+def clear_solver_files(solution_obj):
+    """Hard-flushes the RAM and Disk after every case to prevent memory fragmentation. Returns False if it failed."""
+    print("      [Cleanup]: Purging massive solver result files...")
+    try:
+        solution_obj.ClearGeneratedData()
+        System.GC.Collect() # Forces the .NET environment to dump the nodal data from RAM
+        time.sleep(1)
+        freed = prune_scratch_files()
+        print("      [Cleanup]: Disk space recovered ({:.1f} GB of leftover scratch pruned).".format(freed))
+        return True
+    except Exception as e:
+        print("      [Cleanup Warning]: Could not clear data. " + str(e))
+        return False
+
+def lowest_free_disk_gb():
+    scratch = governor.get("scratch")
+    frees = [f for f in (drive_free_gb(governor["output"]), drive_free_gb(scratch) if scratch else None) if f is not None]
+    return min(frees) if frees else None
+
+def wait_for_resources(solution_obj):
+    """Throttles the queue before the next case: cleans up on high memory, pauses while disk space is low.
+
+    Returns False if space did not come back within MAX_PAUSE_HOURS, so the run can stop cleanly.
+    """
+    memory = memory_usage_gb()
+    if memory > MAX_MEMORY_GB:
+        print("      [Governor]: {:.1f} GB in use (limit {:.0f} GB); forcing a deep cleanup.".format(memory, MAX_MEMORY_GB))
+        clear_solver_files(solution_obj)
+        System.GC.WaitForPendingFinalizers()
+        System.GC.Collect()
+
+    free = lowest_free_disk_gb()
+    if free is None or free >= MIN_FREE_DISK_GB: return True
+
+    freed = prune_scratch_files()
+    print("      [Governor]: Only {:.1f} GB free; pruned {:.1f} GB of scratch files.".format(free, freed))
+    cache_dir = governor.get("cache")
+    cache_free = drive_free_gb(cache_dir) if cache_dir and os.path.exists(cache_dir) else None
+    if cache_free is not None and cache_free < RESUME_FREE_DISK_GB:
+        # The result cache shares the output volume; least recently used entries go before the queue pauses
+        cache_gb = result_cache.size_gb(cache_dir)
+        removed = result_cache.evict(cache_dir, max(0.0, cache_gb - (RESUME_FREE_DISK_GB - cache_free)))
+        print("      [Governor]: Evicted {} result cache entries ({:.1f} GB cached).".format(removed, cache_gb))
+    pause_start = time.time()
+    while True:
+        free = lowest_free_disk_gb()
+        if free is None or free >= RESUME_FREE_DISK_GB:
+            print("      [Governor]: {:.1f} GB free, resuming.".format(free or 0))
+            return True
+        if time.time() - pause_start > MAX_PAUSE_HOURS * 3600:
+            print("      [Governor]: Disk space never recovered; stopping the run.")
+            return False
+        print("      [Governor]: Queue paused, {:.1f} GB free (need {:.0f} GB)...".format(free, RESUME_FREE_DISK_GB))
+        time.sleep(GOVERNOR_POLL_SECONDS)
+
+def log_case_telemetry(case_num, peaks, status, case_folder=None):
+    """Appends the case's peak resource usage (peaks: each bellow's peak pressure) to the run's TELEMETRY_FILE."""
+    sample_resources()
+    usage, scratch, cache_dir = governor.get("usage") or {}, governor.get("scratch"), governor.get("cache")
+    output_gb = folder_size_gb(case_folder) if case_folder and os.path.exists(case_folder) else 0.0
+    cache_gb = result_cache.size_gb(cache_dir) if cache_dir else 0.0
+    telemetry_path = os.path.join(governor["output"], TELEMETRY_FILE)
+    is_new = not os.path.exists(telemetry_path)
+    with open(telemetry_path, "a") as f:
+        if is_new: f.write("Case, P1(Pa), P2(Pa), P3(Pa), Status, PeakMemory(GB), PeakScratch(GB), MinFreeOutput(GB), MinFreeScratch(GB), CaseOutput(GB), Cache(GB)\n")
+        f.write("{}, {}, {}, {}, {}, {:.2f}, {:.2f}, {:.1f}, {:.1f}, {:.3f}, {:.2f}\n".format(
+            case_num, peaks[0], peaks[1], peaks[2], status, usage.get("peak_memory", 0.0), usage.get("peak_scratch", 0.0),
+            usage.get("min_free_output", 0.0), usage.get("min_free_scratch", 0.0) if scratch else float("nan"), output_gb, cache_gb))
+
+# ==========================================
+# --- MEMORY-LEAK WATCH ---
+# ==========================================
+def working_set_gb():
+    """Working set (GB) of this Mechanical process."""
+    proc = System.Diagnostics.Process.GetCurrentProcess()
+    proc.Refresh()
+    return proc.WorkingSet64 / 1e9
+
+def fit_trend(values):
+    """Least-squares slope and intercept of values against their index."""
+    n = len(values)
+    mean_x = (n - 1) / 2.0
+    mean_y = sum(values) / float(n)
+    sxx = sum((x - mean_x) ** 2 for x in range(n))
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(range(n), values))
+    slope = sxy / sxx if sxx > 0 else 0.0
+    return slope, mean_y - slope * mean_x
+
+def cases_until_limit(settled, limit_gb):
+    """Cases left before the post-cleanup working set (GB, one sample per case) trends up to limit_gb.
+
+    Returns (cases_left, GB per case); cases_left is None while the trend is flat or falling.
+    """
+    slope, intercept = fit_trend(settled)
+    if slope <= 0: return None, slope
+    return (limit_gb - (intercept + slope * (len(settled) - 1))) / slope, slope
+
+# One session: its trace, the cases it (and the session before a checkpointed stop) handled, and where to checkpoint
+leak_watch = {}
+
+def start_leak_watch(run_folder, checkpoint_path=None, done_cases=(), trace_file=MEMORY_TRACE_FILE,
+                     limit_gb=LEAK_MEMORY_LIMIT_GB, stop_cases=LEAK_STOP_CASES):
+    """Starts the leak watch of a session writing to run_folder.
+
+    checkpoint_path is where finish_case saves the run when it stops (None = no checkpoint; the caller relaunches).
+    done_cases are the cases a checkpointed session already handled (see read_checkpoint).
+    """
+    leak_watch.clear()
+    leak_watch.update({"run_folder": run_folder, "checkpoint": checkpoint_path, "done": list(done_cases), "trace": [],
+                       "trace_path": os.path.join(run_folder, trace_file), "limit": limit_gb, "stop_cases": stop_cases})
+
+def is_done(case_num):
+    """True for cases handled before a checkpointed stop."""
+    return case_num in leak_watch.get("done", ())
+
+def memory_snapshot(case_num, phase):
+    """Records Mechanical's working set, private bytes, managed heap and handle count at one case phase."""
+    proc = System.Diagnostics.Process.GetCurrentProcess()
+    proc.Refresh()
+    snap = {"case": case_num, "phase": phase, "working_set": proc.WorkingSet64 / 1e9, "private": proc.PrivateMemorySize64 / 1e9,
+            "managed": System.GC.GetTotalMemory(False) / 1e9, "handles": proc.HandleCount}
+    leak_watch["trace"].append(snap)
+    is_new = not os.path.exists(leak_watch["trace_path"])
+    with open(leak_watch["trace_path"], "a") as f:
+        if is_new: f.write("Case, Phase, Clock, WorkingSet(GB), PrivateBytes(GB), ManagedHeap(GB), Handles\n")
+        f.write("{}, {}, {}, {:.3f}, {:.3f}, {:.3f}, {}\n".format(case_num, phase, time.strftime("%H:%M:%S"),
+                snap["working_set"], snap["private"], snap["managed"], snap["handles"]))
+    return snap
+
+def check_memory_trend(remaining_cases):
+    """Fits the post-cleanup working set per case; returns the reason to stop if the limit is only a few cases away."""
+    settled = [snap for snap in leak_watch["trace"] if snap["phase"] == "after_cleanup"]
+    if len(settled) < LEAK_MIN_CASES: return None
+    cases_left, slope = cases_until_limit([snap["working_set"] for snap in settled], leak_watch["limit"])
+    handles_slope, _ = fit_trend([snap["handles"] for snap in settled])
+    if cases_left is None: return None
+
+    print("      [Leak Watch]: +{:.0f} MB and {:+.0f} handles per case; limit reached in ~{:.0f} cases.".format(slope * 1000, handles_slope, cases_left))
+    if cases_left <= leak_watch["stop_cases"] and remaining_cases > cases_left:
+        return "Working set +{:.0f} MB per case, {:.0f} GB limit in ~{:.0f} cases".format(slope * 1000, leak_watch["limit"], max(cases_left, 0))
+    if cases_left < remaining_cases:
+        print("      [Leak Watch]: WARNING: the remaining {} cases will not fit in this session.".format(remaining_cases))
+    return None
+
+def finish_case(case_num, remaining_cases):
+    """Post-cleanup bookkeeping shared by every case outcome. Returns the reason to stop the session, or None.
+
+    With a checkpoint path the run is checkpointed first; the script then has to be run again in a new Mechanical.
+    """
+    leak_watch["done"].append(case_num)
+    memory_snapshot(case_num, "after_cleanup")
+    reason = check_memory_trend(remaining_cases)
+    if reason and leak_watch["checkpoint"]:
+        write_checkpoint(reason)
+    return reason
+
+def checkpoint_path(base_folder, driver):
+    return os.path.join(base_folder, CHECKPOINT_FILE.format(driver))
+
+def read_checkpoint(path):
+    """The checkpoint a stopped session left at path ({"run_folder", "done_cases", "reason", "time"}), or None."""
+    if not os.path.exists(path): return None
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+    print("Resuming from checkpoint ({} cases already done): {}".format(len(checkpoint["done_cases"]), checkpoint["reason"]))
+    return checkpoint
+
+def write_checkpoint(reason):
+    """Saves what the next session needs to pick up this run; nothing relaunches Mechanical from the GUI."""
+    with open(leak_watch["checkpoint"], "w") as f:
+        json.dump({"run_folder": leak_watch["run_folder"], "done_cases": leak_watch["done"], "reason": reason,
+                   "time": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+    print("      [Leak Watch]: {}. Checkpoint written to {}. Stopping; close and reopen Mechanical, then run this script again to continue.".format(
+        reason, leak_watch["checkpoint"]))
+
+def clear_checkpoint():
+    """Called once a run finishes, so the next session starts fresh."""
+    path = leak_watch.get("checkpoint")
+    if path and os.path.exists(path): os.remove(path)
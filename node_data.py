@@ -0,0 +1,70 @@
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# --- NODEDATA READING (SHARED BY THE OFFLINE TOOLS) ---
+# ==========================================
+# Every exporter writes the same leading columns:
+# Time(s), NodeID, X_und(m), Y_und(m), Z_und(m), DefX(m), DefY(m), DefZ(m), Strain[, per-frame pressures]
+CHANNELS = ["DefX(m)", "DefY(m)", "DefZ(m)", "Strain"]
+TIP_FRACTION = 0.05 # Nodes within 5% of the free end (along the long axis) form the "tip"
+
+CASE_FOLDER = re.compile(r"Case_(\d+)_3bellows_([\d.]+)_([\d.]+)_([\d.]+)$")
+
+def find_case_folders(run_folders):
+    """Lists every exported Case_* folder (one with a NodeData CSV) across the given Run_* folders."""
+    folders = []
+    for run in run_folders:
+        for folder in sorted(glob.glob(os.path.join(run, "Case_*"))):
+            if folder.endswith((".partial", ".replaced")): continue # Staging or superseded folder, never a committed case
+            if glob.glob(os.path.join(folder, "*_NodeData.csv")):
+                folders.append(folder)
+    return folders
+
+def case_peaks(case_folder):
+    """Parses the (P1, P2, P3) peak pressures in Pa from a grid case folder name, or None."""
+    m = CASE_FOLDER.search(os.path.basename(os.path.normpath(case_folder)))
+    return tuple(float(v) for v in m.group(2, 3, 4)) if m else None
+
+def node_data_path(case_folder):
+    return glob.glob(os.path.join(case_folder, "*_NodeData.csv"))[0]
+
+def read_node_data(csv_path):
+    """Parses a NodeData CSV into arrays: times (F,), node_ids (N,), coords (N x 3), values (F x N x 4).
+
+    Nodes are ordered by ID so every frame lines up, and nodes missing from a frame are NaN.
+    """
+    df = pd.read_csv(csv_path, skipinitialspace=True, usecols=range(9))
+    df.columns = [c.strip() for c in df.columns]
+
+    times, frame_idx = np.unique(df["Time(s)"].to_numpy(), return_inverse=True)
+    node_ids, node_idx = np.unique(df["NodeID"].to_numpy(), return_inverse=True)
+
+    coords = np.empty((len(node_ids), 3))
+    coords[node_idx] = df[["X_und(m)", "Y_und(m)", "Z_und(m)"]].to_numpy()
+
+    values = np.full((len(times), len(node_ids), 4), np.nan)
+    values[frame_idx, node_idx] = df[CHANNELS].to_numpy()
+    return times, node_ids, coords, values
+
+def tip_nodes(coords, values):
+    """Indices of the nodes at the free end: the end of the long axis that actually moves."""
+    axis = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+    lo, hi = coords[:, axis].min(), coords[:, axis].max()
+    band = TIP_FRACTION * (hi - lo)
+    low_end = np.where(coords[:, axis] <= lo + band)[0]
+    high_end = np.where(coords[:, axis] >= hi - band)[0]
+
+    # The fixed base barely moves, so pick the end with the larger mean displacement
+    motion = np.nanmean(np.linalg.norm(values[:, :, :3], axis=2), axis=0)
+    return high_end if np.nanmean(motion[high_end]) >= np.nanmean(motion[low_end]) else low_end
+
+def tip_response(csv_path):
+    """Mean tip displacement vector (m) at the frame of largest tip deflection."""
+    _, _, coords, values = read_node_data(csv_path)
+    tip = tip_nodes(coords, values)
+    tip_disp = np.nanmean(values[:, tip, :3], axis=1)
+    return tip_disp[np.argmax(np.linalg.norm(tip_disp, axis=1))]
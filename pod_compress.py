@@ -0,0 +1,190 @@
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+
+from node_data import find_case_folders, node_data_path, read_node_data
+
+# ==========================================
+# --- CONFIGURATION (POD COMPRESSION) ---
+# ==========================================
+MAX_MODES = 64            # Upper bound on the sweep-wide basis per field
+ERROR_BOUND = 1e-3        # Max RMS reconstruction error per case, as a fraction of the field's sweep-wide peak
+BASIS_FILE = "pod_basis.npz"
+
+# Displacement and strain have unrelated units, so each gets its own basis and error bound
+FIELDS = {"displacement": [0, 1, 2], "strain": [3]}
+
+# ==========================================
+# --- STREAMING SVD ---
+# ==========================================
+class IncrementalSVD:
+    """Sweep-wide POD basis updated one case at a time (Brand / Ross incremental SVD with a moving mean).
+
+    Only the current case and a (MAX_MODES x dim) basis are ever in memory.
+    """
+
+    def __init__(self, max_modes):
+        self.max_modes = max_modes
+        self.n_seen = 0
+        self.mean = None
+        self.components = None
+        self.singular_values = None
+        self.full_scale = 0.0
+
+    def partial_fit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        self.full_scale = max(self.full_scale, float(np.abs(X).max()))
+        m = len(X)
+        batch_mean = X.mean(axis=0)
+        if self.n_seen == 0:
+            stack = X - batch_mean
+            new_mean = batch_mean
+        else:
+            n = self.n_seen
+            new_mean = (n * self.mean + m * batch_mean) / (n + m)
+            # The last row re-centres the old components on the updated mean
+            correction = np.sqrt(n * m / float(n + m)) * (self.mean - batch_mean)
+            stack = np.vstack([self.singular_values[:, None] * self.components, X - batch_mean, correction])
+
+        _, s, vt = np.linalg.svd(stack, full_matrices=False)
+        r = min(self.max_modes, len(s))
+        self.components, self.singular_values = vt[:r], s[:r]
+        self.mean = new_mean
+        self.n_seen += m
+
+# ==========================================
+# --- COMPRESS / DECOMPRESS ---
+# ==========================================
+def field_matrix(values, channels):
+    """Frames x (nodes * channels) snapshot matrix for one field, with missing nodes as zeros."""
+    return np.nan_to_num(values[:, :, channels]).reshape(len(values), -1)
+
+def choose_rank(X, mean, basis, full_scale, bound):
+    """Smallest number of leading modes whose RMS error stays under bound * full_scale.
+
+    Measuring against the sweep-wide peak (not the case's own norm) keeps near-unloaded cases
+    from demanding every mode just to reproduce numerical noise.
+    """
+    centered = X - mean
+    coeffs = centered @ basis.T
+    # Residual energy after k modes = ||centered||^2 - sum of the first k squared coefficient columns
+    residual = np.sum(centered ** 2) - np.concatenate([[0.0], np.cumsum(np.sum(coeffs ** 2, axis=0))])
+    errors = np.sqrt(np.clip(residual, 0.0, None) / X.size) / (full_scale + 1e-30)
+    meets = np.where(errors <= bound)[0]
+    rank = int(meets[0]) if len(meets) else len(basis)
+    return rank, coeffs[:, :rank], float(errors[rank])
+
+def build_basis(folders):
+    """Pass 1: stream every case through one incremental SVD per field."""
+    svds = {name: IncrementalSVD(MAX_MODES) for name in FIELDS}
+    node_ids = coords = None
+    for i, folder in enumerate(folders):
+        _, ids, xyz, values = read_node_data(node_data_path(folder))
+        if node_ids is None:
+            node_ids, coords = ids, xyz
+        elif not np.array_equal(ids, node_ids):
+            raise ValueError("{} has a different node set than the rest of the sweep.".format(folder))
+        for name, channels in FIELDS.items():
+            svds[name].partial_fit(field_matrix(values, channels))
+        print("    Basis pass: {}/{} cases".format(i + 1, len(folders)))
+    return svds, node_ids, coords
+
+def compress(run_folders, out_dir, bound=ERROR_BOUND):
+    """Builds the sweep basis, then stores every case as small per-field coefficient matrices."""
+    folders = find_case_folders(run_folders)
+    if not folders:
+        print("No NodeData found.")
+        return None
+    if not os.path.exists(out_dir): os.makedirs(out_dir)
+
+    svds, node_ids, coords = build_basis(folders)
+    basis_path = os.path.join(out_dir, BASIS_FILE)
+    arrays = {"node_ids": node_ids, "coords": coords}
+    for name, svd in svds.items():
+        arrays[name + "_mean"] = svd.mean.astype(np.float32)
+        arrays[name + "_basis"] = svd.components.astype(np.float32)
+        arrays[name + "_scale"] = svd.full_scale
+    np.savez_compressed(basis_path, **arrays)
+
+    csv_bytes, packed_bytes, worst = 0, os.path.getsize(basis_path), {name: 0.0 for name in FIELDS}
+    for folder in folders:
+        csv_path = node_data_path(folder)
+        times, _, _, values = read_node_data(csv_path)
+        case_arrays = {"times": times, "missing": np.isnan(values[:, :, 0])}
+        ranks = []
+        for name, channels in FIELDS.items():
+            X = field_matrix(values, channels)
+            rank, coeffs, err = choose_rank(X, svds[name].mean, svds[name].components, svds[name].full_scale, bound)
+            case_arrays[name + "_coeffs"] = coeffs.astype(np.float32)
+            worst[name] = max(worst[name], err)
+            ranks.append("{} {} modes ({:.1e})".format(name, rank, err))
+
+        run_name = os.path.basename(os.path.dirname(folder))
+        case_path = os.path.join(out_dir, run_name, os.path.basename(folder) + ".npz")
+        if not os.path.exists(os.path.dirname(case_path)): os.makedirs(os.path.dirname(case_path))
+        np.savez_compressed(case_path, **case_arrays)
+
+        csv_bytes += os.path.getsize(csv_path)
+        packed_bytes += os.path.getsize(case_path)
+        print("    {}: {}".format(os.path.basename(folder), ", ".join(ranks)))
+
+    print("\nCompressed {} cases: {:.1f} MB CSV -> {:.2f} MB ({:.0f}x)".format(
+        len(folders), csv_bytes / 1e6, packed_bytes / 1e6, csv_bytes / float(max(packed_bytes, 1))))
+    for name, err in worst.items():
+        print("    Worst {} RMS error: {:.2e} of full scale (bound {:.0e})".format(name, err, bound))
+    return basis_path
+
+def decompress(case_path, basis_path):
+    """Rebuilds (times, node_ids, coords, values F x N x 4) for one compressed case."""
+    basis = np.load(basis_path)
+    case = np.load(case_path)
+    times = case["times"]
+    n_nodes = len(basis["node_ids"])
+    values = np.empty((len(times), n_nodes, 4))
+    for name, channels in FIELDS.items():
+        coeffs = case[name + "_coeffs"]
+        modes = basis[name + "_basis"][:coeffs.shape[1]]
+        field = coeffs @ modes + basis[name + "_mean"]
+        values[:, :, channels] = field.reshape(len(times), n_nodes, len(channels))
+    values[case["missing"]] = np.nan
+    return times, basis["node_ids"], basis["coords"], values
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Sweep-wide POD compression of NodeData.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("compress")
+    c.add_argument("runs", nargs="+", help="Run_* folders, or a dataset root containing them")
+    c.add_argument("--out", default="NodeData_POD")
+    c.add_argument("--bound", type=float, default=ERROR_BOUND, help="Max RMS error per case as a fraction of full scale")
+    d = sub.add_parser("decompress")
+    d.add_argument("case", help="Compressed Case_*.npz")
+    d.add_argument("--basis", help="pod_basis.npz (default: two folders up from the case)")
+    d.add_argument("--csv", help="Also verify against this original NodeData CSV")
+    args = parser.parse_args()
+
+    if args.command == "compress":
+        run_folders = []
+        for path in args.runs:
+            nested = sorted(glob.glob(os.path.join(path, "Run_*")))
+            run_folders.extend(nested if nested else [path])
+        return 0 if compress(run_folders, args.out, args.bound) else 1
+
+    basis_path = args.basis or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(args.case))), BASIS_FILE)
+    times, node_ids, _, values = decompress(args.case, basis_path)
+    print("Decompressed {} frames x {} nodes".format(len(times), len(node_ids)))
+    if args.csv:
+        _, _, _, original = read_node_data(args.csv)
+        for name, channels in FIELDS.items():
+            ref = np.nan_to_num(original[:, :, channels])
+            scale = float(np.load(basis_path)[name + "_scale"])
+            err = np.sqrt(np.mean((np.nan_to_num(values[:, :, channels]) - ref) ** 2)) / (scale + 1e-30)
+            print("    {} RMS error vs CSV: {:.2e} of full scale".format(name, err))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,88 +1,163 @@
 import os
+import sys
 import System
 import time
 import datetime
-import random
 from Ansys.Mechanical.DataModel.Enums import GraphicsAnimationExportFormat, ObjectState, AutomaticTimeStepping, ViewOrientationType, LineSearchType, SolverType
 from Ansys.ACT.Math import Vector3D 
 
 # ==========================================
 # --- CONFIGURATION (RANDOM WALK PROFILE) ---
 # ==========================================
+# check_profiles.py is authoritative for the solver-safe limits; these are its defaults in Pa
 MIN_PRESSURE = 1       
-MAX_PRESSURE = 100000  
+MAX_PRESSURE = 90000       # Walk ceiling: long wandering walks balloon from creep above 90 kPa, under check_profiles' 100 kPa peak
 
 # Random Walk Specifics
 NUM_RANDOM_VIDEOS = 15     # 15 videos of 30 seconds
 DURATION = 30.0            # 30-second long continuous wandering
 WAYPOINT_INTERVAL = 3.0    # Changes pressure target every 3 seconds to ensure smooth, achievable ramps
+SEED = 0                   # Walk k is drawn from random.Random(SEED + k), so a crashed run can be reproduced
+MAX_SLEW_RATE = 20000.0    # Pa/s between waypoints; a full 0-90 kPa swing takes at least 4.5 s
+MAX_ASYMMETRY = 80000.0    # Pa, largest spread between the three bellows at any waypoint
+# Walks over the sustained-hold limit are redrawn (sweep_spec.py MAX_HOLD_ENERGY); a case that cannot be drawn fails
+RANDOM_WALK = {"seed": SEED, "waypoint_interval": WAYPOINT_INTERVAL, "max_slew_rate": MAX_SLEW_RATE, "max_asymmetry": MAX_ASYMMETRY}
+# Folder of walks written by generate_random_walks.py (seeded, coverage-selected); None = generate here
+PROFILE_DIR = None
+
+# Step planner (step_planner.py): similar-slope waypoints share one analysis step, and substeps follow the pressure change
+STEP_PLANNER = True            # False = one step per breakpoint with the flat 100 initial / 20 minimum substeps
 
 FPS = 30
 VIDEO_FRAMES = int(DURATION * FPS) # Yields exactly 900 frames per video
 
+# Which nodes export_consolidated_data writes: "all", "surface" (nodes on geometry faces),
+# "fps" (NODE_SAMPLE_COUNT surface nodes spread out by farthest-point sampling) or "named" (NODE_NAMED_SELECTION)
+NODE_SELECTION = "all"
+NODE_SAMPLE_COUNT = 500
+NODE_NAMED_SELECTION = "Markers"
+
+# Solver processes: concurrent Mechanical sessions on one machine split its cores and memory between them
+# (the thresholds for distributed and in-core solving are in mechanical_helpers.py)
+WORKER_COUNT = int(System.Environment.GetEnvironmentVariable("SOFTROBOT_WORKER_COUNT") or "1")
+MAX_SOLVER_CORES = None          # Licence cap (4 without HPC packs); None = the session's full share
+
 GROWTH_FACTOR = 2.0     # Keeps the camera bounds identical to the old 125-case dataset
 CAMERA_WAIT_TIME = 0.5 
 
 # Setup output directories
 desktop_path = System.Environment.GetFolderPath(System.Environment.SpecialFolder.Desktop)
+# Shared modules (mechanical_helpers.py, ...) sit in the code folder: SOFTROBOT_CODE_DIR or the Desktop
+CODE_DIR = System.Environment.GetEnvironmentVariable("SOFTROBOT_CODE_DIR") or desktop_path
+if CODE_DIR not in sys.path: sys.path.insert(0, CODE_DIR)
+import mechanical_helpers
+import result_cache
+import case_commit
+import step_planner
+import sweep_spec
 base_folder = os.path.join(desktop_path, "SoftRobot_Dataset_Hysteresis")
 timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 main_output_folder = os.path.join(base_folder, "Run_RandomWalk_" + timestamp)
+# An earlier Run_* folder to finish instead of starting a new one (cases with a _COMPLETE.json marker are skipped)
+RESUME_RUN_FOLDER = None
+if RESUME_RUN_FOLDER: main_output_folder = RESUME_RUN_FOLDER
+
+# A leak-triggered stop leaves a checkpoint and ends the script; nothing relaunches Mechanical from the GUI, so
+# restart it by hand and run this script again to continue that run
+CHECKPOINT_PATH = mechanical_helpers.checkpoint_path(base_folder, "random_walk")
+RESUME_FROM_CHECKPOINT = True
+resume_checkpoint = mechanical_helpers.read_checkpoint(CHECKPOINT_PATH) if RESUME_FROM_CHECKPOINT and not RESUME_RUN_FOLDER else None # An explicit folder wins
+if resume_checkpoint: main_output_folder = resume_checkpoint["run_folder"]
 
 if not os.path.exists(main_output_folder):
     os.makedirs(main_output_folder)
 
 failure_log_path = os.path.join(main_output_folder, "failed_cases.txt")
+failed_profile_folder = os.path.join(main_output_folder, "failed_profiles") # Profiles of failed cases, for failure_model.py
+solve_log_path = os.path.join(main_output_folder, "solve_log.csv")
+
+# Result cache (result_cache.py): finished cases keyed by mesh, model, load schedules, step/solver and export settings,
+# so a case identical to one from any earlier run is copied from the cache instead of solved
+RESULT_CACHE = True
+CACHE_DIR = os.path.join(base_folder, result_cache.CACHE_FOLDER)
+CACHE_MAX_GB = 200.0  # Least recently used cases are evicted beyond this
+CACHE_EXPORT_SETTINGS = ["random_walk.py", FPS, VIDEO_FRAMES, GROWTH_FACTOR, NODE_SELECTION, NODE_SAMPLE_COUNT, NODE_NAMED_SELECTION]
+cache_stats = result_cache.new_stats()
+
+# Resource governor (mechanical_helpers.py): the queue pauses before the output or solver scratch drive fills up,
+# after pruning this session's scratch files and evicting old result cache entries; every case's peak usage goes to
+# run_telemetry.csv (the thresholds are in mechanical_helpers.py)
+
+# Memory-leak watch (mechanical_helpers.py): process memory, .NET heap and handles per case phase go to memory_trace.csv,
+# and the session checkpoints and stops when the post-cleanup working set trends into the limit within a few cases
+
+# Case commits (case_commit.py): exports go to "<case folder>.partial", are verified and fsynced, get a _COMPLETE.json marker with
+# checksums and are renamed into place. Resume skips every case folder that has the marker.
+CASE_VIEWS = ["Side1", "Side2", "Side3", "Top"]
 print("Saving Data to: " + main_output_folder)
 
 # ==========================================
 # --- HELPER FUNCTIONS ---
 # ==========================================
-def setup_analysis_steps(analysis, times_list):
-    """Configures the Newton-Raphson solver for dynamic multi-step waypoints."""
+def setup_analysis_steps(analysis, step_plan):
+    """Configures the Newton-Raphson solver from a list of (end time, initial substeps, minimum substeps)."""
     print("--- Configuring Analysis Steps for Random Walk ---")
     settings = analysis.AnalysisSettings
     
-    # Create a solver step for every single waypoint in the random walk
-    num_steps = len(times_list) - 1
+    num_steps = len(step_plan)
     settings.NumberOfSteps = num_steps
     
     for i in range(num_steps):
         step_num = i + 1
-        settings.SetStepEndTime(step_num, Quantity(str(times_list[step_num]) + " [s]"))
+        settings.SetStepEndTime(step_num, Quantity(str(step_plan[i][0]) + " [s]"))
         
     settings.LargeDeflection = True
     settings.LineSearch = LineSearchType.On
     settings.SolverType = SolverType.Iterative 
     
     for step in range(1, num_steps + 1):
+        _, initial, minimum = step_plan[step - 1]
         settings.SetAutomaticTimeStepping(step, AutomaticTimeStepping.On)
-        # Gentler initial start (100 substeps) prevents shockwaves on extreme asymmetric bends
-        settings.SetInitialSubsteps(step, 100)  
-        settings.SetMinimumSubsteps(step, 20)   
+        # Gentle starts scale with how hard the step pushes; full-range ramps keep the 100-substep start
+        settings.SetInitialSubsteps(step, initial)  
+        settings.SetMinimumSubsteps(step, minimum)   
         # Massive bisection headroom (5000) so the solver can survive element crushing
         settings.SetMaximumSubsteps(step, 5000) 
         
-    print("    Steps configured. Iterative Solver & Line Search ON.")
+    print("    {} steps configured. Iterative Solver & Line Search ON.".format(num_steps))
 
-def generate_random_trajectory():
-    """Builds a continuous, random path for a single bellow that starts/ends at 1 Pa."""
-    times = [0.0]
-    pressures = [MIN_PRESSURE]
-    
-    current_time = WAYPOINT_INTERVAL
-    while current_time < DURATION:
-        times.append(current_time)
-        # Pick a random pressure between 1 Pa and 100 kPa
-        rand_p = random.uniform(MIN_PRESSURE, MAX_PRESSURE)
-        pressures.append(rand_p)
-        current_time += WAYPOINT_INTERVAL
-        
-    # Cap the end of the video safely at 1 Pa
-    times.append(DURATION)
-    pressures.append(MIN_PRESSURE)
-    
-    return times, pressures
+def report_step_plan(times, plan):
+    flat = step_planner.flat_step_plan(times)
+    print("      Step plan: {} -> {} steps, forced initial substeps {} -> {}, minimum substeps {} -> {}.".format(
+        len(flat), len(plan), sum(p[1] for p in flat), sum(p[1] for p in plan), sum(p[2] for p in flat), sum(p[2] for p in plan)))
+
+def generate_random_trajectories(case_num):
+    """Builds 3 continuous, reproducible bellow paths that start/end at 1 Pa and respect the check_profiles limits.
+
+    The walk generator of random-walk sweeps (sweep_spec.random_walk_schedule), so walk k here is walk k there.
+    """
+    times, paths = sweep_spec.random_walk_schedule(RANDOM_WALK, case_num, DURATION, MIN_PRESSURE, MAX_PRESSURE)
+    return times, paths[0], paths[1], paths[2]
+
+def load_trajectory_profiles(profile_dir):
+    """Reads 'Time [s], P1 [kPa], P2 [kPa], P3 [kPa]' walks (generate_random_walks.py) as (times, p1, p2, p3) in Pa."""
+    profiles = []
+    for filename in sorted(os.listdir(profile_dir)):
+        if not filename.endswith(".csv"): continue
+        times, p1, p2, p3 = [], [], [], []
+        with open(os.path.join(profile_dir, filename), "r") as f:
+            f.readline() # Skip header
+            for line in f:
+                cols = line.strip().split(",")
+                if len(cols) < 4: continue
+                times.append(float(cols[0]))
+                p1.append(max(float(cols[1]) * 1000.0, MIN_PRESSURE))
+                p2.append(max(float(cols[2]) * 1000.0, MIN_PRESSURE))
+                p3.append(max(float(cols[3]) * 1000.0, MIN_PRESSURE))
+        if abs(times[-1] - DURATION) > 1e-6:
+            print("Warning: {} lasts {} s but DURATION is {} s.".format(filename, times[-1], DURATION))
+        profiles.append((times, p1, p2, p3))
+    return profiles
 
 def set_load_schedule(load_obj, times_list, pressures_list):
     """Injects the N-step dynamic pressure schedule into the Ansys Tabular Data array."""
@@ -96,6 +171,10 @@ def get_interpolated_pressure(t_target, times_qty, pressures_qty):
     """Linearly interpolates pressure at any specific video frame timestamp."""
     times = [float(qty.Value) for qty in times_qty]
     pressures = [float(qty.Value) for qty in pressures_qty]
+    return get_interpolated_pressure_values(t_target, times, pressures)
+
+def get_interpolated_pressure_values(t_target, times, pressures):
+    """Same interpolation on plain float lists, for schedules that are not in the tree yet."""
     if t_target <= times[0]: return pressures[0]
     if t_target >= times[-1]: return pressures[-1]
     for i in range(len(times) - 1):
@@ -110,6 +189,13 @@ def log_failure(case_num, error_msg):
     with open(failure_log_path, "a") as f:
         f.write("Random Case {} | Error: {}\n".format(case_num, error_msg))
 
+def log_solve_time(case_num, p1, p2, p3, status, seconds):
+    """Appends every solve attempt and its wall-clock time so failure_model.py can learn from it."""
+    is_new = not os.path.exists(solve_log_path)
+    with open(solve_log_path, "a") as f:
+        if is_new: f.write("Case, Max_P1(Pa), Max_P2(Pa), Max_P3(Pa), Status, SolveTime(s)\n")
+        f.write("{}, {:.0f}, {:.0f}, {:.0f}, {}, {:.1f}\n".format(case_num, p1, p2, p3, status, seconds))
+
 def find_object(parent, name):
     """Utility to grab an object from the Ansys Mechanical Project Tree by name."""
     for child in parent.Children:
@@ -160,10 +246,26 @@ def export_pressure_profile(case_folder, base_name, load_p1, load_p2, load_p3):
             inst_p3 = get_interpolated_pressure(t, load_p3.Magnitude.Inputs[0].DiscreteValues, load_p3.Magnitude.Output.DiscreteValues) / 1000.0
             f.write("{:.4f}, {:.3f}, {:.3f}, {:.3f}\n".format(t, inst_p1, inst_p2, inst_p3))
 
+def save_failed_profile(folder_name, load_p1, load_p2, load_p3):
+    """Keeps the profile a failed case was solved with; failed cases have no case folder to hold it."""
+    try:
+        if not os.path.exists(failed_profile_folder): os.makedirs(failed_profile_folder)
+        export_pressure_profile(failed_profile_folder, folder_name, load_p1, load_p2, load_p3)
+    except Exception as e:
+        print("      [Warning]: Could not save the failed profile. " + str(e))
+
+def verify_outputs(folder, base_name):
+    return case_commit.verify_case(folder, base_name, VIDEO_FRAMES + 1, VIDEO_FRAMES, VIDEO_FRAMES, CASE_VIEWS)
+
+def select_export_nodes(mesh_data):
+    """The NODE_SELECTION node IDs to export (None = all nodes), cached per mesh in the dataset folder."""
+    return mechanical_helpers.select_export_nodes(ExtAPI, mesh_data, NODE_SELECTION, NODE_SAMPLE_COUNT, NODE_NAMED_SELECTION, base_folder)
+
 def export_consolidated_data(case_folder, base_name, mesh_data, load_p1, load_p2, load_p3, def_x, def_y, def_z, strain, solution_obj):
     """Iterates through every time step, evaluates the mesh, and saves the nodal positions/strains."""
     file_path = os.path.join(case_folder, base_name + "_NodeData.csv")
-    nodes_cache = {node.Id: {'X': node.X, 'Y': node.Y, 'Z': node.Z} for node in mesh_data.Nodes}
+    export_ids = select_export_nodes(mesh_data)
+    nodes_cache = {node.Id: {'X': node.X, 'Y': node.Y, 'Z': node.Z} for node in mesh_data.Nodes if export_ids is None or node.Id in export_ids}
     time_steps = [round((i + 1) * (DURATION / VIDEO_FRAMES), 4) for i in range(VIDEO_FRAMES)]
     
     with open(file_path, "w") as f:
@@ -215,21 +317,11 @@ def blocking_solve(analysis_obj, solution_obj):
     while solution_obj.ObjectState != ObjectState.Solved:
         if time.time() - solve_start > TIMEOUT: return False, "Timeout"
         if solution_obj.ObjectState == ObjectState.SolveFailed: return False, "Divergence/Failure"
+        mechanical_helpers.sample_resources()
         time.sleep(1)
         
     return True, "Success"
 
-def garbage_collect_solver_files(solution_obj):
-    """Hard-flushes the RAM and Disk after every case to prevent memory fragmentation."""
-    print("      [Cleanup]: Purging massive solver result files...")
-    try:
-        solution_obj.ClearGeneratedData()
-        System.GC.Collect() # Forces the .NET environment to dump the nodal data from RAM
-        time.sleep(1) 
-        print("      [Cleanup]: Disk space recovered.")
-    except Exception as e:
-        print("      [Cleanup Warning]: Could not clear data. " + str(e))
-
 # ==========================================
 # --- MAIN EXECUTION ---
 # ==========================================
@@ -238,6 +330,8 @@ print("--- Starting Random Walk Continuous Dataset Recovery ---")
 analysis = ExtAPI.DataModel.Project.Model.Analyses[0]
 solution = analysis.Solution
 mesh_data = analysis.MeshData
+mechanical_helpers.start_governor(analysis, main_output_folder, CACHE_DIR)
+mechanical_helpers.start_leak_watch(main_output_folder, CHECKPOINT_PATH, resume_checkpoint["done_cases"] if resume_checkpoint else ())
 
 # Compute the zoom once to guarantee every video has the exact same spatial dimensions
 master_zoom = calculate_geometry_zoom(mesh_data)
@@ -257,24 +351,75 @@ else:
     try: total_def.DeformationScaling = 1 
     except: pass
 
-    for case_num in range(1, NUM_RANDOM_VIDEOS + 1):
+    # Only the exported node subset is evaluated; the videos still use the unscoped Total Deformation
+    mechanical_helpers.scope_results_to_nodes(ExtAPI, [def_x, def_y, def_z, eqv_strain], select_export_nodes(mesh_data))
+
+    profiles = load_trajectory_profiles(PROFILE_DIR) if PROFILE_DIR else None
+    num_videos = len(profiles) if profiles else NUM_RANDOM_VIDEOS
+    if profiles: print("Loaded {} random walks from: {}".format(num_videos, PROFILE_DIR))
+
+    stopped_early = False
+    for case_num in range(1, num_videos + 1):
+        base_name = "RandomWalk_{}".format(case_num)
+        folder_name = "Case_{}_{}".format(case_num, base_name)
+        case_folder = os.path.join(main_output_folder, folder_name)
+        if case_commit.is_complete(case_folder):
+            continue # Committed with its marker in an earlier session; anything without one is redone
+        if mechanical_helpers.is_done(case_num):
+            continue # Already handled before the checkpointed stop
+        remaining_cases = num_videos - case_num
+        
+        if not mechanical_helpers.wait_for_resources(solution):
+            log_failure(case_num, "Stopped: out of disk space")
+            stopped_early = True
+            break
+        mechanical_helpers.reset_case_usage()
+        mechanical_helpers.memory_snapshot(case_num, "before_solve")
+        peaks = ("", "", "") # Each bellow's peak, once the walk is built
+        
         try:
-            print("\n=== Processing Random Walk {}/{} ===".format(case_num, NUM_RANDOM_VIDEOS))
+            print("\n=== Processing Random Walk {}/{} ===".format(case_num, num_videos))
+            
+            # Generate (or load) 3 coupled random flight paths for the bellows
+            if profiles:
+                times, pressures_1, pressures_2, pressures_3 = profiles[case_num - 1]
+            else:
+                times, pressures_1, pressures_2, pressures_3 = generate_random_trajectories(case_num)
             
-            # Generate 3 independent random flight paths for the bellows
-            times_1, pressures_1 = generate_random_trajectory()
-            times_2, pressures_2 = generate_random_trajectory()
-            times_3, pressures_3 = generate_random_trajectory()
+            # One shared axis for all 3 loads (and the solver steps), whatever breakpoints each channel came with
+            times, (pressures_1, pressures_2, pressures_3) = step_planner.common_schedule(
+                [(times, pressures_1), (times, pressures_2), (times, pressures_3)])
+            step_plan = step_planner.plan_analysis_steps(times, [pressures_1, pressures_2, pressures_3], FPS) if STEP_PLANNER else step_planner.flat_step_plan(times)
+            report_step_plan(times, step_plan)
+            peaks = (max(pressures_1), max(pressures_2), max(pressures_3))
             
-            # The time steps are identical for all 3 arrays, so we just use times_1 to setup the solver
-            setup_analysis_steps(analysis, times_1)
+            setup_analysis_steps(analysis, step_plan)
+            mechanical_helpers.configure_solver_processes(ExtAPI, analysis, times[-1], WORKER_COUNT, MAX_SOLVER_CORES)
             
             # Apply the pressures
-            set_load_schedule(p1, times_1, pressures_1)
-            set_load_schedule(p2, times_2, pressures_2)
-            set_load_schedule(p3, times_3, pressures_3)
+            set_load_schedule(p1, times, pressures_1)
+            set_load_schedule(p2, times, pressures_2)
+            set_load_schedule(p3, times, pressures_3)
             
+            # The same walk (same mesh, model, schedules, steps and export settings) solved in any earlier run
+            cache_identity = mechanical_helpers.result_cache_identity(ExtAPI, analysis, mesh_data, [p1, p2, p3], CACHE_EXPORT_SETTINGS) if RESULT_CACHE else None
+            cache_key = result_cache.cache_key(cache_identity) if cache_identity else None
+            cached = result_cache.restore_case(CACHE_DIR, cache_key, case_folder, base_name, verify_outputs, {"case": case_num, "cache_key": cache_key}) if cache_key else None
+            if cached:
+                print("      [Cache]: Restored from {} (~{:.0f} s of solving saved).".format(cached["source"], cached["solve_seconds"]))
+                result_cache.record_lookup(CACHE_DIR, cache_stats, os.path.basename(main_output_folder), case_num, cache_key, "hit", cached["solve_seconds"])
+                mechanical_helpers.log_case_telemetry(case_num, peaks, "Cached", case_folder)
+                if mechanical_helpers.finish_case(case_num, remaining_cases):
+                    stopped_early = True
+                    break
+                continue
+            
+            solve_start = time.time()
             success, msg = blocking_solve(analysis, solution)
+            solve_seconds = time.time() - solve_start
+            log_solve_time(case_num, max(pressures_1), max(pressures_2), max(pressures_3), msg, solve_seconds)
+            if cache_key: result_cache.record_lookup(CACHE_DIR, cache_stats, os.path.basename(main_output_folder), case_num, cache_key, "miss", solve_seconds)
+            mechanical_helpers.memory_snapshot(case_num, "after_solve")
             
             if not success:
                 print("      !!! SOLVE FAILED: {} !!!".format(msg))
@@ -288,20 +433,23 @@ else:
                 p1.Suppressed = False
                 
                 log_failure(case_num, msg)
-                garbage_collect_solver_files(solution) 
+                save_failed_profile(folder_name, p1, p2, p3)
+                cleaned = mechanical_helpers.clear_solver_files(solution)
+                mechanical_helpers.log_case_telemetry(case_num, peaks, msg if cleaned else msg + " (cleanup failed)")
+                if mechanical_helpers.finish_case(case_num, remaining_cases):
+                    stopped_early = True
+                    break
                 continue # Skip the exports and move to the next case safely
             
-            base_name = "RandomWalk_{}".format(case_num)
-            folder_name = "Case_{}_{}".format(case_num, base_name)
-            case_folder = os.path.join(main_output_folder, folder_name)
-            if not os.path.exists(case_folder): os.makedirs(case_folder)
+            # Everything is written to the staging folder and only renamed to case_folder once verified
+            stage_folder = case_commit.prepare_staging(case_folder)
 
             # Exports
             print("      Exporting Time/Pressure Profile (kPa)...")
-            export_pressure_profile(case_folder, base_name, p1, p2, p3)
+            export_pressure_profile(stage_folder, base_name, p1, p2, p3)
 
             print("      Exporting Multi-Frame Data (Static Target Pressures)...")
-            export_consolidated_data(case_folder, base_name, mesh_data, p1, p2, p3, def_x, def_y, def_z, eqv_strain, solution)
+            export_consolidated_data(stage_folder, base_name, mesh_data, p1, p2, p3, def_x, def_y, def_z, eqv_strain, solution)
 
             print("      Exporting Videos...")
             total_def.Activate()
@@ -314,27 +462,41 @@ else:
             
             # Export all 4 camera views
             set_camera_custom(1, 0, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide1.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide1.avi"), GraphicsAnimationExportFormat.AVI)
             
             set_camera_custom(0, 1, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide2.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide2.avi"), GraphicsAnimationExportFormat.AVI)
 
             set_camera_custom(-1, 0, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide3.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide3.avi"), GraphicsAnimationExportFormat.AVI)
             
             set_camera_custom(0, 0, 1, 1, 0, 0, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewTop.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewTop.avi"), GraphicsAnimationExportFormat.AVI)
 
+            case_commit.commit_case(case_folder, verify_outputs(stage_folder, base_name), {"case": case_num, "cache_key": cache_key})
             print("      Case {} Complete.".format(case_num))
+            if cache_key: result_cache.store(CACHE_DIR, cache_key, case_folder, base_name, round(solve_seconds, 1), cache_identity, CACHE_MAX_GB)
+            
+            mechanical_helpers.memory_snapshot(case_num, "after_export")
             
             # Final RAM cleanup before moving to the next case
-            garbage_collect_solver_files(solution)
+            cleaned = mechanical_helpers.clear_solver_files(solution)
+            mechanical_helpers.log_case_telemetry(case_num, peaks, "Success" if cleaned else "Success (cleanup failed)", case_folder)
             
         except Exception as e:
             # Catch-all for unexpected Python errors (like network drive disconnects)
             print("Error on Case {}: {}".format(case_num, str(e)))
             log_failure(case_num, "Script Exception: " + str(e))
-            garbage_collect_solver_files(solution) 
+            mechanical_helpers.clear_solver_files(solution)
+            mechanical_helpers.log_case_telemetry(case_num, peaks, "Script Exception")
+        
+        if mechanical_helpers.finish_case(case_num, remaining_cases):
+            stopped_early = True
+            break
+
+    if not stopped_early:
+        mechanical_helpers.clear_checkpoint() # The run is complete, so the next session starts fresh
+    result_cache.report_stats(cache_stats)
 
 print("\nBatch Random Walk Run Finished.")
 print("Videos and CSVs saved to: " + main_output_folder)
\ No newline at end of file
@@ -0,0 +1,109 @@
+import os
+import sys
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+
+from node_data import read_node_data
+
+# ==========================================
+# --- CONFIGURATION (FRAME RESAMPLING) ---
+# ==========================================
+FPS = 30
+OUTPUT_SUFFIX = "_NodeData_Uniform.csv"   # Not matched by *_NodeData.csv, so the offline tools never pick it up twice
+SUBSTEP_SUFFIX = "_SubstepData.csv"       # NODE_EXPORT_MODE = "substeps" in simulate.py
+
+# ==========================================
+# --- RESAMPLING ---
+# ==========================================
+def uniform_grid(duration, fps=FPS):
+    """The drivers' frame times: round((i + 1) * (DURATION / VIDEO_FRAMES), 4)."""
+    frames = int(round(duration * fps))
+    return np.round((np.arange(frames) + 1) * (duration / frames), 4)
+
+def resample(times, values, target_times):
+    """Linear interpolation of (F x ...) arrays from sorted sample times onto target times, all frames at once.
+
+    Targets outside the sampled range hold the first/last sample.
+    """
+    times = np.asarray(times, dtype=float)
+    target_times = np.asarray(target_times, dtype=float)
+    if len(times) == 1:
+        return np.repeat(values[:1], len(target_times), axis=0)
+    hi = np.clip(np.searchsorted(times, target_times, side="right"), 1, len(times) - 1)
+    lo = hi - 1
+    w = np.clip((target_times - times[lo]) / (times[hi] - times[lo]), 0.0, 1.0)
+    w = w.reshape((-1,) + (1,) * (values.ndim - 1))
+    return values[lo] * (1.0 - w) + values[hi] * w
+
+def read_extra_columns(csv_path):
+    """Per-frame trailing pressure columns (Peak_P*, Inst_P* ...) as (names, F x K), or ([], None)."""
+    with open(csv_path, "r") as f:
+        columns = [c.strip() for c in f.readline().split(",")]
+    if len(columns) <= 9:
+        return [], None
+    df = pd.read_csv(csv_path, skipinitialspace=True, usecols=[0] + list(range(9, len(columns))))
+    df.columns = [c.strip() for c in df.columns]
+    per_frame = df.groupby("Time(s)", sort=True).first()
+    return columns[9:], per_frame.to_numpy()
+
+def case_duration(csv_path, times):
+    """Profile length from the case's PressureProfile if present, else the last exported time."""
+    profile = glob.glob(os.path.join(os.path.dirname(csv_path), "*_PressureProfile.csv"))
+    if profile:
+        return float(np.genfromtxt(profile[0], delimiter=",", skip_header=1, ndmin=2)[-1, 0])
+    return float(times[-1])
+
+def uniform_frames(csv_path, fps=FPS):
+    """(target times, node_ids, coords, values F x N x 4, extra names, extras F x K) on the uniform FPS grid."""
+    times, node_ids, coords, values = read_node_data(csv_path)
+    names, extras = read_extra_columns(csv_path)
+    target = uniform_grid(case_duration(csv_path, times), fps)
+    values = resample(times, values, target)
+    extras = resample(times, extras, target) if extras is not None else None
+    return target, node_ids, coords, values, names, extras
+
+def write_node_data(csv_path, times, node_ids, coords, values, names=(), extras=None):
+    """Writes arrays back in the exporter's NodeData layout (nodes missing in a frame are left out)."""
+    F, N = values.shape[:2]
+    table = [np.repeat(times, N)[:, None], np.tile(node_ids, F)[:, None], np.tile(coords, (F, 1)), values.reshape(F * N, 4)]
+    fmt = ["%.4f", "%d", "%.6f", "%.6f", "%.6f", "%.6e", "%.6e", "%.6e", "%.6e"]
+    if extras is not None:
+        table.append(np.repeat(extras, N, axis=0))
+        fmt += ["%.2f"] * extras.shape[1]
+    table = np.hstack(table)
+    table = table[~np.isnan(values.reshape(F * N, 4)[:, 0])]
+    header = ", ".join(["Time(s)", "NodeID", "X_und(m)", "Y_und(m)", "Z_und(m)", "DefX(m)", "DefY(m)", "DefZ(m)", "Strain"] + list(names))
+    np.savetxt(csv_path, table, fmt=fmt, delimiter=", ", header=header, comments="")
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Rebuilds the uniform video-frame grid from adaptive NodeData or solver substep exports.",
+                                     epilog="For simulate.py exports with FRAME_SAMPLING = \"adaptive\" or NODE_EXPORT_MODE = \"substeps\".")
+    parser.add_argument("paths", nargs="+", help="NodeData / SubstepData CSVs or Case_* folders")
+    parser.add_argument("--fps", type=int, default=FPS)
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if os.path.isdir(path):
+            found = glob.glob(os.path.join(path, "*" + SUBSTEP_SUFFIX)) or glob.glob(os.path.join(path, "*_NodeData.csv"))
+            csv_path = found[0]
+        else:
+            csv_path = path
+        target, node_ids, coords, values, names, extras = uniform_frames(csv_path, args.fps)
+
+        if csv_path.endswith(SUBSTEP_SUFFIX):
+            # Substep exports have no NodeData yet; write the standard file so every other tool just works
+            out = csv_path[:-len(SUBSTEP_SUFFIX)] + "_NodeData.csv"
+            if os.path.exists(out): out = csv_path[:-len(SUBSTEP_SUFFIX)] + OUTPUT_SUFFIX
+        else:
+            out = csv_path[:-len("_NodeData.csv")] + OUTPUT_SUFFIX
+        write_node_data(out, target, node_ids, coords, values, names, extras)
+        print("    {} -> {} frames x {} nodes: {}".format(os.path.basename(csv_path), len(target), len(node_ids), os.path.basename(out)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
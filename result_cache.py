@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import case_commit
+
+# ==========================================
+# --- CONFIGURATION (RESULT CACHE) ---
+# ==========================================
+# Finished case outputs stored under a hash of everything that determines them: mesh identity, the model signature
+# (materials, body assignments, contacts, supports; mechanical_helpers.model_signature), the three load schedules,
+# the step/solver settings and the export settings. Plain Python (IronPython 2.7 and CPython 3): sweep_engine.py and
+# the drivers import it from the code folder, and `report` runs offline. An entry that cannot be restored is
+# discarded and the case is solved again.
+CACHE_FOLDER = "result_cache"   # Under the dataset root (SoftRobot_Dataset_Hysteresis)
+CACHE_MAX_GB = 200.0            # Least recently used entries are evicted beyond this
+META_FILE = "cache_meta.json"
+LOG_FILE = "cache_log.csv"
+
+# ==========================================
+# --- KEYS & ENTRIES ---
+# ==========================================
+def cache_key(identity):
+    """identity: JSON-able dict whose numbers are already formatted as strings (see sweep_spec.canonical)."""
+    text = json.dumps(identity, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+def entry_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key)
+
+def read_meta(path):
+    with open(os.path.join(path, META_FILE), "r") as f:
+        return json.load(f)
+
+def write_meta(path, meta):
+    tmp = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=1)
+    if os.path.exists(os.path.join(path, META_FILE)): os.remove(os.path.join(path, META_FILE))
+    os.rename(tmp, os.path.join(path, META_FILE))
+
+def lookup(cache_dir, key):
+    """Meta of a complete entry (and marks it as recently used), or None."""
+    path = entry_path(cache_dir, key)
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    meta = read_meta(path)
+    meta["last_used"] = time.time()
+    meta["hits"] = meta.get("hits", 0) + 1
+    write_meta(path, meta)
+    return meta
+
+def restore(cache_dir, key, case_folder, base_name):
+    """Copies a cached case into case_folder under this case's base name.
+
+    Raises if a file is missing or its size differs from the one stored; the caller discards the entry and solves.
+    """
+    path = entry_path(cache_dir, key)
+    meta = read_meta(path)
+    if not os.path.exists(case_folder): os.makedirs(case_folder)
+    size = 0
+    for suffix in meta["files"]:
+        target = os.path.join(case_folder, base_name + suffix)
+        shutil.copyfile(os.path.join(path, "file" + suffix), target)
+        size += os.path.getsize(target)
+    if not meta["files"] or size != meta["size"]:
+        raise IOError("cache entry {} holds {} bytes, expected {}".format(key, size, meta["size"]))
+
+def discard(cache_dir, key):
+    """Deletes an entry, e.g. one whose files are corrupt or incomplete."""
+    shutil.rmtree(entry_path(cache_dir, key), ignore_errors=True)
+
+def store(cache_dir, key, case_folder, base_name, solve_seconds, identity=None, max_gb=CACHE_MAX_GB):
+    """Copies every `<base_name>*` output of a finished case into the cache, then evicts down to max_gb.
+
+    Files are kept by suffix (_NodeData.csv, _ViewTop.avi ...) so a hit can be restored under another base name.
+    The entry is built in a temp folder and renamed, so a crash never leaves a half-stored entry behind.
+    """
+    path = entry_path(cache_dir, key)
+    if os.path.exists(os.path.join(path, META_FILE)):
+        return
+    tmp = path + ".tmp"
+    if os.path.exists(tmp): shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    files, size = [], 0
+    for name in sorted(os.listdir(case_folder)):
+        if not name.startswith(base_name): continue
+        suffix = name[len(base_name):]
+        shutil.copyfile(os.path.join(case_folder, name), os.path.join(tmp, "file" + suffix))
+        files.append(suffix)
+        size += os.path.getsize(os.path.join(case_folder, name))
+    now = time.time()
+    write_meta(tmp, {"key": key, "files": files, "size": size, "solve_seconds": solve_seconds, "created": now,
+                     "last_used": now, "hits": 0, "source": case_folder, "identity": identity})
+    if os.path.exists(path): shutil.rmtree(path)
+    os.rename(tmp, path)
+    evict(cache_dir, max_gb)
+
+def entries(cache_dir):
+    found = []
+    if not os.path.exists(cache_dir): return found
+    for prefix in os.listdir(cache_dir):
+        folder = os.path.join(cache_dir, prefix)
+        if not os.path.isdir(folder): continue
+        for key in os.listdir(folder):
+            path = os.path.join(folder, key)
+            if not os.path.exists(os.path.join(path, META_FILE)): continue
+            try:
+                found.append((path, read_meta(path)))
+            except ValueError: # Metas are renamed into place, so an unreadable one is corrupt
+                shutil.rmtree(path, ignore_errors=True)
+    return found
+
+def size_gb(cache_dir):
+    return sum(meta["size"] for _, meta in entries(cache_dir)) / 1e9
+
+def evict(cache_dir, max_gb=CACHE_MAX_GB):
+    """Deletes least recently used entries until the cache fits in max_gb; returns the number removed."""
+    found = sorted(entries(cache_dir), key=lambda e: e[1]["last_used"])
+    total = sum(meta["size"] for _, meta in found)
+    removed = 0
+    while found and total > max_gb * 1e9:
+        path, meta = found.pop(0)
+        shutil.rmtree(path, ignore_errors=True)
+        total -= meta["size"]
+        removed += 1
+    return removed
+
+def log_lookup(cache_dir, sweep, case, key, result, seconds):
+    """result: "hit" (seconds = solve time saved) or "miss" (seconds = solve time spent)."""
+    if not os.path.exists(cache_dir): os.makedirs(cache_dir)
+    path = os.path.join(cache_dir, LOG_FILE)
+    new = not os.path.exists(path)
+    with open(path, "a") as f:
+        if new: f.write("Time, Sweep, Case, Key, Result, Seconds\n")
+        f.write("{:.0f}, {}, {}, {}, {}, {:.1f}\n".format(time.time(), sweep, case, key, result, seconds))
+
+# ==========================================
+# --- DRIVER SESSIONS ---
+# ==========================================
+def restore_case(cache_dir, key, case_folder, base_name, verify, info=None):
+    """Restores and commits (case_commit.py) a cached case; returns its meta, or None on a miss.
+
+    verify(folder, base_name) is the caller's case_commit.verify_case check. An entry that cannot be restored or
+    fails verification is discarded, so the case is solved instead.
+    """
+    try:
+        meta = lookup(cache_dir, key)
+        if meta:
+            restore(cache_dir, key, case_commit.prepare_staging(case_folder), base_name)
+            case_commit.commit_case(case_folder, verify(case_commit.staging_folder(case_folder), base_name), info)
+        return meta
+    except Exception as e:
+        print("      [Cache]: Entry {} is unusable, discarding it and solving. {}".format(key, e))
+        discard(cache_dir, key)
+        return None
+
+def new_stats():
+    return {"hit": 0, "miss": 0, "hit_seconds": 0.0, "miss_seconds": 0.0}
+
+def record_lookup(cache_dir, stats, sweep, case, key, result, seconds):
+    """log_lookup plus the session totals in stats (new_stats): hits add the solve time saved, misses the time spent."""
+    stats[result] += 1
+    stats[result + "_seconds"] += seconds
+    log_lookup(cache_dir, sweep, case, key, result, seconds)
+
+def report_stats(stats):
+    lookups = stats["hit"] + stats["miss"]
+    if not lookups: return
+    print("Result cache: {} of {} cases restored ({:.0%}), ~{:.1f} h of solving saved ({:.1f} h solved).".format(
+        stats["hit"], lookups, stats["hit"] / float(lookups), stats["hit_seconds"] / 3600.0, stats["miss_seconds"] / 3600.0))
+
+# ==========================================
+# --- REPORT ---
+# ==========================================
+def sweep_stats(cache_dir):
+    """{sweep: [hits, misses, seconds saved, seconds solved]} from the lookup log."""
+    stats = {}
+    path = os.path.join(cache_dir, LOG_FILE)
+    if not os.path.exists(path): return stats
+    with open(path, "r") as f:
+        f.readline()
+        for line in f:
+            cols = [c.strip() for c in line.split(",")]
+            if len(cols) < 6: continue
+            row = stats.setdefault(cols[1], [0, 0, 0.0, 0.0])
+            if cols[4] == "hit":
+                row[0] += 1
+                row[2] += float(cols[5])
+            else:
+                row[1] += 1
+                row[3] += float(cols[5])
+    return stats
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Hit rates and size of the content-addressed case result cache.")
+    parser.add_argument("cache_dir", help="The result_cache folder under the dataset root")
+    parser.add_argument("--evict", type=float, metavar="GB", help="Evict least recently used entries down to this size")
+    args = parser.parse_args()
+
+    if args.evict is not None:
+        print("Evicted {} entries.".format(evict(args.cache_dir, args.evict)))
+    found = entries(args.cache_dir)
+    print("{} cached cases, {:.1f} GB".format(len(found), sum(m["size"] for _, m in found) / 1e9))
+    print("{:<40} {:>6} {:>6} {:>8} {:>12} {:>12}".format("Sweep", "Hits", "Misses", "Hit rate", "Saved (h)", "Solved (h)"))
+    for sweep, (hits, misses, saved, spent) in sorted(sweep_stats(args.cache_dir).items()):
+        print("{:<40} {:>6} {:>6} {:>7.0%} {:>12.2f} {:>12.2f}".format(
+            sweep, hits, misses, hits / float(max(1, hits + misses)), saved / 3600.0, spent / 3600.0))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
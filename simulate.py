@@ -1,4 +1,5 @@
 import os
+import sys
 import System
 import time
 import datetime
@@ -12,6 +13,14 @@ from Ansys.ACT.Math import Vector3D
 MIN_PRESSURE = 1       
 MAX_PRESSURE = 100001  
 STEP_SIZE = 20000      
+RESUME_FROM = 168      # Skips previously successful solves of the grid (ignored for a LOAD_CASES_FILE list)
+
+# Optional case list written by active_sampler.py; replaces the full 6x6x6 grid when the file exists
+LOAD_CASES_FILE = None
+
+# Solve one representative per symmetry class ("C3" = bellow rotations, "C3v" = rotations + mirrors, None = all).
+# The skipped members are synthesized offline with `symmetry.py synthesize` after verifying the mesh.
+SYMMETRY_GROUP = None
 
 # The Viscoelastic "Golden Zone" Profile: 4s Ramp Up, 2s Static Hold (for creep), 4s Ramp Down
 DURATION = 10.0         
@@ -19,17 +28,87 @@ GROWTH_FACTOR = 2.0     # Keeps the camera bounds identical to the old 125-case
 CAMERA_WAIT_TIME = 0.5 
 FPS = 30
 VIDEO_FRAMES = int(DURATION * FPS) # Yields exactly 300 frames per video
+FRAME_TIMES = [0.0] + [round((i + 1) * (DURATION / VIDEO_FRAMES), 4) for i in range(VIDEO_FRAMES)]
+
+# Which nodes export_consolidated_data writes: "all", "surface" (nodes on geometry faces),
+# "fps" (NODE_SAMPLE_COUNT surface nodes spread out by farthest-point sampling) or "named" (NODE_NAMED_SELECTION)
+NODE_SELECTION = "all"
+NODE_SAMPLE_COUNT = 500
+NODE_NAMED_SELECTION = "Markers"
+
+# Solver processes: concurrent Mechanical sessions on one machine split its cores and memory between them
+# (the thresholds for distributed and in-core solving are in mechanical_helpers.py)
+WORKER_COUNT = int(System.Environment.GetEnvironmentVariable("SOFTROBOT_WORKER_COUNT") or "1")
+MAX_SOLVER_CORES = None          # Licence cap (4 without HPC packs); None = the session's full share
+
+# "uniform" evaluates all VIDEO_FRAMES; "adaptive" evaluates every ADAPTIVE_COARSE_STRIDE-th frame and bisects
+# only where the nodes move non-linearly (resample_frames.py rebuilds the 30 FPS grid offline)
+FRAME_SAMPLING = "uniform"
+ADAPTIVE_COARSE_STRIDE = 16  # Frames between coarse evaluations; bisection halves frame indices, so it never leaves the grid
+ADAPTIVE_TOLERANCE = 5e-5    # m, max deviation from linear interpolation between evaluated frames
+
+# "frames" evaluates results at the video frame times; "substeps" writes every converged substep straight from
+# the result file into _SubstepData.csv (resample_frames.py turns it into the usual 30 FPS NodeData offline)
+NODE_EXPORT_MODE = "frames"
+SUBSTEP_MIN_INTERVAL = 1.0 / 240  # s, thins out the densest auto-stepped stretches (4x the video rate)
+RESULT_LENGTH_SCALE = 1.0         # Result-file length unit -> m (0.001 if the solver unit system is mm)
+STRAIN_POISSON_RATIO = 0.49       # Effective Poisson's ratio of Mechanical's Equivalent Elastic Strain
 
 # Setup output directories on the Desktop
 desktop_path = System.Environment.GetFolderPath(System.Environment.SpecialFolder.Desktop)
+# Shared modules (mechanical_helpers.py, failure_model.py, ...) sit in the code folder: SOFTROBOT_CODE_DIR or the Desktop
+CODE_DIR = System.Environment.GetEnvironmentVariable("SOFTROBOT_CODE_DIR") or desktop_path
+if CODE_DIR not in sys.path: sys.path.insert(0, CODE_DIR)
+import mechanical_helpers
+import result_cache
+import case_commit
+import failure_model
 base_folder = os.path.join(desktop_path, "SoftRobot_Dataset_Hysteresis")
 timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 main_output_folder = os.path.join(base_folder, "Run_424_Profile_" + timestamp)
+# An earlier Run_* folder to finish instead of starting a new one (cases with a _COMPLETE.json marker are skipped)
+RESUME_RUN_FOLDER = None
+if RESUME_RUN_FOLDER: main_output_folder = RESUME_RUN_FOLDER
+
+# A leak-triggered stop leaves a checkpoint and ends the script; nothing relaunches Mechanical from the GUI, so
+# restart it by hand and run this script again to continue that run (batch_run.py relaunches its workers itself)
+CHECKPOINT_PATH = mechanical_helpers.checkpoint_path(base_folder, "simulate")
+RESUME_FROM_CHECKPOINT = True
+resume_checkpoint = mechanical_helpers.read_checkpoint(CHECKPOINT_PATH) if RESUME_FROM_CHECKPOINT and not RESUME_RUN_FOLDER else None # An explicit folder wins
+if resume_checkpoint: main_output_folder = resume_checkpoint["run_folder"]
 
 if not os.path.exists(main_output_folder):
     os.makedirs(main_output_folder)
 
 failure_log_path = os.path.join(main_output_folder, "failed_cases.txt")
+failed_profile_folder = os.path.join(main_output_folder, "failed_profiles") # Profiles of failed cases, for failure_model.py
+solve_log_path = os.path.join(main_output_folder, "solve_log.csv")
+skipped_log_path = os.path.join(main_output_folder, "skipped_cases.txt")
+
+# Optional failure-risk model trained offline by failure_model.py (ignored if the file is missing)
+RISK_MODEL_PATH = os.path.join(base_folder, "failure_model.json")
+MAX_FAILURE_RISK = 0.9  # Cases predicted to fail more often than this are skipped instead of solved
+
+# Resource governor (mechanical_helpers.py): the queue pauses before the output or solver scratch drive fills up,
+# after pruning this session's scratch files and evicting old result cache entries; every case's peak usage goes to
+# run_telemetry.csv (the thresholds are in mechanical_helpers.py)
+
+# Memory-leak watch (mechanical_helpers.py): process memory, .NET heap and handles per case phase go to memory_trace.csv,
+# and the session checkpoints and stops when the post-cleanup working set trends into the limit within a few cases
+
+# Result cache (result_cache.py): finished cases keyed by mesh, model, load schedules, step/solver and export settings,
+# so a case identical to one from any earlier run is copied from the cache instead of solved
+RESULT_CACHE = True
+CACHE_DIR = os.path.join(base_folder, result_cache.CACHE_FOLDER)
+CACHE_MAX_GB = 200.0  # Least recently used cases are evicted beyond this
+CACHE_EXPORT_SETTINGS = ["simulate.py", FPS, VIDEO_FRAMES, GROWTH_FACTOR, NODE_SELECTION, NODE_SAMPLE_COUNT, NODE_NAMED_SELECTION,
+                         FRAME_SAMPLING, ADAPTIVE_COARSE_STRIDE, ADAPTIVE_TOLERANCE, NODE_EXPORT_MODE, SUBSTEP_MIN_INTERVAL,
+                         RESULT_LENGTH_SCALE, STRAIN_POISSON_RATIO]
+cache_stats = result_cache.new_stats()
+
+# Case commits (case_commit.py): exports go to "<case folder>.partial", are verified and fsynced, get a _COMPLETE.json marker with
+# checksums and are renamed into place. Resume skips every case folder that has the marker.
+CASE_VIEWS = ["Side1", "Side2", "Side3", "Top"]
 print("Saving Data to: " + main_output_folder)
 
 # ==========================================
@@ -76,6 +155,10 @@ def get_interpolated_pressure(t_target, times_qty, pressures_qty):
     """Linearly interpolates pressure at any specific video frame timestamp."""
     times = [float(qty.Value) for qty in times_qty]
     pressures = [float(qty.Value) for qty in pressures_qty]
+    return get_interpolated_pressure_values(t_target, times, pressures)
+
+def get_interpolated_pressure_values(t_target, times, pressures):
+    """Same interpolation on plain float lists, for schedules that are not in the tree yet."""
     if t_target <= times[0]: return pressures[0]
     if t_target >= times[-1]: return pressures[-1]
     for i in range(len(times) - 1):
@@ -90,6 +173,51 @@ def log_failure(case_num, p1, p2, p3, error_msg):
     with open(failure_log_path, "a") as f:
         f.write("Case {}: P1={}, P2={}, P3={} | Error: {}\n".format(case_num, p1, p2, p3, error_msg))
 
+def log_solve_time(case_num, p1, p2, p3, status, seconds):
+    """Appends every solve attempt and its wall-clock time so failure_model.py can learn from it."""
+    is_new = not os.path.exists(solve_log_path)
+    with open(solve_log_path, "a") as f:
+        if is_new: f.write("Case, P1(Pa), P2(Pa), P3(Pa), Status, SolveTime(s)\n")
+        f.write("{}, {}, {}, {}, {}, {:.1f}\n".format(case_num, p1, p2, p3, status, seconds))
+
+def load_risk_model():
+    """Loads the JSON model written by failure_model.py, or None if no model has been trained yet."""
+    if not os.path.exists(RISK_MODEL_PATH): return None
+    try:
+        return failure_model.load_model(RISK_MODEL_PATH)
+    except Exception as e:
+        print("Warning: Could not load risk model. " + str(e))
+        return None
+
+def predict_case_risk(model, case):
+    """Scores a 4-2-4 case with the features failure_model.py extracts from _PressureProfile.csv."""
+    schedule_times = [0.0, 4.0, 6.0, DURATION]
+    channels = []
+    for peak in case:
+        schedule = [MIN_PRESSURE / 1000.0, peak / 1000.0, peak / 1000.0, MIN_PRESSURE / 1000.0]
+        channels.append([get_interpolated_pressure_values(t, schedule_times, schedule) for t in FRAME_TIMES])
+    return failure_model.predict_failure_risk(model, failure_model.model_features(model, FRAME_TIMES, *channels))
+
+def read_load_cases(cases_path):
+    """Reads a 'P1(Pa), P2(Pa), P3(Pa)' case list such as the one active_sampler.py proposes."""
+    cases = []
+    with open(cases_path, "r") as f:
+        f.readline() # Skip header
+        for line in f:
+            cols = line.strip().split(",")
+            if len(cols) < 3: continue
+            cases.append(tuple(max(int(float(c)), MIN_PRESSURE) for c in cols[:3]))
+    return cases
+
+def is_symmetry_representative(case):
+    """True if this case is its class's canonical member, using the same rule as symmetry.py."""
+    if SYMMETRY_GROUP == "C3v":
+        return tuple(case) == tuple(sorted(case)) # All 6 channel permutations are equivalent
+    if SYMMETRY_GROUP == "C3":
+        a, b, c = case
+        return tuple(case) == min((a, b, c), (c, a, b), (b, c, a))
+    return True
+
 def find_object(parent, name):
     """Utility to grab an object from the Ansys Mechanical Project Tree by name."""
     for child in parent.Children:
@@ -140,50 +268,187 @@ def export_pressure_profile(case_folder, base_name, load_p1, load_p2, load_p3):
             inst_p3 = get_interpolated_pressure(t, load_p3.Magnitude.Inputs[0].DiscreteValues, load_p3.Magnitude.Output.DiscreteValues) / 1000.0
             f.write("{:.4f}, {:.3f}, {:.3f}, {:.3f}\n".format(t, inst_p1, inst_p2, inst_p3))
 
+def save_failed_profile(folder_name, load_p1, load_p2, load_p3):
+    """Keeps the profile a failed case was solved with; failed cases have no case folder to hold it."""
+    try:
+        if not os.path.exists(failed_profile_folder): os.makedirs(failed_profile_folder)
+        export_pressure_profile(failed_profile_folder, folder_name, load_p1, load_p2, load_p3)
+    except Exception as e:
+        print("      [Warning]: Could not save the failed profile. " + str(e))
+
+def verify_outputs(folder, base_name):
+    """verify_case with the rows and frames this driver exports for the current FRAME_SAMPLING / NODE_EXPORT_MODE."""
+    if NODE_EXPORT_MODE == "substeps":
+        return case_commit.verify_case(folder, base_name, VIDEO_FRAMES + 1, None, VIDEO_FRAMES, CASE_VIEWS, "_SubstepData.csv")
+    node_frames = case_commit.count_rows(os.path.join(folder, base_name + "_FrameTimes.csv")) if FRAME_SAMPLING == "adaptive" else VIDEO_FRAMES
+    return case_commit.verify_case(folder, base_name, VIDEO_FRAMES + 1, node_frames, VIDEO_FRAMES, CASE_VIEWS)
+
+def select_export_nodes(mesh_data):
+    """The NODE_SELECTION node IDs to export (None = all nodes), cached per mesh in the dataset folder."""
+    return mechanical_helpers.select_export_nodes(ExtAPI, mesh_data, NODE_SELECTION, NODE_SAMPLE_COUNT, NODE_NAMED_SELECTION, base_folder)
+
+def interpolation_error(data_a, data_b, data_m, w):
+    """Largest nodal displacement gap between a midpoint frame and the straight line between its neighbours."""
+    worst = 0.0
+    for nid, vals in data_m.items():
+        if nid not in data_a or nid not in data_b: continue
+        for key in ('dx', 'dy', 'dz'):
+            guess = data_a[nid][key] + (data_b[nid][key] - data_a[nid][key]) * w
+            worst = max(worst, abs(vals[key] - guess))
+    return worst
+
+def export_adaptive_frames(f, time_steps, evaluate_frame, write_frame):
+    """Evaluates every ADAPTIVE_COARSE_STRIDE-th frame, then bisects left to right only where the motion is not linear.
+
+    Every evaluated frame is written in time order; returns the indices (into time_steps) that were written.
+    """
+    written = []
+
+    def refine(a, data_a, b, data_b):
+        if b - a < 2: return
+        m = (a + b) // 2
+        data_m = evaluate_frame(time_steps[m])
+        if interpolation_error(data_a, data_b, data_m, float(m - a) / (b - a)) > ADAPTIVE_TOLERANCE:
+            refine(a, data_a, m, data_m)
+            write_frame(f, time_steps[m], data_m)
+            written.append(m)
+            refine(m, data_m, b, data_b)
+        else:
+            write_frame(f, time_steps[m], data_m)
+            written.append(m)
+
+    coarse = list(range(0, len(time_steps), ADAPTIVE_COARSE_STRIDE))
+    if coarse[-1] != len(time_steps) - 1: coarse.append(len(time_steps) - 1)
+
+    data_prev = evaluate_frame(time_steps[coarse[0]])
+    write_frame(f, time_steps[coarse[0]], data_prev)
+    written.append(coarse[0])
+    for a, b in zip(coarse[:-1], coarse[1:]):
+        data_b = evaluate_frame(time_steps[b])
+        refine(a, data_prev, b, data_b)
+        write_frame(f, time_steps[b], data_b)
+        written.append(b)
+        data_prev = data_b
+    return written
+
+def export_frame_times(case_folder, base_name, time_steps, frame_indices):
+    """Records which frames of the 30 FPS grid an adaptive export actually evaluated."""
+    file_path = os.path.join(case_folder, base_name + "_FrameTimes.csv")
+    with open(file_path, "w") as f:
+        f.write("Frame, Time(s)\n")
+        for k in frame_indices:
+            f.write("{}, {:.4f}\n".format(k + 1, time_steps[k]))
+
 def export_consolidated_data(case_folder, base_name, mesh_data, load_p1, load_p2, load_p3, def_x, def_y, def_z, strain, solution_obj):
     """Iterates through every time step, evaluates the mesh, and saves the nodal positions/strains."""
     file_path = os.path.join(case_folder, base_name + "_NodeData.csv")
-    nodes_cache = {node.Id: {'X': node.X, 'Y': node.Y, 'Z': node.Z} for node in mesh_data.Nodes}
+    export_ids = select_export_nodes(mesh_data)
+    nodes_cache = {node.Id: {'X': node.X, 'Y': node.Y, 'Z': node.Z} for node in mesh_data.Nodes if export_ids is None or node.Id in export_ids}
     time_steps = [round((i + 1) * (DURATION / VIDEO_FRAMES), 4) for i in range(VIDEO_FRAMES)]
     
     peak_p1 = float(load_p1.Magnitude.Output.DiscreteValues[1].Value)
     peak_p2 = float(load_p2.Magnitude.Output.DiscreteValues[1].Value)
     peak_p3 = float(load_p3.Magnitude.Output.DiscreteValues[1].Value)
     
+    def evaluate_frame(t):
+        def_x.DisplayTime = Quantity(str(t) + " [s]")
+        def_y.DisplayTime = Quantity(str(t) + " [s]")
+        def_z.DisplayTime = Quantity(str(t) + " [s]")
+        strain.DisplayTime = Quantity(str(t) + " [s]")
+        
+        solution_obj.EvaluateAllResults() # Forces Ansys to calculate the requested timestep
+        
+        frame_data = {}
+        def extract_fast(res_obj, key):
+            if res_obj.PlotData:
+                nodes = res_obj.PlotData["Node"]
+                vals = res_obj.PlotData["Values"]
+                for i in range(len(nodes)):
+                    nid = int(nodes[i])
+                    if nid not in frame_data:
+                        if nid in nodes_cache:
+                            frame_data[nid] = {'dx': 0, 'dy': 0, 'dz': 0, 'strain': 0}
+                        else: continue 
+                    frame_data[nid][key] = vals[i]
+                    
+        extract_fast(def_x, 'dx')
+        extract_fast(def_y, 'dy')
+        extract_fast(def_z, 'dz')
+        extract_fast(strain, 'strain')
+        return frame_data
+    
+    def write_frame(f, t, frame_data):
+        for nid, vals in frame_data.items():
+            f.write("{:.4f}, {}, {:.6f}, {:.6f}, {:.6f}, {:.6e}, {:.6e}, {:.6e}, {:.6e}, {:.2f}, {:.2f}, {:.2f}\n".format(
+                t, nid, nodes_cache[nid]['X'], nodes_cache[nid]['Y'], nodes_cache[nid]['Z'],
+                vals['dx'], vals['dy'], vals['dz'], vals['strain'],
+                peak_p1, peak_p2, peak_p3
+            ))
+    
     with open(file_path, "w") as f:
         f.write("Time(s), NodeID, X_und(m), Y_und(m), Z_und(m), DefX(m), DefY(m), DefZ(m), Strain, Peak_P1(Pa), Peak_P2(Pa), Peak_P3(Pa)\n")
-        for t in time_steps:
-            def_x.DisplayTime = Quantity(str(t) + " [s]")
-            def_y.DisplayTime = Quantity(str(t) + " [s]")
-            def_z.DisplayTime = Quantity(str(t) + " [s]")
-            strain.DisplayTime = Quantity(str(t) + " [s]")
-            
-            solution_obj.EvaluateAllResults() # Forces Ansys to calculate the requested timestep
-            
-            frame_data = {}
-            def extract_fast(res_obj, key):
-                if res_obj.PlotData:
-                    nodes = res_obj.PlotData["Node"]
-                    vals = res_obj.PlotData["Values"]
-                    for i in range(len(nodes)):
-                        nid = int(nodes[i])
-                        if nid not in frame_data:
-                            if nid in nodes_cache:
-                                frame_data[nid] = {'dx': 0, 'dy': 0, 'dz': 0, 'strain': 0}
-                            else: continue 
-                        frame_data[nid][key] = vals[i]
-                        
-            extract_fast(def_x, 'dx')
-            extract_fast(def_y, 'dy')
-            extract_fast(def_z, 'dz')
-            extract_fast(strain, 'strain')
-            
-            for nid, vals in frame_data.items():
-                f.write("{:.4f}, {}, {:.6f}, {:.6f}, {:.6f}, {:.6e}, {:.6e}, {:.6e}, {:.6e}, {:.2f}, {:.2f}, {:.2f}\n".format(
-                    t, nid, nodes_cache[nid]['X'], nodes_cache[nid]['Y'], nodes_cache[nid]['Z'],
-                    vals['dx'], vals['dy'], vals['dz'], vals['strain'],
-                    peak_p1, peak_p2, peak_p3
-                ))
+        if FRAME_SAMPLING == "adaptive":
+            frame_indices = export_adaptive_frames(f, time_steps, evaluate_frame, write_frame)
+            print("      [Adaptive]: Evaluated {} of {} frames.".format(len(frame_indices), len(time_steps)))
+        else:
+            for t in time_steps:
+                write_frame(f, t, evaluate_frame(t))
+    
+    if FRAME_SAMPLING == "adaptive":
+        export_frame_times(case_folder, base_name, time_steps, frame_indices)
+
+def equivalent_strain(ex, ey, ez, gxy, gyz, gxz):
+    """Equivalent elastic strain from component strains (engineering shears), as Mechanical defines it."""
+    normal = 0.5 * ((ex - ey) ** 2 + (ey - ez) ** 2 + (ez - ex) ** 2)
+    shear = 0.75 * (gxy ** 2 + gyz ** 2 + gxz ** 2)
+    return (normal + shear) ** 0.5 / (1.0 + STRAIN_POISSON_RATIO)
+
+def export_substep_data(case_folder, base_name, mesh_data, analysis_obj, load_p1, load_p2, load_p3):
+    """Reads the solved substeps directly from the result file, with no DisplayTime re-evaluation per frame."""
+    file_path = os.path.join(case_folder, base_name + "_SubstepData.csv")
+    export_ids = select_export_nodes(mesh_data)
+    nodes_cache = {node.Id: {'X': node.X, 'Y': node.Y, 'Z': node.Z} for node in mesh_data.Nodes if export_ids is None or node.Id in export_ids}
+    node_ids = sorted(nodes_cache.keys())
+    
+    peak_p1 = float(load_p1.Magnitude.Output.DiscreteValues[1].Value)
+    peak_p2 = float(load_p2.Magnitude.Output.DiscreteValues[1].Value)
+    peak_p3 = float(load_p3.Magnitude.Output.DiscreteValues[1].Value)
+    
+    reader = analysis_obj.GetResultsData()
+    try:
+        substep_times = [float(t) for t in reader.ListTimeFreq]
+        written, last_t = 0, None
+        with open(file_path, "w") as f:
+            f.write("Time(s), NodeID, X_und(m), Y_und(m), Z_und(m), DefX(m), DefY(m), DefZ(m), Strain, Peak_P1(Pa), Peak_P2(Pa), Peak_P3(Pa)\n")
+            for k, t in enumerate(substep_times):
+                is_last = (k == len(substep_times) - 1)
+                if last_t is not None and t - last_t < SUBSTEP_MIN_INTERVAL and not is_last: continue
+                
+                reader.CurrentResultSet = k + 1 # Result sets are 1-based
+                disp = reader.GetResult("U")
+                disp.SelectComponents(["X", "Y", "Z"])
+                try:
+                    strain = reader.GetResult("EPEL")
+                    strain.SelectComponents(["X", "Y", "Z", "XY", "YZ", "XZ"])
+                except Exception:
+                    strain = None # Elastic strain was not written to the result file
+                
+                for nid in node_ids:
+                    u = disp.GetNodeValues(nid)
+                    eqv = 0.0
+                    if strain is not None:
+                        try: eqv = equivalent_strain(*strain.GetNodeValues(nid)[:6])
+                        except Exception: pass
+                    f.write("{:.6f}, {}, {:.6f}, {:.6f}, {:.6f}, {:.6e}, {:.6e}, {:.6e}, {:.6e}, {:.2f}, {:.2f}, {:.2f}\n".format(
+                        t, nid, nodes_cache[nid]['X'], nodes_cache[nid]['Y'], nodes_cache[nid]['Z'],
+                        u[0] * RESULT_LENGTH_SCALE, u[1] * RESULT_LENGTH_SCALE, u[2] * RESULT_LENGTH_SCALE, eqv,
+                        peak_p1, peak_p2, peak_p3
+                    ))
+                last_t = t
+                written += 1
+        print("      [Substeps]: Exported {} of {} result sets.".format(written, len(substep_times)))
+    finally:
+        reader.Dispose() # Releases the lock on the .rst so ClearGeneratedData can delete it
 
 def blocking_solve(analysis_obj, solution_obj):
     """Triggers the solve and prevents Python from continuing until Ansys finishes the math."""
@@ -200,21 +465,11 @@ def blocking_solve(analysis_obj, solution_obj):
     while solution_obj.ObjectState != ObjectState.Solved:
         if time.time() - solve_start > TIMEOUT: return False, "Timeout"
         if solution_obj.ObjectState == ObjectState.SolveFailed: return False, "Divergence/Failure"
+        mechanical_helpers.sample_resources()
         time.sleep(1)
         
     return True, "Success"
 
-def garbage_collect_solver_files(solution_obj):
-    """Hard-flushes the RAM and Disk after every case to prevent memory fragmentation."""
-    print("      [Cleanup]: Purging massive solver result files...")
-    try:
-        solution_obj.ClearGeneratedData()
-        System.GC.Collect() # Forces the .NET environment to dump the nodal data from RAM
-        time.sleep(1) 
-        print("      [Cleanup]: Disk space recovered.")
-    except Exception as e:
-        print("      [Cleanup Warning]: Could not clear data. " + str(e))
-
 # ==========================================
 # --- MAIN EXECUTION ---
 # ==========================================
@@ -223,8 +478,11 @@ print("--- Starting Video-Focused Hysteresis Dataset Recovery (216 Cases) ---")
 analysis = ExtAPI.DataModel.Project.Model.Analyses[0]
 solution = analysis.Solution
 mesh_data = analysis.MeshData
+mechanical_helpers.start_governor(analysis, main_output_folder, CACHE_DIR)
+mechanical_helpers.start_leak_watch(main_output_folder, CHECKPOINT_PATH, resume_checkpoint["done_cases"] if resume_checkpoint else ())
 
 setup_analysis_steps(analysis)
+mechanical_helpers.configure_solver_processes(ExtAPI, analysis, DURATION, WORKER_COUNT, MAX_SOLVER_CORES)
 
 # Compute the zoom once to guarantee every video has the exact same spatial dimensions
 master_zoom = calculate_geometry_zoom(mesh_data)
@@ -244,6 +502,9 @@ else:
     try: total_def.DeformationScaling = 1 
     except: pass
 
+    # Only the exported node subset is evaluated; the videos still use the unscoped Total Deformation
+    mechanical_helpers.scope_results_to_nodes(ExtAPI, [def_x, def_y, def_z, eqv_strain], select_export_nodes(mesh_data))
+
     # Generate the grid array (0k, 20k, 40k, 60k, 80k, 100k)
     raw_levels = range(0, MAX_PRESSURE + 1, STEP_SIZE)
     # Replaces 0 with MIN_PRESSURE to prevent negative volumes
@@ -256,26 +517,87 @@ else:
             for v3 in pressure_levels:
                 load_cases.append((v1, v2, v3))
 
-    for i, case in enumerate(load_cases):
+    resume_from = RESUME_FROM
+    if LOAD_CASES_FILE and os.path.exists(LOAD_CASES_FILE):
+        load_cases = read_load_cases(LOAD_CASES_FILE)
+        resume_from = 1 # The list is numbered from 1, so grid case numbers mean nothing here
+        print("Loaded {} adaptive cases from: {}".format(len(load_cases), LOAD_CASES_FILE))
+
+    # Solve the safest cases first and skip the ones the risk model is confident will diverge
+    case_order = list(range(len(load_cases)))
+    risk_model = load_risk_model()
+    if risk_model:
+        risks = [predict_case_risk(risk_model, case) for case in load_cases]
+        case_order.sort(key=lambda idx: risks[idx])
+        print("Risk model loaded: {} of {} cases above {:.0%} predicted failure risk.".format(
+            sum(1 for r in risks if r > MAX_FAILURE_RISK), len(load_cases), MAX_FAILURE_RISK))
+
+    stopped_early = False
+    for position, i in enumerate(case_order):
+        case = load_cases[i]
         case_num = i + 1
         
         # --- RESUME LOGIC ---
-        # Modify this number to skip previously successful solves
-        if case_num < 168:
+        # Modify RESUME_FROM to skip previously successful solves
+        if case_num < resume_from:
             continue
+        if mechanical_helpers.is_done(case_num):
+            continue # Already handled before the checkpointed stop
         # --------------------
         
         val_p1, val_p2, val_p3 = case
+        remaining_cases = len(case_order) - position - 1
+        
+        # Formulate the folder names
+        base_name = "3bellows_{}_{}_{}".format(val_p1, val_p2, val_p3)
+        folder_name = "Case_{}_{}".format(case_num, base_name)
+        case_folder = os.path.join(main_output_folder, folder_name)
+        if case_commit.is_complete(case_folder):
+            continue # Committed with its marker in an earlier session; anything without one is redone
+        
+        if not is_symmetry_representative(case):
+            continue # Synthesized offline from its representative by symmetry.py
+        
+        if risk_model and risks[i] > MAX_FAILURE_RISK:
+            print("\n=== Skipping Case {} [Peak: P1={}, P2={}, P3={}]: predicted failure risk {:.0%} ===".format(case_num, val_p1, val_p2, val_p3, risks[i]))
+            with open(skipped_log_path, "a") as f:
+                f.write("Case {}: P1={}, P2={}, P3={} | Risk: {:.3f}\n".format(case_num, val_p1, val_p2, val_p3, risks[i]))
+            continue
+        
+        if not mechanical_helpers.wait_for_resources(solution):
+            log_failure(case_num, val_p1, val_p2, val_p3, "Stopped: out of disk space")
+            stopped_early = True
+            break
+        mechanical_helpers.reset_case_usage()
+        mechanical_helpers.memory_snapshot(case_num, "before_solve")
         
         try:
-            print("\n=== Processing Case {}/216 [Peak: P1={}, P2={}, P3={}] ===".format(case_num, val_p1, val_p2, val_p3))
+            print("\n=== Processing Case {}/{} [Peak: P1={}, P2={}, P3={}] ===".format(case_num, len(load_cases), val_p1, val_p2, val_p3))
             
             # Apply the pressures to the 3 bellows
             set_load_schedule(p1, val_p1)
             set_load_schedule(p2, val_p2)
             set_load_schedule(p3, val_p3)
             
+            # An identical case (same mesh, model, schedules, steps and export settings) solved in any earlier run
+            cache_identity = mechanical_helpers.result_cache_identity(ExtAPI, analysis, mesh_data, [p1, p2, p3], CACHE_EXPORT_SETTINGS) if RESULT_CACHE else None
+            cache_key = result_cache.cache_key(cache_identity) if cache_identity else None
+            cached = result_cache.restore_case(CACHE_DIR, cache_key, case_folder, base_name, verify_outputs, {"case": case_num, "cache_key": cache_key}) if cache_key else None
+            if cached:
+                print("      [Cache]: Restored from {} (~{:.0f} s of solving saved).".format(cached["source"], cached["solve_seconds"]))
+                result_cache.record_lookup(CACHE_DIR, cache_stats, os.path.basename(main_output_folder), case_num, cache_key, "hit", cached["solve_seconds"])
+                mechanical_helpers.log_case_telemetry(case_num, case, "Cached", case_folder)
+                if mechanical_helpers.finish_case(case_num, remaining_cases):
+                    stopped_early = True
+                    break
+                continue
+            
+            solve_start = time.time()
             success, msg = blocking_solve(analysis, solution)
+            solve_seconds = time.time() - solve_start
+            log_solve_time(case_num, val_p1, val_p2, val_p3, msg, solve_seconds)
+            if cache_key: result_cache.record_lookup(CACHE_DIR, cache_stats, os.path.basename(main_output_folder), case_num, cache_key, "miss", solve_seconds)
+            mechanical_helpers.memory_snapshot(case_num, "after_solve")
             
             if not success:
                 print("      !!! SOLVE FAILED: {} !!!".format(msg))
@@ -289,21 +611,27 @@ else:
                 p1.Suppressed = False
                 
                 log_failure(case_num, val_p1, val_p2, val_p3, msg)
-                garbage_collect_solver_files(solution) 
+                save_failed_profile(folder_name, p1, p2, p3)
+                cleaned = mechanical_helpers.clear_solver_files(solution) 
+                mechanical_helpers.log_case_telemetry(case_num, case, msg if cleaned else msg + " (cleanup failed)")
+                if mechanical_helpers.finish_case(case_num, remaining_cases):
+                    stopped_early = True
+                    break
                 continue # Skip the exports and move to the next case safely
             
-            # Formulate the folder names
-            base_name = "3bellows_{}_{}_{}".format(val_p1, val_p2, val_p3)
-            folder_name = "Case_{}_{}".format(case_num, base_name)
-            case_folder = os.path.join(main_output_folder, folder_name)
-            if not os.path.exists(case_folder): os.makedirs(case_folder)
+            # Everything is written to the staging folder and only renamed to case_folder once verified
+            stage_folder = case_commit.prepare_staging(case_folder)
 
             # Execute the massive exports
             print("      Exporting Time/Pressure Profile (kPa)...")
-            export_pressure_profile(case_folder, base_name, p1, p2, p3)
+            export_pressure_profile(stage_folder, base_name, p1, p2, p3)
 
-            print("      Exporting Multi-Frame Data (Static Target Pressures)...")
-            export_consolidated_data(case_folder, base_name, mesh_data, p1, p2, p3, def_x, def_y, def_z, eqv_strain, solution)
+            if NODE_EXPORT_MODE == "substeps":
+                print("      Exporting Solver Substep Data...")
+                export_substep_data(stage_folder, base_name, mesh_data, analysis, p1, p2, p3)
+            else:
+                print("      Exporting Multi-Frame Data (Static Target Pressures)...")
+                export_consolidated_data(stage_folder, base_name, mesh_data, p1, p2, p3, def_x, def_y, def_z, eqv_strain, solution)
 
             print("      Exporting Videos...")
             total_def.Activate()
@@ -316,27 +644,41 @@ else:
             
             # Export all 4 camera views precisely
             set_camera_custom(1, 0, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide1.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide1.avi"), GraphicsAnimationExportFormat.AVI)
             
             set_camera_custom(0, 1, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide2.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide2.avi"), GraphicsAnimationExportFormat.AVI)
 
             set_camera_custom(-1, 0, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide3.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide3.avi"), GraphicsAnimationExportFormat.AVI)
             
             set_camera_custom(0, 0, 1, 1, 0, 0, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewTop.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewTop.avi"), GraphicsAnimationExportFormat.AVI)
 
+            case_commit.commit_case(case_folder, verify_outputs(stage_folder, base_name), {"case": case_num, "cache_key": cache_key})
             print("      Case {} Complete.".format(case_num))
+            if cache_key: result_cache.store(CACHE_DIR, cache_key, case_folder, base_name, round(solve_seconds, 1), cache_identity, CACHE_MAX_GB)
+            
+            mechanical_helpers.memory_snapshot(case_num, "after_export")
             
             # Final RAM dump before moving to the next case
-            garbage_collect_solver_files(solution)
+            cleaned = mechanical_helpers.clear_solver_files(solution)
+            mechanical_helpers.log_case_telemetry(case_num, case, "Success" if cleaned else "Success (cleanup failed)", case_folder)
             
         except Exception as e:
             # Catch-all for unexpected Python errors (like network drive disconnects)
             print("Error on Case {}: {}".format(case_num, str(e)))
             log_failure(case_num, val_p1, val_p2, val_p3, "Script Exception: " + str(e))
-            garbage_collect_solver_files(solution) 
+            mechanical_helpers.clear_solver_files(solution) 
+            mechanical_helpers.log_case_telemetry(case_num, case, "Script Exception")
+        
+        if mechanical_helpers.finish_case(case_num, remaining_cases):
+            stopped_early = True
+            break
+
+    if not stopped_early:
+        mechanical_helpers.clear_checkpoint() # The run is complete, so the next session starts fresh
+    result_cache.report_stats(cache_stats)
 
 print("\nBatch Recovery Run Finished.")
 print("Videos and CSVs saved to: " + main_output_folder)
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import sys
 import System
 import time
 import datetime
@@ -22,19 +23,67 @@ DURATION = 8.0   # 1-second final pause (Total video length)
 FPS = 30
 VIDEO_FRAMES = int(DURATION * FPS) # Always yields exactly 240 frames
 
+# Which nodes export_consolidated_data writes: "all", "surface" (nodes on geometry faces),
+# "fps" (NODE_SAMPLE_COUNT surface nodes spread out by farthest-point sampling) or "named" (NODE_NAMED_SELECTION)
+NODE_SELECTION = "all"
+NODE_SAMPLE_COUNT = 500
+NODE_NAMED_SELECTION = "Markers"
+
+# Solver processes: concurrent Mechanical sessions on one machine split its cores and memory between them
+# (the thresholds for distributed and in-core solving are in mechanical_helpers.py)
+WORKER_COUNT = int(System.Environment.GetEnvironmentVariable("SOFTROBOT_WORKER_COUNT") or "1")
+MAX_SOLVER_CORES = None          # Licence cap (4 without HPC packs); None = the session's full share
+
 GROWTH_FACTOR = 2.0     # Keeps the camera bounds identical to the old 125-case dataset
 CAMERA_WAIT_TIME = 0.5 
 
 # Setup output directories on the Desktop
 desktop_path = System.Environment.GetFolderPath(System.Environment.SpecialFolder.Desktop)
+# Shared modules (mechanical_helpers.py, ...) sit in the code folder: SOFTROBOT_CODE_DIR or the Desktop
+CODE_DIR = System.Environment.GetEnvironmentVariable("SOFTROBOT_CODE_DIR") or desktop_path
+if CODE_DIR not in sys.path: sys.path.insert(0, CODE_DIR)
+import mechanical_helpers
+import result_cache
+import case_commit
 base_folder = os.path.join(desktop_path, "SoftRobot_Dataset_Hysteresis")
 timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 main_output_folder = os.path.join(base_folder, "Run_8s_Profile_" + timestamp)
+# An earlier Run_* folder to finish instead of starting a new one (cases with a _COMPLETE.json marker are skipped)
+RESUME_RUN_FOLDER = None
+if RESUME_RUN_FOLDER: main_output_folder = RESUME_RUN_FOLDER
+
+# A leak-triggered stop leaves a checkpoint and ends the script; nothing relaunches Mechanical from the GUI, so
+# restart it by hand and run this script again to continue that run
+CHECKPOINT_PATH = mechanical_helpers.checkpoint_path(base_folder, "simulate_3131")
+RESUME_FROM_CHECKPOINT = True
+resume_checkpoint = mechanical_helpers.read_checkpoint(CHECKPOINT_PATH) if RESUME_FROM_CHECKPOINT and not RESUME_RUN_FOLDER else None # An explicit folder wins
+if resume_checkpoint: main_output_folder = resume_checkpoint["run_folder"]
 
 if not os.path.exists(main_output_folder):
     os.makedirs(main_output_folder)
 
 failure_log_path = os.path.join(main_output_folder, "failed_cases.txt")
+failed_profile_folder = os.path.join(main_output_folder, "failed_profiles") # Profiles of failed cases, for failure_model.py
+solve_log_path = os.path.join(main_output_folder, "solve_log.csv")
+
+# Result cache (result_cache.py): finished cases keyed by mesh, model, load schedules, step/solver and export settings,
+# so a case identical to one from any earlier run is copied from the cache instead of solved
+RESULT_CACHE = True
+CACHE_DIR = os.path.join(base_folder, result_cache.CACHE_FOLDER)
+CACHE_MAX_GB = 200.0  # Least recently used cases are evicted beyond this
+CACHE_EXPORT_SETTINGS = ["simulate_3131.py", FPS, VIDEO_FRAMES, GROWTH_FACTOR, NODE_SELECTION, NODE_SAMPLE_COUNT, NODE_NAMED_SELECTION]
+cache_stats = result_cache.new_stats()
+
+# Resource governor (mechanical_helpers.py): the queue pauses before the output or solver scratch drive fills up,
+# after pruning this session's scratch files and evicting old result cache entries; every case's peak usage goes to
+# run_telemetry.csv (the thresholds are in mechanical_helpers.py)
+
+# Memory-leak watch (mechanical_helpers.py): process memory, .NET heap and handles per case phase go to memory_trace.csv,
+# and the session checkpoints and stops when the post-cleanup working set trends into the limit within a few cases
+
+# Case commits (case_commit.py): exports go to "<case folder>.partial", are verified and fsynced, get a _COMPLETE.json marker with
+# checksums and are renamed into place. Resume skips every case folder that has the marker.
+CASE_VIEWS = ["Side1", "Side2", "Side3", "Top"]
 print("Saving Data to: " + main_output_folder)
 
 # ==========================================
@@ -102,6 +151,13 @@ def log_failure(case_num, p1, p2, p3, error_msg):
     with open(failure_log_path, "a") as f:
         f.write("Case {}: P1={}, P2={}, P3={} | Error: {}\n".format(case_num, p1, p2, p3, error_msg))
 
+def log_solve_time(case_num, p1, p2, p3, status, seconds):
+    """Appends every solve attempt and its wall-clock time so failure_model.py can learn from it."""
+    is_new = not os.path.exists(solve_log_path)
+    with open(solve_log_path, "a") as f:
+        if is_new: f.write("Case, P1(Pa), P2(Pa), P3(Pa), Status, SolveTime(s)\n")
+        f.write("{}, {}, {}, {}, {}, {:.1f}\n".format(case_num, p1, p2, p3, status, seconds))
+
 def find_object(parent, name):
     """Utility to grab an object from the Ansys Mechanical Project Tree by name."""
     for child in parent.Children:
@@ -152,10 +208,26 @@ def export_pressure_profile(case_folder, base_name, load_p1, load_p2, load_p3):
             inst_p3 = get_interpolated_pressure(t, load_p3.Magnitude.Inputs[0].DiscreteValues, load_p3.Magnitude.Output.DiscreteValues) / 1000.0
             f.write("{:.4f}, {:.3f}, {:.3f}, {:.3f}\n".format(t, inst_p1, inst_p2, inst_p3))
 
+def save_failed_profile(folder_name, load_p1, load_p2, load_p3):
+    """Keeps the profile a failed case was solved with; failed cases have no case folder to hold it."""
+    try:
+        if not os.path.exists(failed_profile_folder): os.makedirs(failed_profile_folder)
+        export_pressure_profile(failed_profile_folder, folder_name, load_p1, load_p2, load_p3)
+    except Exception as e:
+        print("      [Warning]: Could not save the failed profile. " + str(e))
+
+def verify_outputs(folder, base_name):
+    return case_commit.verify_case(folder, base_name, VIDEO_FRAMES + 1, VIDEO_FRAMES, VIDEO_FRAMES, CASE_VIEWS)
+
+def select_export_nodes(mesh_data):
+    """The NODE_SELECTION node IDs to export (None = all nodes), cached per mesh in the dataset folder."""
+    return mechanical_helpers.select_export_nodes(ExtAPI, mesh_data, NODE_SELECTION, NODE_SAMPLE_COUNT, NODE_NAMED_SELECTION, base_folder)
+
 def export_consolidated_data(case_folder, base_name, mesh_data, load_p1, load_p2, load_p3, def_x, def_y, def_z, strain, solution_obj):
     """Iterates through every time step, evaluates the mesh, and saves the nodal positions/strains."""
     file_path = os.path.join(case_folder, base_name + "_NodeData.csv")
-    nodes_cache = {node.Id: {'X': node.X, 'Y': node.Y, 'Z': node.Z} for node in mesh_data.Nodes}
+    export_ids = select_export_nodes(mesh_data)
+    nodes_cache = {node.Id: {'X': node.X, 'Y': node.Y, 'Z': node.Z} for node in mesh_data.Nodes if export_ids is None or node.Id in export_ids}
     time_steps = [round((i + 1) * (DURATION / VIDEO_FRAMES), 4) for i in range(VIDEO_FRAMES)]
     
     peak_p1 = float(load_p1.Magnitude.Output.DiscreteValues[1].Value)
@@ -212,21 +284,11 @@ def blocking_solve(analysis_obj, solution_obj):
     while solution_obj.ObjectState != ObjectState.Solved:
         if time.time() - solve_start > TIMEOUT: return False, "Timeout"
         if solution_obj.ObjectState == ObjectState.SolveFailed: return False, "Divergence/Failure"
+        mechanical_helpers.sample_resources()
         time.sleep(1)
         
     return True, "Success"
 
-def garbage_collect_solver_files(solution_obj):
-    """Hard-flushes the RAM and Disk after every case to prevent memory fragmentation."""
-    print("      [Cleanup]: Purging massive solver result files...")
-    try:
-        solution_obj.ClearGeneratedData()
-        System.GC.Collect() # Forces the .NET environment to dump the nodal data from RAM
-        time.sleep(1) 
-        print("      [Cleanup]: Disk space recovered.")
-    except Exception as e:
-        print("      [Cleanup Warning]: Could not clear data. " + str(e))
-
 # ==========================================
 # --- MAIN EXECUTION ---
 # ==========================================
@@ -235,8 +297,11 @@ print("--- Starting Video-Focused Hysteresis Dataset Recovery (125 Cases) ---")
 analysis = ExtAPI.DataModel.Project.Model.Analyses[0]
 solution = analysis.Solution
 mesh_data = analysis.MeshData
+mechanical_helpers.start_governor(analysis, main_output_folder, CACHE_DIR)
+mechanical_helpers.start_leak_watch(main_output_folder, CHECKPOINT_PATH, resume_checkpoint["done_cases"] if resume_checkpoint else ())
 
 setup_analysis_steps(analysis)
+mechanical_helpers.configure_solver_processes(ExtAPI, analysis, DURATION, WORKER_COUNT, MAX_SOLVER_CORES)
 
 # Compute the zoom once to guarantee every video has the exact same spatial dimensions
 master_zoom = calculate_geometry_zoom(mesh_data)
@@ -256,6 +321,9 @@ else:
     try: total_def.DeformationScaling = 1 
     except: pass
 
+    # Only the exported node subset is evaluated; the videos still use the unscoped Total Deformation
+    mechanical_helpers.scope_results_to_nodes(ExtAPI, [def_x, def_y, def_z, eqv_strain], select_export_nodes(mesh_data))
+
     # Generate the grid array (0k, 25k, 50k, 75k, 100k)
     raw_levels = range(0, MAX_PRESSURE + 1, STEP_SIZE)
     # Replaces 0 with MIN_PRESSURE to prevent negative volumes
@@ -268,6 +336,7 @@ else:
             for v3 in pressure_levels:
                 load_cases.append((v1, v2, v3))
 
+    stopped_early = False
     for i, case in enumerate(load_cases):
         case_num = i + 1
         
@@ -279,6 +348,23 @@ else:
         
         val_p1, val_p2, val_p3 = case
         
+        # Formulate the folder names
+        base_name = "3bellows_{}_{}_{}".format(val_p1, val_p2, val_p3)
+        folder_name = "Case_{}_{}".format(case_num, base_name)
+        case_folder = os.path.join(main_output_folder, folder_name)
+        if case_commit.is_complete(case_folder):
+            continue # Committed with its marker in an earlier session; anything without one is redone
+        if mechanical_helpers.is_done(case_num):
+            continue # Already handled before the checkpointed stop
+        remaining_cases = len(load_cases) - i - 1
+        
+        if not mechanical_helpers.wait_for_resources(solution):
+            log_failure(case_num, val_p1, val_p2, val_p3, "Stopped: out of disk space")
+            stopped_early = True
+            break
+        mechanical_helpers.reset_case_usage()
+        mechanical_helpers.memory_snapshot(case_num, "before_solve")
+        
         try:
             print("\n=== Processing Case {}/125 [Peak: P1={}, P2={}, P3={}] ===".format(case_num, val_p1, val_p2, val_p3))
             
@@ -287,7 +373,25 @@ else:
             set_load_schedule(p2, val_p2)
             set_load_schedule(p3, val_p3)
             
+            # An identical case (same mesh, model, schedules, steps and export settings) solved in any earlier run
+            cache_identity = mechanical_helpers.result_cache_identity(ExtAPI, analysis, mesh_data, [p1, p2, p3], CACHE_EXPORT_SETTINGS) if RESULT_CACHE else None
+            cache_key = result_cache.cache_key(cache_identity) if cache_identity else None
+            cached = result_cache.restore_case(CACHE_DIR, cache_key, case_folder, base_name, verify_outputs, {"case": case_num, "cache_key": cache_key}) if cache_key else None
+            if cached:
+                print("      [Cache]: Restored from {} (~{:.0f} s of solving saved).".format(cached["source"], cached["solve_seconds"]))
+                result_cache.record_lookup(CACHE_DIR, cache_stats, os.path.basename(main_output_folder), case_num, cache_key, "hit", cached["solve_seconds"])
+                mechanical_helpers.log_case_telemetry(case_num, case, "Cached", case_folder)
+                if mechanical_helpers.finish_case(case_num, remaining_cases):
+                    stopped_early = True
+                    break
+                continue
+            
+            solve_start = time.time()
             success, msg = blocking_solve(analysis, solution)
+            solve_seconds = time.time() - solve_start
+            log_solve_time(case_num, val_p1, val_p2, val_p3, msg, solve_seconds)
+            if cache_key: result_cache.record_lookup(CACHE_DIR, cache_stats, os.path.basename(main_output_folder), case_num, cache_key, "miss", solve_seconds)
+            mechanical_helpers.memory_snapshot(case_num, "after_solve")
             
             if not success:
                 print("      !!! SOLVE FAILED: {} !!!".format(msg))
@@ -301,21 +405,23 @@ else:
                 p1.Suppressed = False
                 
                 log_failure(case_num, val_p1, val_p2, val_p3, msg)
-                garbage_collect_solver_files(solution) 
+                save_failed_profile(folder_name, p1, p2, p3)
+                cleaned = mechanical_helpers.clear_solver_files(solution)
+                mechanical_helpers.log_case_telemetry(case_num, case, msg if cleaned else msg + " (cleanup failed)")
+                if mechanical_helpers.finish_case(case_num, remaining_cases):
+                    stopped_early = True
+                    break
                 continue # Skip the exports and move to the next case safely
             
-            # Formulate the folder names
-            base_name = "3bellows_{}_{}_{}".format(val_p1, val_p2, val_p3)
-            folder_name = "Case_{}_{}".format(case_num, base_name)
-            case_folder = os.path.join(main_output_folder, folder_name)
-            if not os.path.exists(case_folder): os.makedirs(case_folder)
+            # Everything is written to the staging folder and only renamed to case_folder once verified
+            stage_folder = case_commit.prepare_staging(case_folder)
 
             # Execute the massive exports
             print("      Exporting Time/Pressure Profile (kPa)...")
-            export_pressure_profile(case_folder, base_name, p1, p2, p3)
+            export_pressure_profile(stage_folder, base_name, p1, p2, p3)
 
             print("      Exporting Multi-Frame Data (Static Target Pressures)...")
-            export_consolidated_data(case_folder, base_name, mesh_data, p1, p2, p3, def_x, def_y, def_z, eqv_strain, solution)
+            export_consolidated_data(stage_folder, base_name, mesh_data, p1, p2, p3, def_x, def_y, def_z, eqv_strain, solution)
 
             print("      Exporting Videos...")
             total_def.Activate()
@@ -328,27 +434,41 @@ else:
             
             # Export all 4 camera views precisely
             set_camera_custom(1, 0, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide1.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide1.avi"), GraphicsAnimationExportFormat.AVI)
             
             set_camera_custom(0, 1, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide2.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide2.avi"), GraphicsAnimationExportFormat.AVI)
 
             set_camera_custom(-1, 0, 0, 0, 0, 1, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewSide3.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewSide3.avi"), GraphicsAnimationExportFormat.AVI)
             
             set_camera_custom(0, 0, 1, 1, 0, 0, master_zoom)
-            total_def.ExportAnimation(os.path.join(case_folder, base_name + "_ViewTop.avi"), GraphicsAnimationExportFormat.AVI)
+            total_def.ExportAnimation(os.path.join(stage_folder, base_name + "_ViewTop.avi"), GraphicsAnimationExportFormat.AVI)
 
+            case_commit.commit_case(case_folder, verify_outputs(stage_folder, base_name), {"case": case_num, "cache_key": cache_key})
             print("      Case {} Complete.".format(case_num))
+            if cache_key: result_cache.store(CACHE_DIR, cache_key, case_folder, base_name, round(solve_seconds, 1), cache_identity, CACHE_MAX_GB)
+            
+            mechanical_helpers.memory_snapshot(case_num, "after_export")
             
             # Final RAM dump before moving to the next case
-            garbage_collect_solver_files(solution)
+            cleaned = mechanical_helpers.clear_solver_files(solution)
+            mechanical_helpers.log_case_telemetry(case_num, case, "Success" if cleaned else "Success (cleanup failed)", case_folder)
             
         except Exception as e:
             # Catch-all for unexpected Python errors (like network drive disconnects)
             print("Error on Case {}: {}".format(case_num, str(e)))
             log_failure(case_num, val_p1, val_p2, val_p3, "Script Exception: " + str(e))
-            garbage_collect_solver_files(solution) 
+            mechanical_helpers.clear_solver_files(solution)
+            mechanical_helpers.log_case_telemetry(case_num, case, "Script Exception")
+        
+        if mechanical_helpers.finish_case(case_num, remaining_cases):
+            stopped_early = True
+            break
+
+    if not stopped_early:
+        mechanical_helpers.clear_checkpoint() # The run is complete, so the next session starts fresh
+    result_cache.report_stats(cache_stats)
 
 print("\nBatch Recovery Run Finished.")
 print("Videos and CSVs saved to: " + main_output_folder)
\ No newline at end of file
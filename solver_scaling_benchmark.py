@@ -0,0 +1,119 @@
+import sys
+import time
+import System
+from Ansys.Mechanical.DataModel.Enums import AutomaticTimeStepping, LineSearchType, SolverType, ObjectState
+
+# ==========================================
+# --- BENCHMARK CONFIGURATION ---
+# ==========================================
+# One representative 4-2-4 case (asymmetric bending, the slowest kind to converge) solved at every core count
+# in shared and distributed memory, to pick the per-session core share for WORKER_COUNT parallel sessions.
+TEST_P1 = 100000 # 100 kPa
+TEST_P2 = 1      # Minimum pressure
+TEST_P3 = 60000  # 60 kPa
+DURATION = 10.0
+
+# The solve configuration and threads per core the drivers use come from mechanical_helpers.py in the code folder
+CODE_DIR = System.Environment.GetEnvironmentVariable("SOFTROBOT_CODE_DIR") or System.Environment.GetFolderPath(System.Environment.SpecialFolder.Desktop)
+if CODE_DIR not in sys.path: sys.path.insert(0, CODE_DIR)
+from mechanical_helpers import SOLVE_CONFIGURATION, THREADS_PER_CORE
+CORE_COUNTS = None         # None = 1, 2, 4 ... up to the physical cores
+MEMORY_MODES = ["shared", "distributed"]
+TIMEOUT = 7200
+
+def set_benchmark_loads(load_obj, peak_val):
+    times = [Quantity("0 [s]"), Quantity("4 [s]"), Quantity("6 [s]"), Quantity(str(DURATION) + " [s]")]
+    pressures = [Quantity("1 [Pa]"), Quantity(str(peak_val) + " [Pa]"), Quantity(str(peak_val) + " [Pa]"), Quantity("1 [Pa]")]
+    load_obj.Magnitude.Inputs[0].DiscreteValues = times
+    load_obj.Magnitude.Output.DiscreteValues = pressures
+
+def timed_solve(analysis, solution):
+    solution.ClearGeneratedData()
+    time.sleep(1)
+    start_time = time.time()
+    analysis.Solve()
+    while True:
+        elapsed = time.time() - start_time
+        if solution.ObjectState == ObjectState.Solved:
+            return True, elapsed
+        if solution.ObjectState == ObjectState.SolveFailed or elapsed > TIMEOUT:
+            return False, elapsed
+        time.sleep(2)
+
+def run_benchmark():
+    print("\n=== Starting Solver Scaling Benchmark ===")
+    analysis = ExtAPI.DataModel.Project.Model.Analyses[0]
+    solution = analysis.Solution
+
+    # Same step settings as simulate.py
+    settings = analysis.AnalysisSettings
+    settings.NumberOfSteps = 3
+    settings.SetStepEndTime(1, Quantity("4 [s]"))
+    settings.SetStepEndTime(2, Quantity("6 [s]"))
+    settings.SetStepEndTime(3, Quantity(str(DURATION) + " [s]"))
+    settings.LargeDeflection = True
+    settings.LineSearch = LineSearchType.On
+    settings.SolverType = SolverType.Iterative
+    for step in [1, 2, 3]:
+        settings.SetAutomaticTimeStepping(step, AutomaticTimeStepping.On)
+        settings.SetInitialSubsteps(step, 100)
+        settings.SetMinimumSubsteps(step, 20)
+        settings.SetMaximumSubsteps(step, 5000)
+
+    def find_object(parent, name):
+        for child in parent.Children:
+            if child.Name == name: return child
+        return None
+
+    p1 = find_object(analysis, "Pressure")
+    p2 = find_object(analysis, "Pressure 2")
+    p3 = find_object(analysis, "Pressure 3")
+    if not (p1 and p2 and p3):
+        print("Error: Could not find all three Pressure objects.")
+        return
+    set_benchmark_loads(p1, TEST_P1)
+    set_benchmark_loads(p2, TEST_P2)
+    set_benchmark_loads(p3, TEST_P3)
+
+    physical = max(1, System.Environment.ProcessorCount // THREADS_PER_CORE)
+    core_counts = CORE_COUNTS
+    if core_counts is None:
+        core_counts = [1]
+        while core_counts[-1] * 2 <= physical:
+            core_counts.append(core_counts[-1] * 2)
+        if core_counts[-1] != physical: core_counts.append(physical)
+    print("{} physical cores; testing {} in {} memory.".format(physical, core_counts, " and ".join(MEMORY_MODES)))
+
+    config = ExtAPI.Application.SolveConfigurations[SOLVE_CONFIGURATION]
+    config.Default = True
+    results = []
+    for mode in MEMORY_MODES:
+        for cores in core_counts:
+            if mode == "distributed" and cores < 2: continue
+            config.SolveProcessSettings.MaxNumberOfCores = cores
+            config.SolveProcessSettings.DistributeSolution = (mode == "distributed")
+            print("Solving with {} cores ({})...".format(cores, mode))
+            success, seconds = timed_solve(analysis, solution)
+            print("    {} in {:.1f} s".format("Solved" if success else "FAILED", seconds))
+            results.append((mode, cores, success, seconds))
+
+    # --- Report ---
+    print("\n=== Benchmark Results ===")
+    baseline = [r[3] for r in results if r[0] == "shared" and r[1] == 1 and r[2]]
+    print("{:<12} {:>5} {:>8} {:>10} {:>8} {:>10}".format("Mode", "Cores", "Status", "Time (s)", "Speedup", "Efficiency"))
+    for mode, cores, success, seconds in results:
+        if success and baseline:
+            speedup = baseline[0] / seconds
+            print("{:<12} {:>5} {:>8} {:>10.1f} {:>7.2f}x {:>10.0%}".format(mode, cores, "OK", seconds, speedup, speedup / cores))
+        else:
+            print("{:<12} {:>5} {:>8} {:>10.1f}".format(mode, cores, "OK" if success else "FAILED", seconds))
+
+    # Throughput of N sessions with physical/N cores each, assuming sessions don't slow each other down
+    solved = [r for r in results if r[2]]
+    if solved:
+        best = min(solved, key=lambda r: r[3] * r[1])
+        print("Best throughput per core: {} cores ({}) -> about {} parallel sessions (WORKER_COUNT).".format(
+            best[1], best[0], max(1, physical // best[1])))
+
+# Execute the benchmark
+run_benchmark()
@@ -0,0 +1,97 @@
+# ==========================================
+# --- CONFIGURATION (ANALYSIS STEP PLANNER) ---
+# ==========================================
+# Shared by random_walk.py, sweep_spec.py (so sweep_engine.py lays out random-walk sweeps the same way) and
+# step_planner_benchmark.py, imported from the code folder. Plain Python, so it also runs outside Mechanical.
+# A plan is a list of (step end time [s], initial substeps, minimum substeps).
+COLLINEAR_TOLERANCE = 1.0      # Pa; common breakpoints that every bellow crosses in a straight line are dropped
+SLOPE_MERGE_TOLERANCE = 2000.0 # Pa/s; a breakpoint stays a step end if any bellow's slope changes more than this
+PRESSURE_PER_SUBSTEP = 1000.0  # Pa of change (fastest bellow) per initial substep; a full 100 kPa ramp keeps 100
+MIN_INITIAL_SUBSTEPS = 10
+MAX_INITIAL_SUBSTEPS = 100
+MIN_SUBSTEP_FRACTION = 0.2     # Minimum substeps as a fraction of the initial ones (100/20 in the flat setting)
+FLAT_INITIAL_SUBSTEPS = 100
+FLAT_MIN_SUBSTEPS = 20
+
+# The largest substep the solver may grow to still has to resolve the exported video: the flat plan's 3 s
+# waypoint steps with 20 minimum substeps allow 0.15 s = 4.5 frames at 30 FPS, and merged steps keep that floor
+FPS = 30
+MAX_FRAMES_PER_SUBSTEP = 4.5
+
+def interpolate(t_target, times, pressures):
+    """Linear interpolation of one channel's breakpoints, held at the end values outside them."""
+    if t_target <= times[0]: return pressures[0]
+    if t_target >= times[-1]: return pressures[-1]
+    for i in range(len(times) - 1):
+        t0, t1 = times[i], times[i+1]
+        if t0 <= t_target <= t1:
+            return pressures[i] + (pressures[i+1] - pressures[i]) * (t_target - t0) / (t1 - t0)
+    return pressures[-1]
+
+def common_schedule(channels):
+    """Merges per-bellow (times, pressures) breakpoints onto one shared time axis.
+
+    The union of all breakpoints is taken, each channel is re-sampled onto it, and any breakpoint
+    that every channel passes through in a straight line is dropped. The result is the smallest
+    axis that reproduces all three loads exactly, so it doubles as the list of step end times.
+    """
+    union = sorted(set(t for times, _ in channels for t in times))
+    values = [[interpolate(t, times, pressures) for t in union] for times, pressures in channels]
+
+    keep = [0]
+    for k in range(1, len(union) - 1):
+        # Dropping k is only safe if every point since the last kept one sits on the line to k + 1
+        a, b = keep[-1], k + 1
+        collinear = True
+        for ch in values:
+            for j in range(a + 1, b):
+                w = (union[j] - union[a]) / (union[b] - union[a])
+                if abs(ch[j] - (ch[a] + (ch[b] - ch[a]) * w)) > COLLINEAR_TOLERANCE:
+                    collinear = False
+                    break
+            if not collinear: break
+        if not collinear: keep.append(k)
+    keep.append(len(union) - 1)
+
+    return [union[k] for k in keep], [[ch[k] for k in keep] for ch in values]
+
+def flat_step_plan(times):
+    """The original plan: one step per breakpoint, 100 initial / 20 minimum substeps each."""
+    return [(t, FLAT_INITIAL_SUBSTEPS, FLAT_MIN_SUBSTEPS) for t in times[1:]]
+
+def minimum_substeps(duration, fps=FPS):
+    """Fewest substeps that keep every substep of a `duration` s step within MAX_FRAMES_PER_SUBSTEP frames."""
+    return max(1, int(-(-round(duration * fps, 6) // MAX_FRAMES_PER_SUBSTEP)))
+
+def plan_analysis_steps(times, channels, fps=FPS):
+    """Merges consecutive segments with similar slopes into one step and budgets substeps by pressure change.
+
+    Within a step the tabular loads are still interpolated through every breakpoint, so merging only
+    removes step overhead. Turning points (a slope changing sign) always end a step. The minimum substeps
+    never drop below the frame-rate floor of minimum_substeps, and the initial ones never below the minimum.
+    """
+    slopes = [[(ch[k + 1] - ch[k]) / (times[k + 1] - times[k]) for k in range(len(times) - 1)] for ch in channels]
+
+    step_ends, step_start = [], 0
+    for k in range(1, len(times) - 1):
+        split = False
+        for ch_slopes in slopes:
+            first, prev, cur = ch_slopes[step_start], ch_slopes[k - 1], ch_slopes[k]
+            turning = (prev > 0 and cur <= 0) or (prev < 0 and cur >= 0) or (prev == 0 and cur != 0)
+            if turning or abs(cur - first) > SLOPE_MERGE_TOLERANCE:
+                split = True
+                break
+        if split:
+            step_ends.append(k)
+            step_start = k
+    step_ends.append(len(times) - 1)
+
+    plan, start = [], 0
+    for end in step_ends:
+        # Total pressure travel of the busiest bellow within this step
+        travel = max(sum(abs(ch[j + 1] - ch[j]) for j in range(start, end)) for ch in channels)
+        initial = int(min(MAX_INITIAL_SUBSTEPS, max(MIN_INITIAL_SUBSTEPS, -(-travel // PRESSURE_PER_SUBSTEP))))
+        minimum = max(int(initial * MIN_SUBSTEP_FRACTION), minimum_substeps(times[end] - times[start], fps))
+        plan.append((times[end], max(initial, minimum), minimum))
+        start = end
+    return plan
@@ -0,0 +1,105 @@
+import sys
+import time
+import System
+from Ansys.Mechanical.DataModel.Enums import AutomaticTimeStepping, LineSearchType, SolverType, ObjectState
+
+# ==========================================
+# --- BENCHMARK CONFIGURATION ---
+# ==========================================
+# Fixed many-waypoint walks (Pa) at 3 s spacing: long monotone ramps, a zig-zag and a hold-heavy walk.
+# Each is solved twice, once with the flat 100/20 substeps per breakpoint and once with the step planner.
+WAYPOINT_TIMES = [0.0, 3.0, 6.0, 9.0, 12.0, 15.0, 18.0, 21.0, 24.0, 27.0, 30.0]
+BENCHMARK_WALKS = [
+    ("monotone ramps", [1, 10000, 20000, 30000, 40000, 50000, 40000, 30000, 20000, 10000, 1],
+                       [1, 8000, 16000, 24000, 32000, 40000, 32000, 24000, 16000, 8000, 1],
+                       [1, 12000, 24000, 36000, 48000, 60000, 48000, 36000, 24000, 12000, 1]),
+    ("zig-zag",        [1, 40000, 10000, 50000, 20000, 60000, 20000, 50000, 10000, 40000, 1],
+                       [1, 20000, 40000, 10000, 50000, 20000, 50000, 10000, 40000, 20000, 1],
+                       [1, 30000, 30000, 60000, 30000, 30000, 60000, 30000, 30000, 30000, 1]),
+    ("holds",          [1, 30000, 30000, 30000, 60000, 60000, 60000, 30000, 30000, 30000, 1],
+                       [1, 1, 1, 1, 20000, 20000, 20000, 1, 1, 1, 1],
+                       [1, 50000, 50000, 50000, 50000, 50000, 50000, 50000, 50000, 50000, 1]),
+]
+
+TIMEOUT = 7200
+
+# The planner is shared with random_walk.py through the code folder: SOFTROBOT_CODE_DIR or the Desktop
+CODE_DIR = System.Environment.GetEnvironmentVariable("SOFTROBOT_CODE_DIR") or System.Environment.GetFolderPath(System.Environment.SpecialFolder.Desktop)
+if CODE_DIR not in sys.path: sys.path.insert(0, CODE_DIR)
+from step_planner import flat_step_plan, plan_analysis_steps
+
+def apply_step_plan(settings, step_plan):
+    settings.NumberOfSteps = len(step_plan)
+    for i, (end_time, initial, minimum) in enumerate(step_plan):
+        step = i + 1
+        settings.SetStepEndTime(step, Quantity(str(end_time) + " [s]"))
+        settings.SetAutomaticTimeStepping(step, AutomaticTimeStepping.On)
+        settings.SetInitialSubsteps(step, initial)
+        settings.SetMinimumSubsteps(step, minimum)
+        settings.SetMaximumSubsteps(step, 5000)
+
+def set_benchmark_loads(load_obj, pressures):
+    load_obj.Magnitude.Inputs[0].DiscreteValues = [Quantity(str(t) + " [s]") for t in WAYPOINT_TIMES]
+    load_obj.Magnitude.Output.DiscreteValues = [Quantity(str(p) + " [Pa]") for p in pressures]
+
+def timed_solve(analysis, solution):
+    solution.ClearGeneratedData()
+    time.sleep(1)
+    start_time = time.time()
+    analysis.Solve()
+    while True:
+        elapsed = time.time() - start_time
+        if solution.ObjectState == ObjectState.Solved:
+            return True, elapsed
+        if solution.ObjectState == ObjectState.SolveFailed or elapsed > TIMEOUT:
+            return False, elapsed
+        time.sleep(2)
+
+def run_benchmark():
+    print("\n=== Starting Step Planner Benchmark ===")
+    analysis = ExtAPI.DataModel.Project.Model.Analyses[0]
+    solution = analysis.Solution
+
+    settings = analysis.AnalysisSettings
+    settings.LargeDeflection = True
+    settings.LineSearch = LineSearchType.On
+    settings.SolverType = SolverType.Iterative
+
+    def find_object(parent, name):
+        for child in parent.Children:
+            if child.Name == name: return child
+        return None
+
+    loads = [find_object(analysis, "Pressure"), find_object(analysis, "Pressure 2"), find_object(analysis, "Pressure 3")]
+    if not all(loads):
+        print("Error: Could not find all three Pressure objects.")
+        return
+
+    results = []
+    for name, p1, p2, p3 in BENCHMARK_WALKS:
+        for load_obj, pressures in zip(loads, [p1, p2, p3]):
+            set_benchmark_loads(load_obj, pressures)
+
+        for label, plan in [("flat", flat_step_plan(WAYPOINT_TIMES)), ("planned", plan_analysis_steps(WAYPOINT_TIMES, [p1, p2, p3]))]:
+            apply_step_plan(settings, plan)
+            forced = sum(p[1] for p in plan)
+            print("{} / {}: {} steps, {} forced initial substeps. Solving...".format(name, label, len(plan), forced))
+            success, seconds = timed_solve(analysis, solution)
+            print("    {} in {:.1f} s".format("Solved" if success else "FAILED", seconds))
+            results.append((name, label, len(plan), forced, success, seconds))
+
+    # --- Report ---
+    print("\n=== Benchmark Results ===")
+    print("{:<16} {:<8} {:>5} {:>8} {:>8} {:>10}".format("Walk", "Plan", "Steps", "Forced", "Status", "Time (s)"))
+    for name, label, steps, forced, success, seconds in results:
+        print("{:<16} {:<8} {:>5} {:>8} {:>8} {:>10.1f}".format(name, label, steps, forced, "OK" if success else "FAILED", seconds))
+
+    flat_total = sum(r[5] for r in results if r[1] == "flat" and r[4])
+    planned_total = sum(r[5] for r in results if r[1] == "planned" and r[4])
+    if all(r[4] for r in results) and flat_total > 0:
+        print("Total solve time: flat {:.1f} s, planned {:.1f} s ({:+.1%})".format(flat_total, planned_total, planned_total / flat_total - 1.0))
+    else:
+        print("Some solves failed; compare only the walks that solved under both plans.")
+
+# Execute the benchmark
+run_benchmark()
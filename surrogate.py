@@ -0,0 +1,211 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import numpy as np
+from scipy.interpolate import RBFInterpolator
+
+from node_data import find_case_folders, node_data_path, read_node_data
+
+# ==========================================
+# --- CONFIGURATION (REDUCED-ORDER SURROGATE) ---
+# ==========================================
+NUM_MODES = 12            # POD modes kept; bellows bend in a handful of shapes
+FRAME_STRIDE = 10         # Every 10th frame feeds the POD basis (all frames feed the interpolator)
+HOLDOUT_FRACTION = 0.15   # Grid cases withheld to report honest interpolation error
+RBF_NEIGHBORS = 64        # Local RBF keeps queries in milliseconds on 60k+ training snapshots
+RBF_SMOOTHING = 1e-6
+RBF_EPSILON = 2.0         # Multiquadric shape; a constant-only polynomial tail survives degenerate neighbourhoods
+
+# Snapshot inputs: instantaneous pressures plus where we are on the hysteresis loop
+PRESSURE_SCALE = 100.0    # kPa
+DIRECTION_DEADBAND = 0.5  # kPa/s below which the bellows count as holding
+DIRECTION_WEIGHT = 0.5    # Loading vs unloading separation in input space
+HOLD_SCALE = 2.0          # s, creep during a hold is measured in units of the 4-2-4 hold
+
+# Default schedule for --peaks queries (the simulate.py 4-2-4 profile)
+PROFILE_TIMES = [0.0, 4.0, 6.0, 10.0]
+FPS = 30
+MIN_PRESSURE = 0.001      # kPa
+
+# ==========================================
+# --- INPUT FEATURES ---
+# ==========================================
+def read_pressure_profile(csv_path):
+    data = np.genfromtxt(csv_path, delimiter=",", skip_header=1)
+    return data[:, 0], data[:, 1:4]
+
+def schedule_inputs(frame_times, profile_times, profile_kpa):
+    """Maps a 3-channel schedule onto surrogate inputs (P1, P2, P3, direction, hold time) at each frame."""
+    p = np.stack([np.interp(frame_times, profile_times, profile_kpa[:, ch]) for ch in range(3)], axis=1)
+    rate = np.gradient(p, frame_times, axis=0) if len(frame_times) > 1 else np.zeros_like(p)
+
+    mean_rate = rate.mean(axis=1)
+    direction = np.where(mean_rate > DIRECTION_DEADBAND, 1.0, np.where(mean_rate < -DIRECTION_DEADBAND, -1.0, 0.0))
+
+    holding = np.all(np.abs(rate) < DIRECTION_DEADBAND, axis=1)
+    hold_time = np.zeros(len(frame_times))
+    for i in range(1, len(frame_times)):
+        hold_time[i] = hold_time[i - 1] + (frame_times[i] - frame_times[i - 1]) if holding[i] else 0.0
+
+    return np.column_stack([p / PRESSURE_SCALE, DIRECTION_WEIGHT * direction, hold_time / HOLD_SCALE])
+
+def peak_schedule(peaks_pa, duration):
+    """The simulate.py 4-2-4 schedule for arbitrary peak pressures, in kPa."""
+    times = np.array(PROFILE_TIMES[:-1] + [duration])
+    pressures = np.array([[MIN_PRESSURE] * 3, [p / 1000.0 for p in peaks_pa], [p / 1000.0 for p in peaks_pa], [MIN_PRESSURE] * 3])
+    return times, pressures
+
+# ==========================================
+# --- BUILD ---
+# ==========================================
+def load_case(folder):
+    """(inputs per frame, displacements F x 3N float32, node ids, coords) for one exported case."""
+    times, node_ids, coords, values = read_node_data(node_data_path(folder))
+    profile_t, profile_p = read_pressure_profile(glob.glob(os.path.join(folder, "*_PressureProfile.csv"))[0])
+    disp = np.nan_to_num(values[:, :, :3]).reshape(len(times), -1).astype(np.float32)
+    return schedule_inputs(times, profile_t, profile_p), disp, node_ids, coords, times
+
+def pod_basis(folders):
+    """Mean field and leading POD modes from a frame-strided snapshot set."""
+    snapshots = []
+    for folder in folders:
+        _, disp, _, _, _ = load_case(folder)
+        snapshots.append(disp[::FRAME_STRIDE])
+    S = np.vstack(snapshots)
+    mean = S.mean(axis=0)
+    _, sv, vt = np.linalg.svd(S - mean, full_matrices=False)
+    r = min(NUM_MODES, len(sv))
+    energy = (sv[:r] ** 2).sum() / (sv ** 2).sum()
+    return mean.astype(np.float32), vt[:r].astype(np.float32), float(energy)
+
+def project_cases(folders, mean, basis):
+    """Stacks the (inputs, modal coefficients) of every frame of every case, one case in memory at a time."""
+    X, C = [], []
+    for folder in folders:
+        inputs, disp, _, _, _ = load_case(folder)
+        X.append(inputs)
+        C.append((disp - mean) @ basis.T)
+    return np.vstack(X), np.vstack(C)
+
+def fit_interpolator(X, C):
+    return RBFInterpolator(X, C, neighbors=min(RBF_NEIGHBORS, len(X)), smoothing=RBF_SMOOTHING,
+                           kernel="multiquadric", epsilon=RBF_EPSILON, degree=0)
+
+def holdout_error(folders, seed=0):
+    """Relative RMS displacement error on grid cases the surrogate never saw."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(folders))
+    n_test = max(1, int(round(HOLDOUT_FRACTION * len(folders))))
+    test = [folders[i] for i in order[:n_test]]
+    train = [folders[i] for i in order[n_test:]]
+
+    mean, basis, _ = pod_basis(train)
+    X, C = project_cases(train, mean, basis)
+    interp = fit_interpolator(X, C)
+
+    sq_err, sq_ref = 0.0, 0.0
+    for folder in test:
+        inputs, disp, _, _, _ = load_case(folder)
+        pred = interp(inputs) @ basis + mean
+        sq_err += float(((pred - disp) ** 2).sum())
+        sq_ref += float((disp ** 2).sum())
+    return np.sqrt(sq_err / max(sq_ref, 1e-30)), n_test
+
+def build(run_folders, model_path):
+    """Fits the POD + RBF surrogate on every case of the sweep and saves it as one compressed .npz."""
+    folders = [f for f in find_case_folders(run_folders) if glob.glob(os.path.join(f, "*_PressureProfile.csv"))]
+    if len(folders) < 4:
+        print("Need at least 4 exported cases to build a surrogate.")
+        return None
+    print("Building surrogate from {} cases...".format(len(folders)))
+
+    err, n_test = holdout_error(folders)
+    print("    Held-out relative RMS error: {:.2%} ({} cases withheld)".format(err, n_test))
+
+    mean, basis, energy = pod_basis(folders)
+    X, C = project_cases(folders, mean, basis)
+    _, _, node_ids, coords, times = load_case(folders[0])
+    print("    {} POD modes capture {:.4%} of the snapshot energy".format(len(basis), energy))
+
+    np.savez_compressed(model_path, mean=mean, basis=basis, inputs=X.astype(np.float32),
+                        coefficients=C.astype(np.float32), node_ids=node_ids, coords=coords.astype(np.float32),
+                        duration=float(times[-1]), holdout_error=err)
+    footprint = mean.nbytes + basis.nbytes + X.size * 4 + C.size * 4 + coords.size * 4 + node_ids.nbytes
+    print("    Model footprint: {:.1f} MB in memory, {:.1f} MB on disk -> {}".format(
+        footprint / 1e6, os.path.getsize(model_path) / 1e6, model_path))
+    return model_path
+
+# ==========================================
+# --- QUERY ---
+# ==========================================
+class Surrogate:
+    """Loaded surrogate; predict() answers a whole schedule in milliseconds."""
+
+    def __init__(self, model_path):
+        data = np.load(model_path)
+        self.mean = data["mean"]
+        self.basis = data["basis"]
+        self.node_ids = data["node_ids"]
+        self.coords = data["coords"]
+        self.duration = float(data["duration"])
+        self.holdout_error = float(data["holdout_error"])
+        self.interp = fit_interpolator(data["inputs"].astype(float), data["coefficients"].astype(float))
+
+    def predict(self, frame_times, profile_times, profile_kpa):
+        """Per-node displacement (frames x nodes x 3, m) for any 3-channel schedule in kPa."""
+        coeffs = self.interp(schedule_inputs(np.asarray(frame_times, dtype=float), profile_times, profile_kpa))
+        return (coeffs @ self.basis + self.mean).reshape(len(frame_times), len(self.node_ids), 3)
+
+def write_prediction(csv_path, frame_times, node_ids, coords, disp):
+    with open(csv_path, "w") as f:
+        f.write("Time(s), NodeID, X_und(m), Y_und(m), Z_und(m), DefX(m), DefY(m), DefZ(m)\n")
+        for fi, t in enumerate(frame_times):
+            for ni, nid in enumerate(node_ids):
+                f.write("{:.4f}, {}, {:.6f}, {:.6f}, {:.6f}, {:.6e}, {:.6e}, {:.6e}\n".format(
+                    t, nid, coords[ni, 0], coords[ni, 1], coords[ni, 2], disp[fi, ni, 0], disp[fi, ni, 1], disp[fi, ni, 2]))
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="POD + RBF surrogate of per-node displacement over pressure schedules.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("build", help="Fit the surrogate on one or more Run_* folders")
+    b.add_argument("runs", nargs="+")
+    b.add_argument("--out", default="surrogate.npz")
+    q = sub.add_parser("query", help="Predict NodeData for a new schedule")
+    q.add_argument("model")
+    q.add_argument("--peaks", nargs=3, type=float, metavar=("P1", "P2", "P3"), help="Peak pressures (Pa) of a 4-2-4 case")
+    q.add_argument("--schedule", help="Profile CSV (Time [s], P1 [kPa], P2 [kPa], P3 [kPa])")
+    q.add_argument("--out", default="surrogate_NodeData.csv")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        run_folders = []
+        for path in args.runs:
+            nested = sorted(glob.glob(os.path.join(path, "Run_*")))
+            run_folders.extend(nested if nested else [path])
+        return 0 if build(run_folders, args.out) else 1
+
+    model = Surrogate(args.model)
+    if args.schedule:
+        profile_t, profile_p = read_pressure_profile(args.schedule)
+    elif args.peaks:
+        profile_t, profile_p = peak_schedule(args.peaks, model.duration)
+    else:
+        parser.error("query needs --peaks or --schedule")
+
+    frames = int(round(profile_t[-1] * FPS))
+    frame_times = np.round((np.arange(frames) + 1) * (profile_t[-1] / frames), 4)
+    start = time.time()
+    disp = model.predict(frame_times, profile_t, profile_p)
+    print("Predicted {} frames x {} nodes in {:.1f} ms (held-out error {:.2%})".format(
+        frames, len(model.node_ids), 1000 * (time.time() - start), model.holdout_error))
+    write_prediction(args.out, frame_times, model.node_ids, model.coords, disp)
+    print("Saved to: " + args.out)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
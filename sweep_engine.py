@@ -0,0 +1,357 @@
+import os
+import sys
+import json
+import time
+import shutil
+import datetime
+import System
+from Ansys.Mechanical.DataModel.Enums import GraphicsAnimationExportFormat, ObjectState, AutomaticTimeStepping, LineSearchType, SolverType
+from Ansys.ACT.Math import Vector3D
+
+# ==========================================
+# --- CONFIGURATION (SWEEP ENGINE) ---
+# ==========================================
+# Runs one declarative sweep (sweeps/*.json) inside Mechanical. batch_run.py starts it headless and passes
+# everything through environment variables; pasted into the Scripting window it falls back to these defaults.
+def env(name, default):
+    value = System.Environment.GetEnvironmentVariable(name)
+    return value if value else default
+
+desktop_path = System.Environment.GetFolderPath(System.Environment.SpecialFolder.Desktop)
+SWEEP_FILE = env("SOFTROBOT_SWEEP", os.path.join(desktop_path, "sweeps", "grid_424.json"))
+OUTPUT_ROOT = env("SOFTROBOT_OUTPUT", os.path.join(desktop_path, "SoftRobot_Dataset_Hysteresis"))
+RUN_FOLDER = env("SOFTROBOT_RUN_FOLDER", None)      # Shared by all workers of one batch; None = new timestamped run
+STATUS_FILE = env("SOFTROBOT_STATUS", None)         # JSON summary read back by batch_run.py for the exit code
+WORKER_INDEX = int(env("SOFTROBOT_WORKER_INDEX", "0"))
+WORKER_COUNT = int(env("SOFTROBOT_WORKER_COUNT", "1"))  # Worker k solves cases k, k + WORKER_COUNT, ...
+# Each worker's solver gets its share of the machine's cores and memory (mechanical_helpers.configure_solver_processes)
+MAX_SOLVER_CORES = int(env("SOFTROBOT_MAX_SOLVER_CORES", "0")) or None  # Licence cap (4 without HPC packs); 0 = the full share
+
+# sweep_spec.py (validation, case expansion, hashing), result_cache.py, case_commit.py and mechanical_helpers.py sit next to this script
+CODE_DIR = env("SOFTROBOT_CODE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(SWEEP_FILE))))
+if CODE_DIR not in sys.path: sys.path.insert(0, CODE_DIR)
+from sweep_spec import VIEWS, load_spec, spec_hash, build_cases, read_solved, record_solved, interpolate, step_plan, frame_times
+import result_cache
+import case_commit
+from mechanical_helpers import (find_object, mesh_fingerprint, model_signature, configure_solver_processes, select_export_nodes, scope_results_to_nodes,
+                                start_leak_watch, memory_snapshot, finish_case)
+
+RESULT_CACHE = env("SOFTROBOT_RESULT_CACHE", "1") != "0"
+CACHE_MAX_GB = float(env("SOFTROBOT_CACHE_MAX_GB", str(result_cache.CACHE_MAX_GB)))
+
+# Memory-leak watch (mechanical_helpers.py), as in the drivers. When the limit is a few cases away the worker stops
+# with status "restart" and batch_run.py relaunches it in a new process instead of writing a checkpoint.
+LEAK_MEMORY_LIMIT_GB = float(env("SOFTROBOT_LEAK_LIMIT_GB", "60"))  # Working set at which Mechanical is expected to crash
+LEAK_RESTART_CASES = 3  # Stop for a relaunch when the trend reaches the limit within this many cases
+
+CAMERA_WAIT_TIME = 0.5
+GROWTH_FACTOR = 2.0
+
+# ==========================================
+# --- SCHEDULES & STEPS ---
+# ==========================================
+def setup_analysis_steps(analysis, plan, solver):
+    """One step per (end time, initial substeps, minimum substeps) of sweep_spec.step_plan."""
+    settings = analysis.AnalysisSettings
+    settings.NumberOfSteps = len(plan)
+    for i, (t, _, _) in enumerate(plan):
+        settings.SetStepEndTime(i + 1, Quantity(str(t) + " [s]"))
+    settings.LargeDeflection = True
+    settings.LineSearch = LineSearchType.On
+    settings.SolverType = SolverType.Direct if solver["solver_type"] == "direct" else SolverType.Iterative
+    for step, (_, initial, minimum) in enumerate(plan, 1):
+        settings.SetAutomaticTimeStepping(step, AutomaticTimeStepping.On)
+        settings.SetInitialSubsteps(step, initial)
+        settings.SetMinimumSubsteps(step, minimum)
+        settings.SetMaximumSubsteps(step, solver["max_substeps"])
+
+def set_load_schedule(load_obj, times_list, pressures_list):
+    load_obj.Magnitude.Inputs[0].DiscreteValues = [Quantity(str(t) + " [s]") for t in times_list]
+    load_obj.Magnitude.Output.DiscreteValues = [Quantity(str(p) + " [Pa]") for p in pressures_list]
+
+# ==========================================
+# --- SOLVE & EXPORT ---
+# ==========================================
+def calculate_geometry_zoom(mesh_data):
+    xs, ys, zs = [], [], []
+    for node in mesh_data.Nodes:
+        xs.append(node.X); ys.append(node.Y); zs.append(node.Z)
+    return max(max(xs) - min(xs), max(ys) - min(ys), max(zs) - min(zs)) * GROWTH_FACTOR
+
+def set_camera_custom(view, master_zoom):
+    cam = ExtAPI.Graphics.Camera
+    view_x, view_y, view_z, up_x, up_y, up_z = view
+    cam.ViewVector = Vector3D(view_x, view_y, view_z)
+    cam.UpVector = Vector3D(up_x, up_y, up_z)
+    cam.SetFit()
+    cam.SceneHeight = Quantity(master_zoom, "m")
+    time.sleep(CAMERA_WAIT_TIME)
+
+def blocking_solve(analysis_obj, solution_obj, timeout):
+    solution_obj.ClearGeneratedData()
+    analysis_obj.Solve()
+    solve_start = time.time()
+    while solution_obj.ObjectState != ObjectState.Solved:
+        if time.time() - solve_start > timeout: return False, "Timeout"
+        if solution_obj.ObjectState == ObjectState.SolveFailed: return False, "Divergence/Failure"
+        time.sleep(1)
+    return True, "Success"
+
+def export_pressure_profile(file_path, case, time_steps):
+    with open(file_path, "w") as f:
+        f.write("Time(s), P1(kPa), P2(kPa), P3(kPa)\n")
+        for t in [0.0] + time_steps:
+            row = [interpolate(t, case["times"], ch) / 1000.0 for ch in case["pressures"]]
+            f.write("{:.4f}, {:.3f}, {:.3f}, {:.3f}\n".format(t, row[0], row[1], row[2]))
+
+def export_node_data(file_path, case, time_steps, mesh_data, results, solution_obj, export_ids=None):
+    """NodeData in the simulate.py layout for the export_ids nodes (None = all); the peak columns are each bellow's schedule maximum."""
+    nodes_cache = dict((node.Id, (node.X, node.Y, node.Z)) for node in mesh_data.Nodes if export_ids is None or node.Id in export_ids)
+    peaks = [max(ch) for ch in case["pressures"]]
+    with open(file_path, "w") as f:
+        f.write("Time(s), NodeID, X_und(m), Y_und(m), Z_und(m), DefX(m), DefY(m), DefZ(m), Strain, Peak_P1(Pa), Peak_P2(Pa), Peak_P3(Pa)\n")
+        for t in time_steps:
+            for res in results:
+                res.DisplayTime = Quantity(str(t) + " [s]")
+            solution_obj.EvaluateAllResults()
+            frame_data = {}
+            for k, res in enumerate(results):
+                if not res.PlotData: continue
+                nodes, vals = res.PlotData["Node"], res.PlotData["Values"]
+                for i in range(len(nodes)):
+                    nid = int(nodes[i])
+                    if nid not in nodes_cache: continue
+                    frame_data.setdefault(nid, [0, 0, 0, 0])[k] = vals[i]
+            for nid in sorted(frame_data):
+                x, y, z = nodes_cache[nid]
+                v = frame_data[nid]
+                f.write("{:.4f}, {}, {:.6f}, {:.6f}, {:.6f}, {:.6e}, {:.6e}, {:.6e}, {:.6e}, {:.2f}, {:.2f}, {:.2f}\n".format(
+                    t, nid, x, y, z, v[0], v[1], v[2], v[3], peaks[0], peaks[1], peaks[2]))
+
+# ==========================================
+# --- SWEEP ---
+# ==========================================
+def write_status(summary):
+    if not STATUS_FILE: return
+    tmp = STATUS_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(summary, f, indent=1)
+    if os.path.exists(STATUS_FILE): os.remove(STATUS_FILE)
+    os.rename(tmp, STATUS_FILE)
+
+def reuse_case(record, case_folder, mode):
+    """Points this sweep at an identical case solved before: copies its folder (marker included), or only references it."""
+    if mode == "copy" and os.path.abspath(record["folder"]) != os.path.abspath(case_folder):
+        stage = case_commit.staging_folder(case_folder)
+        if os.path.exists(stage): shutil.rmtree(stage)
+        shutil.copytree(record["folder"], stage)
+        if os.path.exists(case_folder): shutil.rmtree(case_folder) # Partial outputs of an interrupted attempt
+        os.rename(stage, case_folder)
+        return case_folder
+    return record["folder"]
+
+def verify_outputs(folder, base_name, time_steps, exports):
+    """case_commit.verify_case for the exports this spec enables."""
+    return case_commit.verify_case(folder, base_name,
+                                   profile_rows=len(time_steps) + 1 if exports["pressure_profile"] else None,
+                                   node_frames=len(time_steps), video_frames=len(time_steps), views=exports["views"],
+                                   node_file="_NodeData.csv" if exports["node_data"] else None)
+
+def earlier_launch(run_folder):
+    """Status summary and manifest entries of this worker's previous launch, if it stopped for a leak-watch relaunch."""
+    manifest = os.path.join(run_folder, "manifest_worker_{}.json".format(WORKER_INDEX))
+    if not STATUS_FILE or not os.path.exists(STATUS_FILE) or not os.path.exists(manifest): return None, []
+    with open(STATUS_FILE, "r") as f:
+        status = json.load(f)
+    if status.get("status") != "restart" or os.path.abspath(status.get("run_folder", "")) != os.path.abspath(run_folder): return None, []
+    with open(manifest, "r") as f:
+        return status, json.load(f)["cases"]
+
+def write_manifest(run_folder, spec, digest, entries):
+    """Per-worker manifest: the validated spec, its hash and where every case's outputs are."""
+    path = os.path.join(run_folder, "manifest_worker_{}.json".format(WORKER_INDEX))
+    with open(path + ".tmp", "w") as f:
+        json.dump({"spec": spec, "spec_hash": digest, "spec_file": SWEEP_FILE, "worker": WORKER_INDEX, "cases": entries}, f, indent=1)
+    if os.path.exists(path): os.remove(path)
+    os.rename(path + ".tmp", path)
+
+def run_sweep(spec):
+    """Solves and exports this worker's share of the sweep; returns the status summary.
+
+    Cases whose key is already in the output root's solved-case manifest (from any sweep, on the same mesh and
+    model signature) are reused, not re-solved; failing that, the result cache is checked right before the solve.
+    """
+    analysis = ExtAPI.DataModel.Project.Model.Analyses[0]
+    solution = analysis.Solution
+    mesh_data = analysis.MeshData
+    loads = [find_object(analysis, "Pressure"), find_object(analysis, "Pressure 2"), find_object(analysis, "Pressure 3")]
+    total_def = find_object(solution, "Total Deformation")
+    results = [find_object(solution, name) for name in ["Deformation X", "Deformation Y", "Deformation Z", "Equivalent Elastic Strain"]]
+    if not all(loads) or not total_def or not all(results):
+        raise Exception("Missing 'Pressure' loads or deformation/strain results in the model tree.")
+    try: total_def.DeformationScaling = 1
+    except: pass
+
+    run_folder = RUN_FOLDER or os.path.join(OUTPUT_ROOT, spec["output"]["run_prefix"] + datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+    output_root = os.path.dirname(run_folder)
+    if not os.path.exists(run_folder): os.makedirs(run_folder)
+    failure_log_path = os.path.join(run_folder, "failed_cases.txt")
+    failed_profile_folder = os.path.join(run_folder, "failed_profiles") # Failed cases have no case folder; failure_model.py reads these
+
+    digest = spec_hash(spec)
+    mesh_id = mesh_fingerprint(mesh_data)
+    model_id = model_signature(ExtAPI, analysis, [load_obj.Name for load_obj in loads])
+    cache_dir = os.path.join(output_root, result_cache.CACHE_FOLDER)
+    sweep_name = os.path.basename(run_folder)
+    fps, exports = spec["fps"], spec["exports"]
+    views = exports["views"]
+    master_zoom = calculate_geometry_zoom(mesh_data) if views else None
+    # Only the exported node subset is evaluated; the videos still use the unscoped Total Deformation
+    export_ids = select_export_nodes(ExtAPI, mesh_data, exports["node_selection"], exports["node_sample_count"], exports["node_named_selection"], output_root)
+    scope_results_to_nodes(ExtAPI, results, export_ids)
+    cases = [c for c in build_cases(spec, SWEEP_FILE) if (c["num"] - 1) % WORKER_COUNT == WORKER_INDEX]
+    summary = {"sweep": spec["name"], "spec_hash": digest, "spec_file": SWEEP_FILE, "run_folder": run_folder, "worker": WORKER_INDEX,
+               "cases": len(cases), "complete": 0, "solved": 0, "reused": 0, "cached": 0, "saved_seconds": 0.0, "solved_seconds": 0.0,
+               "failed": [], "status": "running"}
+    entries = []
+    print("Sweep '{}' ({}): worker {}/{} has {} cases -> {}".format(spec["name"], digest, WORKER_INDEX + 1, WORKER_COUNT, len(cases), run_folder))
+
+    # A relaunch after a leak-watch stop keeps the earlier launch's counts and skips every case it already handled
+    earlier, entries = earlier_launch(run_folder)
+    if earlier:
+        for key in ("complete", "solved", "reused", "cached", "saved_seconds", "solved_seconds", "failed"):
+            summary[key] = earlier[key]
+        summary["relaunches"] = earlier.get("relaunches", 0) + 1
+        print("Relaunch {} after a leak-watch stop: {} cases already handled.".format(summary["relaunches"], len(entries)))
+    handled = set(e["case"] for e in entries)
+    start_leak_watch(run_folder, trace_file="memory_trace_worker_{}.csv".format(WORKER_INDEX), limit_gb=LEAK_MEMORY_LIMIT_GB, stop_cases=LEAK_RESTART_CASES)
+
+    for position, case in enumerate(cases):
+        if case["num"] in handled: continue
+        duration = case["times"][-1]
+        time_steps = frame_times(duration, fps)
+        base_name = case["label"]
+        case_folder = os.path.join(run_folder, "{}_{}_{}".format(spec["output"]["case_prefix"], case["num"], base_name))
+        entry = {"case": case["num"], "label": base_name, "key": case["key"]}
+        print("\n=== Case {} ({}, {:.1f} s) ===".format(case["num"], base_name, duration))
+        
+        # A re-run into the same run folder only redoes cases that never committed
+        if case_commit.is_complete(case_folder):
+            entry.update({"status": "complete", "folder": case_folder})
+            summary["complete"] += 1
+            print("      Already committed: {}".format(case_folder))
+            entries.append(entry)
+            write_manifest(run_folder, spec, digest, entries)
+            continue
+        
+        # Re-read every case so parallel workers and sweeps see each other's solves
+        previous = read_solved(output_root).get(case["key"])
+        if previous and previous.get("mesh") == mesh_id and previous.get("model") == model_id and case_commit.is_complete(previous["folder"]):
+            entry.update({"status": "reused", "folder": reuse_case(previous, case_folder, spec["output"]["reuse"]), "source_sweep": previous["sweep"]})
+            summary["reused"] += 1
+            print("      Identical case already solved by '{}': {}".format(previous["sweep"], previous["folder"]))
+            entries.append(entry)
+            write_manifest(run_folder, spec, digest, entries)
+            write_status(summary)
+            continue
+        
+        try:
+            load_times, load_pressures, plan = step_plan(spec, case)
+            setup_analysis_steps(analysis, plan, spec["solver"])
+            for load_obj, pressures in zip(loads, load_pressures):
+                set_load_schedule(load_obj, load_times, pressures)
+
+            # Outputs of the same case on the same mesh and model, kept by the result cache even after their run folder is gone
+            cache_key = result_cache.cache_key({"mesh": mesh_id, "model": model_id, "case": case["key"]}) if RESULT_CACHE else None
+            cached = result_cache.restore_case(cache_dir, cache_key, case_folder, base_name,
+                                               lambda folder, name: verify_outputs(folder, name, time_steps, exports),
+                                               {"case": case["num"], "key": case["key"], "cache_key": cache_key}) if cache_key else None
+            if cached:
+                result_cache.log_lookup(cache_dir, sweep_name, case["num"], cache_key, "hit", cached["solve_seconds"])
+                record_solved(output_root, {"key": case["key"], "mesh": mesh_id, "model": model_id, "folder": case_folder, "sweep": spec["name"], "spec_hash": digest,
+                                            "solve_seconds": cached["solve_seconds"], "time": datetime.datetime.now().isoformat()})
+                entry.update({"status": "cached", "folder": case_folder, "cache_key": cache_key})
+                summary["cached"] += 1
+                summary["saved_seconds"] += cached["solve_seconds"]
+                print("      Restored from the result cache ({}, ~{:.0f} s of solving saved).".format(cache_key, cached["solve_seconds"]))
+                entries.append(entry)
+                write_manifest(run_folder, spec, digest, entries)
+                write_status(summary)
+                continue
+            
+            configure_solver_processes(ExtAPI, analysis, duration, WORKER_COUNT, MAX_SOLVER_CORES)
+            memory_snapshot(case["num"], "before_solve")
+            solve_start = time.time()
+            success, msg = blocking_solve(analysis, solution, spec["solver"]["timeout"])
+            solve_seconds = time.time() - solve_start
+            memory_snapshot(case["num"], "after_solve")
+            summary["solved_seconds"] += solve_seconds
+            if cache_key: result_cache.log_lookup(cache_dir, sweep_name, case["num"], cache_key, "miss", solve_seconds)
+            if not success:
+                loads[0].Suppressed = True # Flushes the failed MAPDL matrix, as in simulate.py
+                loads[0].Suppressed = False
+                raise Exception(msg)
+
+            stage = case_commit.prepare_staging(case_folder) # Renamed to case_folder only once verified
+            if exports["pressure_profile"]:
+                export_pressure_profile(os.path.join(stage, base_name + "_PressureProfile.csv"), case, time_steps)
+            if exports["node_data"]:
+                export_node_data(os.path.join(stage, base_name + "_NodeData.csv"), case, time_steps, mesh_data, results, solution, export_ids)
+            if views:
+                total_def.Activate()
+                total_def.DisplayTime = Quantity(str(duration) + " [s]")
+                total_def.EvaluateAllResults()
+                ExtAPI.Graphics.ResultAnimationOptions.NumberOfFrames = len(time_steps)
+                ExtAPI.Graphics.ResultAnimationOptions.Duration = Quantity(duration, "s")
+                for view in views:
+                    set_camera_custom(VIEWS[view], master_zoom)
+                    total_def.ExportAnimation(os.path.join(stage, base_name + "_View" + view + ".avi"), GraphicsAnimationExportFormat.AVI)
+            case_commit.commit_case(case_folder, verify_outputs(stage, base_name, time_steps, exports),
+                                    {"case": case["num"], "key": case["key"], "cache_key": cache_key})
+            if cache_key: result_cache.store(cache_dir, cache_key, case_folder, base_name, round(solve_seconds, 1), {"mesh": mesh_id, "model": model_id, "case": case}, CACHE_MAX_GB)
+            record_solved(output_root, {"key": case["key"], "mesh": mesh_id, "model": model_id, "folder": case_folder, "sweep": spec["name"], "spec_hash": digest,
+                                        "solve_seconds": round(solve_seconds, 1), "time": datetime.datetime.now().isoformat()})
+            entry.update({"status": "solved", "folder": case_folder})
+            summary["solved"] += 1
+            print("      Case {} Complete.".format(case["num"]))
+        except Exception as e:
+            print("      !!! Case {} failed: {} !!!".format(case["num"], e))
+            entry.update({"status": "failed", "error": str(e)})
+            summary["failed"].append({"case": case["num"], "label": base_name, "error": str(e)})
+            with open(failure_log_path, "a") as f:
+                f.write("Case {}: {} | Error: {}\n".format(case["num"], base_name, e))
+            try:
+                if not os.path.exists(failed_profile_folder): os.makedirs(failed_profile_folder)
+                export_pressure_profile(os.path.join(failed_profile_folder, os.path.basename(case_folder) + "_PressureProfile.csv"), case, time_steps)
+            except Exception: pass
+        finally:
+            try:
+                solution.ClearGeneratedData()
+                System.GC.Collect()
+            except Exception: pass
+        entries.append(entry)
+        write_manifest(run_folder, spec, digest, entries)
+
+        remaining = len(cases) - position - 1
+        reason = finish_case(case["num"], remaining)
+        if reason:
+            summary["status"] = "restart"
+            summary["restart_reason"] = reason
+            print("      [Leak Watch]: {}; stopping with {} cases left for a relaunch.".format(summary["restart_reason"], remaining))
+            write_status(summary)
+            return summary
+        write_status(summary)
+
+    summary["status"] = "failed" if summary["failed"] else "ok"
+    return summary
+
+# ==========================================
+# --- MAIN EXECUTION ---
+# ==========================================
+try:
+    sweep_status = run_sweep(load_spec(SWEEP_FILE))
+except Exception as e:
+    print("Sweep aborted: {}".format(e))
+    sweep_status = {"spec_file": SWEEP_FILE, "worker": WORKER_INDEX, "status": "error", "error": str(e)}
+write_status(sweep_status)
+print("\nSweep Finished: {}".format(sweep_status["status"]))
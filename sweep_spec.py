@@ -0,0 +1,365 @@
+import os
+import copy
+import json
+import random
+import hashlib
+from step_planner import interpolate, common_schedule, plan_analysis_steps
+
+# ==========================================
+# --- CONFIGURATION (SWEEP SPECS) ---
+# ==========================================
+# Plain Python (IronPython 2.7 and CPython 3): loaded by sweep_engine.py inside Mechanical and by batch_run.py.
+SWEEP_TYPES = ["grid", "lhs", "csv", "random_walk"]
+SOLVER_TYPES = ["iterative", "direct"]
+NODE_SELECTIONS = ["all", "surface", "fps", "named"] # mechanical_helpers.select_export_nodes
+VIEWS = {
+    "Side1": (1, 0, 0, 0, 0, 1),
+    "Side2": (0, 1, 0, 0, 0, 1),
+    "Side3": (-1, 0, 0, 0, 0, 1),
+    "Top": (0, 0, 1, 1, 0, 0),
+}
+HOLD_PRESSURE = 60000      # Pa; random walks (sweeps and random_walk.py) keep check_profiles' sustained-hold limit
+MAX_HOLD_ENERGY = 300000.0 # Pa*s above HOLD_PRESSURE per bellow
+MAX_WALK_DRAWS = 100       # Redraws of a walk over the hold limit before its case is given up
+REPAIRED_SUFFIX = "_repaired.csv"     # check_profiles.py --repair output
+SOLVED_MANIFEST = "solved_cases.jsonl"  # One line per solved case under the output root, shared by every sweep
+
+DEFAULTS = {
+    "min_pressure": 1,
+    "max_pressure": 100000,
+    "fps": 30,
+    "solver": {"solver_type": "iterative", "initial_substeps": 100, "min_substeps": 20, "max_substeps": 5000, "timeout": 7200},
+    "exports": {"pressure_profile": True, "node_data": True, "views": ["Side1", "Side2", "Side3", "Top"],
+                "node_selection": "all", "node_sample_count": 500, "node_named_selection": "Markers"},
+    "output": {"run_prefix": "Run_Sweep_", "case_prefix": "Case", "reuse": "copy"},
+}
+REQUIRED_SWEEP_FIELDS = {
+    "grid": [],  # "levels" or "min"/"max"/"step", checked below
+    "lhs": ["count"],
+    "csv": ["folder"],
+    "random_walk": ["count", "waypoint_interval", "max_slew_rate", "max_asymmetry"],
+}
+TOP_LEVEL_FIELDS = ["name", "sweep", "profile", "duration"] + sorted(DEFAULTS.keys())
+
+class SpecError(ValueError):
+    pass
+
+# ==========================================
+# --- VALIDATION ---
+# ==========================================
+def with_defaults(spec):
+    full = copy.deepcopy(spec)
+    for key, default in DEFAULTS.items():
+        if isinstance(default, dict):
+            merged = copy.deepcopy(default)
+            merged.update(full.get(key, {}))
+            full[key] = merged
+        else:
+            full.setdefault(key, default)
+    return full
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_spec(spec, spec_path=None):
+    """Fills the defaults and checks every field; raises SpecError listing all problems at once."""
+    errors = []
+    unknown = [k for k in spec if k not in TOP_LEVEL_FIELDS]
+    if unknown: errors.append("unknown fields: {}".format(", ".join(sorted(unknown))))
+    spec = with_defaults(spec)
+
+    if not spec.get("name"): errors.append("'name' is required")
+    if not (is_number(spec["min_pressure"]) and is_number(spec["max_pressure"]) and 0 < spec["min_pressure"] < spec["max_pressure"]):
+        errors.append("need 0 < min_pressure < max_pressure (Pa)")
+    if not isinstance(spec["fps"], int) or spec["fps"] <= 0:
+        errors.append("'fps' must be a positive integer")
+
+    sweep = spec.get("sweep") or {}
+    kind = sweep.get("type")
+    if kind not in SWEEP_TYPES:
+        errors.append("sweep.type must be one of {}".format(", ".join(SWEEP_TYPES)))
+    else:
+        for field in REQUIRED_SWEEP_FIELDS[kind]:
+            if field not in sweep: errors.append("sweep.{} is required for '{}' sweeps".format(field, kind))
+    if kind == "grid":
+        if "levels" in sweep:
+            levels = sweep["levels"]
+            if not levels or not all(is_number(p) and 0 <= p <= spec["max_pressure"] for p in levels):
+                errors.append("sweep.levels must be pressures between 0 and max_pressure")
+        elif not all(is_number(sweep.get(k)) for k in ("min", "max", "step")) or sweep["step"] <= 0 or sweep["max"] > spec["max_pressure"]:
+            errors.append("grid sweeps need 'levels' or numeric 'min', 'max' <= max_pressure and 'step' > 0")
+    if kind in ("lhs", "random_walk") and "count" in sweep and (not isinstance(sweep["count"], int) or sweep["count"] <= 0):
+        errors.append("sweep.count must be a positive integer")
+    if kind == "random_walk":
+        for field in ("waypoint_interval", "max_slew_rate", "max_asymmetry"):
+            if field in sweep and not (is_number(sweep[field]) and sweep[field] > 0):
+                errors.append("sweep.{} must be positive".format(field))
+        if not (is_number(spec.get("duration")) and spec["duration"] > 0):
+            errors.append("random_walk sweeps need a positive 'duration' (s)")
+    if kind == "csv" and "folder" in sweep and not os.path.isdir(resolve_folder(sweep["folder"], spec_path)):
+        errors.append("sweep.folder not found: {}".format(resolve_folder(sweep["folder"], spec_path)))
+
+    if kind in ("grid", "lhs"):
+        shape = (spec.get("profile") or {}).get("shape")
+        if not shape or len(shape) < 2:
+            errors.append("profile.shape needs at least 2 [time, fraction of peak] points")
+        else:
+            times = [p[0] for p in shape]
+            if times[0] != 0 or any(b <= a for a, b in zip(times[:-1], times[1:])):
+                errors.append("profile.shape times must start at 0 and increase")
+            if not all(0 <= p[1] <= 1 for p in shape):
+                errors.append("profile.shape fractions must be within [0, 1]")
+
+    solver = spec["solver"]
+    if solver["solver_type"] not in SOLVER_TYPES:
+        errors.append("solver.solver_type must be one of {}".format(", ".join(SOLVER_TYPES)))
+    substeps = [solver[k] for k in ("min_substeps", "initial_substeps", "max_substeps")]
+    if not all(isinstance(n, int) for n in substeps) or not 1 <= substeps[0] <= substeps[1] <= substeps[2]:
+        errors.append("need integer 1 <= min_substeps <= initial_substeps <= max_substeps")
+    if not (is_number(solver["timeout"]) and solver["timeout"] > 0):
+        errors.append("solver.timeout must be positive (s)")
+
+    bad_views = [v for v in spec["exports"]["views"] if v not in VIEWS]
+    if bad_views: errors.append("unknown views {} (known: {})".format(bad_views, ", ".join(sorted(VIEWS))))
+    if spec["exports"]["node_selection"] not in NODE_SELECTIONS:
+        errors.append("exports.node_selection must be one of {}".format(", ".join(NODE_SELECTIONS)))
+    if not isinstance(spec["exports"]["node_sample_count"], int) or spec["exports"]["node_sample_count"] <= 0:
+        errors.append("exports.node_sample_count must be a positive integer")
+    if spec["output"]["reuse"] not in ("copy", "reference"):
+        errors.append("output.reuse must be 'copy' or 'reference'")
+    if not spec["output"]["run_prefix"] or not spec["output"]["case_prefix"]:
+        errors.append("output.run_prefix and output.case_prefix must be non-empty")
+
+    if errors:
+        raise SpecError("Invalid sweep spec {}:\n    {}".format(spec_path or spec.get("name"), "\n    ".join(errors)))
+    return spec
+
+def load_spec(path):
+    with open(path, "r") as f:
+        return validate_spec(json.load(f), path)
+
+# ==========================================
+# --- HASHING ---
+# ==========================================
+def canonical(value):
+    """Numbers as fixed-precision strings, so IronPython and CPython hash the same spec identically."""
+    if isinstance(value, dict):
+        return dict((k, canonical(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [canonical(v) for v in value]
+    if is_number(value):
+        return "{:.4f}".format(value)
+    return value
+
+def digest(value):
+    text = json.dumps(canonical(value), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def export_identity(exports):
+    """The exports as hashed; the node-subset fields only count when a subset is exported, so full-mesh
+    exports keep the keys of sweeps from before node subsetting."""
+    if exports["node_selection"] != "all": return exports
+    return dict((k, v) for k, v in exports.items() if not k.startswith("node_") or k == "node_data")
+
+def spec_hash(spec):
+    """Identity of everything that changes the produced data (the name and output naming do not)."""
+    spec = dict((k, v) for k, v in spec.items() if k not in ("name", "output"))
+    spec["exports"] = export_identity(spec["exports"])
+    return digest(spec)
+
+def case_key(spec, case):
+    """Identity of one case: its load schedule (0.01 Pa / 0.1 ms), the solver settings, frame rate and exports."""
+    schedule = {"times": ["{:.4f}".format(t) for t in case["times"]],
+                "pressures": [["{:.2f}".format(p) for p in ch] for ch in case["pressures"]]}
+    identity = {"schedule": schedule, "solver": dict((k, v) for k, v in spec["solver"].items() if k != "timeout"),
+                "fps": spec["fps"], "exports": export_identity(spec["exports"])}
+    if spec["sweep"]["type"] == "random_walk":
+        identity["steps"] = step_plan(spec, case)[2] # Planned, not fixed by the solver settings
+    return digest(identity)
+
+def read_solved(output_root):
+    """case key -> record of every case solved under output_root by any sweep (the last record wins)."""
+    solved = {}
+    path = os.path.join(output_root, SOLVED_MANIFEST)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                try: record = json.loads(line)
+                except ValueError: continue # A line cut short by a crash
+                solved[record["key"]] = record
+    return solved
+
+def record_solved(output_root, record):
+    with open(os.path.join(output_root, SOLVED_MANIFEST), "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+
+# ==========================================
+# --- LOAD CASES ---
+# ==========================================
+def resolve_folder(folder, spec_path):
+    if os.path.isabs(folder) or not spec_path: return folder
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(spec_path)), folder))
+
+def grid_levels(sweep, min_pressure):
+    if "levels" in sweep:
+        levels = sweep["levels"]
+    else:
+        levels = list(range(int(sweep["min"]), int(sweep["max"]) + 1, int(sweep["step"])))
+    # Replaces 0 with the pressure floor to prevent negative volumes
+    return [p if p >= min_pressure else min_pressure for p in levels]
+
+def latin_hypercube(count, seed, low, high):
+    """Stratified peaks: every bellow sees each of the `count` pressure bands exactly once."""
+    rng = random.Random(seed)
+    columns = []
+    for _ in range(3):
+        strata = list(range(count))
+        rng.shuffle(strata)
+        columns.append([low + (s + rng.random()) / count * (high - low) for s in strata])
+    return list(zip(*columns))
+
+def shaped_schedule(shape, peaks, min_pressure):
+    """Scales the profile shape [[t, fraction of peak], ...] to one peak per bellow."""
+    times = [float(t) for t, _ in shape]
+    pressures = [[min_pressure + frac * (peak - min_pressure) for _, frac in shape] for peak in peaks]
+    return times, pressures
+
+def random_walk_schedule(sweep, case_num, duration, min_pressure, max_pressure):
+    """Reproducible, slew-, asymmetry- and hold-limited walk; random_walk.py draws its walks here too.
+
+    Raises SpecError if no draw in MAX_WALK_DRAWS stays under the hold limit, rather than return one over it.
+    """
+    rng = random.Random(sweep.get("seed", 0) + case_num)
+    for attempt in range(MAX_WALK_DRAWS):
+        times, paths = draw_random_walk(rng, sweep, duration, min_pressure, max_pressure)
+        if max(hold_energy(times, path) for path in paths) <= MAX_HOLD_ENERGY:
+            return times, paths
+    raise SpecError("Random walk {}: none of {} draws stays under {:.0f} kPa*s above {:.0f} kPa; lower max_pressure or max_slew_rate".format(
+        case_num, MAX_WALK_DRAWS, MAX_HOLD_ENERGY / 1000.0, HOLD_PRESSURE / 1000.0))
+
+def hold_energy(times, path):
+    """Pa*s of the path above HOLD_PRESSURE; trapezoids on the waypoints never underestimate the played-back profile."""
+    excess = [max(0.0, p - HOLD_PRESSURE) for p in path]
+    return sum(0.5 * (excess[k] + excess[k - 1]) * (times[k] - times[k - 1]) for k in range(1, len(times)))
+
+def draw_random_walk(rng, sweep, duration, min_pressure, max_pressure):
+    """One candidate walk (times, [p1, p2, p3]) from min_pressure back to it, within the slew, asymmetry and peak limits."""
+    interval, slew, asymmetry = sweep["waypoint_interval"], sweep["max_slew_rate"], sweep["max_asymmetry"]
+    times = [0.0]
+    current_time = interval
+    while current_time < duration:
+        times.append(current_time)
+        current_time += interval
+    times.append(duration)
+
+    paths = [[min_pressure], [min_pressure], [min_pressure]]
+    for k in range(1, len(times) - 1):
+        max_step = slew * (times[k] - times[k - 1])
+        # Never climb higher than the remaining waypoints can ramp back down to min_pressure
+        ceiling = min(max_pressure, min_pressure + slew * (duration - times[k]))
+        prev = [path[-1] for path in paths]
+        for attempt in range(100):
+            candidate = [rng.uniform(max(min_pressure, p - max_step), max(min_pressure, min(ceiling, p + max_step))) for p in prev]
+            if max(candidate) - min(candidate) <= asymmetry: break
+        else:
+            # Deflating everything by one step never widens the spread and always stays reachable
+            candidate = [max(min_pressure, p - max_step) for p in prev]
+        for path, p in zip(paths, candidate):
+            path.append(p)
+    for path in paths:
+        path.append(min_pressure)
+    return times, paths
+
+def read_profile_csv(csv_path, fps, min_pressure):
+    """Frame- or Time-indexed 3-channel profile in kPa (generator output) -> (times, 3 pressure lists in Pa)."""
+    times, pressures = [], [[], [], []]
+    with open(csv_path, "r") as f:
+        frame_indexed = f.readline().strip().lower().startswith("frame")
+        for line in f:
+            cols = line.strip().split(",")
+            if len(cols) < 4: continue
+            times.append(float(cols[0]) / fps if frame_indexed else float(cols[0]))
+            for ch in range(3):
+                pressures[ch].append(max(float(cols[ch + 1]) * 1000.0, min_pressure))
+    return times, pressures
+
+def profile_csv_files(folder):
+    """[(label, csv path)] of a csv sweep's profiles; a check_profiles.py *_repaired.csv stands in for its original."""
+    cases = []
+    for filename in sorted(f for f in os.listdir(folder) if f.endswith(".csv") and not f.endswith(REPAIRED_SUFFIX)):
+        label = filename[:-len(".csv")]
+        repaired = os.path.join(folder, label + REPAIRED_SUFFIX)
+        cases.append((label, repaired if os.path.exists(repaired) else os.path.join(folder, filename)))
+    return cases
+
+def build_cases(spec, spec_path=None):
+    """Expands a validated spec into [{'num', 'label', 'times', 'pressures', 'key'}] with pressures in Pa."""
+    sweep = spec["sweep"]
+    kind = sweep["type"]
+    min_pressure, max_pressure = spec["min_pressure"], spec["max_pressure"]
+    cases = []
+    if kind in ("grid", "lhs"):
+        if kind == "grid":
+            levels = grid_levels(sweep, min_pressure)
+            peaks = [(v1, v2, v3) for v1 in levels for v2 in levels for v3 in levels]
+        else:
+            peaks = [tuple(int(round(p)) for p in row) for row in latin_hypercube(sweep["count"], sweep.get("seed", 0), min_pressure, max_pressure)]
+        for i, peak in enumerate(peaks):
+            times, pressures = shaped_schedule(spec["profile"]["shape"], peak, min_pressure)
+            cases.append({"num": i + 1, "label": "3bellows_{}_{}_{}".format(*peak), "times": times, "pressures": pressures})
+    elif kind == "random_walk":
+        for i in range(sweep["count"]):
+            times, pressures = random_walk_schedule(sweep, i + 1, spec["duration"], min_pressure, max_pressure)
+            cases.append({"num": i + 1, "label": "RandomWalk_{}".format(i + 1), "times": times, "pressures": pressures})
+    elif kind == "csv":
+        for i, (label, csv_path) in enumerate(profile_csv_files(resolve_folder(sweep["folder"], spec_path))):
+            times, pressures = read_profile_csv(csv_path, spec["fps"], min_pressure)
+            cases.append({"num": i + 1, "label": label, "times": times, "pressures": pressures})
+    for case in cases:
+        case["key"] = case_key(spec, case)
+    return cases
+
+def screen_profiles(spec, cases, spec_path=None, repair=False):
+    """Checks csv and random-walk cases against the check_profiles.py limits before anything is solved.
+
+    Returns [(case, violations)] still rejected. With repair, a rejected csv profile that repair_profile fixes is
+    written as *_repaired.csv, which build_cases uses from then on. Random walks are only checked: the worker
+    rebuilds them from the spec. check_profiles.py needs numpy, so without it (IronPython) this returns None.
+    """
+    kind = spec["sweep"]["type"]
+    if kind not in ("csv", "random_walk"): return []
+    try:
+        import numpy as np
+        import check_profiles
+    except ImportError:
+        return None
+    limits = check_profiles.load_limits()
+    rejected = []
+    for case in cases:
+        t, kpa = np.array(case["times"]), np.array(case["pressures"]).T / 1000.0
+        violations = check_profiles.validate_profile(t, kpa, limits)[1]
+        if violations and repair and kind == "csv":
+            repaired = check_profiles.repair_profile(t, kpa, limits)
+            if not check_profiles.validate_profile(t, repaired, limits)[1]:
+                folder = resolve_folder(spec["sweep"]["folder"], spec_path)
+                check_profiles.save_profile(os.path.join(folder, case["label"] + REPAIRED_SUFFIX), t, repaired)
+                continue
+        if violations: rejected.append((case, violations))
+    return rejected
+
+# ==========================================
+# --- SCHEDULES & STEPS ---
+# ==========================================
+def step_plan(spec, case):
+    """(times, pressures, plan) a case is solved with: its loads on their common time axis and one analysis step per
+    plan entry. Random walks are planned like random_walk.py; every other sweep gets a step per breakpoint with the
+    spec's substeps."""
+    times, pressures = common_schedule([(case["times"], ch) for ch in case["pressures"]])
+    if spec["sweep"]["type"] == "random_walk":
+        return times, pressures, plan_analysis_steps(times, pressures, spec["fps"])
+    return times, pressures, [(t, spec["solver"]["initial_substeps"], spec["solver"]["min_substeps"]) for t in times[1:]]
+
+def frame_times(duration, fps):
+    """The drivers' video frame times, round((i + 1) * (duration / frames), 4)."""
+    video_frames = int(round(duration * fps))
+    return [round((i + 1) * (duration / video_frames), 4) for i in range(video_frames)]
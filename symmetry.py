@@ -0,0 +1,253 @@
+import os
+import sys
+import glob
+import json
+import hashlib
+import argparse
+import numpy as np
+from scipy.spatial import cKDTree
+
+from node_data import find_case_folders, case_peaks, node_data_path, read_node_data
+
+# ==========================================
+# --- CONFIGURATION (THREE-BELLOW SYMMETRY) ---
+# ==========================================
+# The bellows sit 120 degrees apart around the long axis. Looking down the axis from the
+# free end, bellow 1 is at BELLOW_1_ANGLE and the numbering runs counter-clockwise if
+# CHANNEL_DIRECTION is +1 (clockwise if -1). Use "verify" on a sweep to confirm both.
+BELLOW_1_ANGLE = 90.0      # degrees in the transverse plane
+CHANNEL_DIRECTION = 1
+SYMMETRY_TOL = 1e-3        # Node match tolerance, as a fraction of the mesh's largest dimension
+MAP_CACHE = "symmetry_map.npz"
+
+# ==========================================
+# --- GROUP OF CASE PERMUTATIONS ---
+# ==========================================
+def symmetry_ops(group):
+    """The geometric operations as (name, rotation degrees, mirrored) tuples. C3 = rotations, C3v adds mirrors."""
+    ops = [("rot0", 0.0, False), ("rot120", 120.0, False), ("rot240", 240.0, False)]
+    if group == "C3v":
+        ops += [("mirror0", 0.0, True), ("mirror120", 120.0, True), ("mirror240", 240.0, True)]
+    return ops
+
+def bellow_angles():
+    return np.radians(BELLOW_1_ANGLE + CHANNEL_DIRECTION * 120.0 * np.arange(3))
+
+def plane_matrix(rotation_deg, mirrored):
+    """2x2 action in the transverse plane: mirror across bellow 1's radial line, then rotate."""
+    a = np.radians(rotation_deg)
+    rot = np.array([[np.cos(a), -np.sin(a)], [np.sin(a), np.cos(a)]])
+    if not mirrored:
+        return rot
+    b = 2.0 * np.radians(BELLOW_1_ANGLE)
+    mirror = np.array([[np.cos(b), np.sin(b)], [np.sin(b), -np.cos(b)]])
+    return rot @ mirror
+
+def channel_permutation(rotation_deg, mirrored):
+    """perm such that the transformed case has P'[perm[k]] = P[k] (bellow k lands on bellow perm[k])."""
+    angles = bellow_angles()
+    m = plane_matrix(rotation_deg, mirrored)
+    dirs = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    moved = dirs @ m.T
+    return [int(np.argmax(dirs @ moved[k])) for k in range(3)]
+
+def transform_case(case, perm):
+    out = [None] * 3
+    for k in range(3):
+        out[perm[k]] = case[k]
+    return tuple(out)
+
+def representative(case, group="C3v"):
+    """Canonical member of the case's equivalence class (the same rule simulate.py uses to skip cases)."""
+    return min(transform_case(case, channel_permutation(rot, mir)) for _, rot, mir in symmetry_ops(group))
+
+def equivalence_classes(load_cases, group="C3v"):
+    """Groups load cases into {representative: [members]} under the actuator symmetry group."""
+    classes = {}
+    for case in load_cases:
+        classes.setdefault(representative(case, group), []).append(tuple(case))
+    return classes
+
+# ==========================================
+# --- MESH NODE-PERMUTATION MAP ---
+# ==========================================
+def mesh_frame(coords):
+    """Long axis index, the two transverse axis indices, and the centre of the transverse section."""
+    axis = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+    plane = [i for i in range(3) if i != axis]
+    return axis, plane, coords[:, plane].mean(axis=0)
+
+def full_matrix(coords, rotation_deg, mirrored):
+    """3x3 matrix of the operation in global coordinates (identity along the long axis)."""
+    axis, plane, _ = mesh_frame(coords)
+    m3 = np.eye(3)
+    m3[np.ix_(plane, plane)] = plane_matrix(rotation_deg, mirrored)
+    return m3
+
+def mesh_fingerprint(node_ids, coords):
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(node_ids, dtype=np.int64).tobytes())
+    h.update(np.round(coords, 9).tobytes())
+    return h.hexdigest()
+
+def build_node_maps(node_ids, coords, group="C3v"):
+    """For each operation, maps node index i to the node index its image lands on, with the worst mismatch."""
+    _, plane, center = mesh_frame(coords)
+    tol = SYMMETRY_TOL * (coords.max(axis=0) - coords.min(axis=0)).max()
+    tree = cKDTree(coords)
+
+    maps = {}
+    for name, rot, mir in symmetry_ops(group):
+        moved = coords.copy()
+        moved[:, plane] = (coords[:, plane] - center) @ plane_matrix(rot, mir).T + center
+        dist, idx = tree.query(moved)
+        is_bijective = len(np.unique(idx)) == len(idx)
+        maps[name] = {"index": idx, "max_error": float(dist.max()), "valid": bool(dist.max() <= tol and is_bijective)}
+    return maps, tol
+
+def load_or_build_maps(node_ids, coords, group, cache_dir):
+    """Caches the node maps per mesh so the KD-tree matching runs once per mesh, not once per case."""
+    cache_path = os.path.join(cache_dir, MAP_CACHE)
+    key = mesh_fingerprint(node_ids, coords) + ":" + group
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path, allow_pickle=False)
+        if str(cached["key"]) == key:
+            meta = json.loads(str(cached["meta"]))
+            return {name: dict(meta[name], index=cached["map_" + name]) for name in meta}, float(cached["tol"])
+
+    maps, tol = build_node_maps(node_ids, coords, group)
+    meta = {name: {"max_error": m["max_error"], "valid": m["valid"]} for name, m in maps.items()}
+    arrays = {"map_" + name: m["index"] for name, m in maps.items()}
+    np.savez(cache_path, key=key, tol=tol, meta=json.dumps(meta), **arrays)
+    return maps, tol
+
+# ==========================================
+# --- SYNTHESIS ---
+# ==========================================
+def synthesize_values(values, coords, node_map, rotation_deg, mirrored):
+    """Rotates the displacement vectors and moves every node's values to its image node."""
+    m3 = full_matrix(coords, rotation_deg, mirrored)
+    out = np.empty_like(values)
+    out[:, node_map, :3] = values[:, :, :3] @ m3.T
+    out[:, node_map, 3] = values[:, :, 3] # Equivalent strain is a scalar
+    return out
+
+def write_node_data(csv_path, times, node_ids, coords, values, peaks):
+    """Writes NodeData in exactly the exporter's column layout and number formats."""
+    with open(csv_path, "w") as f:
+        f.write("Time(s), NodeID, X_und(m), Y_und(m), Z_und(m), DefX(m), DefY(m), DefZ(m), Strain, Peak_P1(Pa), Peak_P2(Pa), Peak_P3(Pa)\n")
+        for fi, t in enumerate(times):
+            for ni, nid in enumerate(node_ids):
+                v = values[fi, ni]
+                if np.isnan(v[0]): continue
+                f.write("{:.4f}, {}, {:.6f}, {:.6f}, {:.6f}, {:.6e}, {:.6e}, {:.6e}, {:.6e}, {:.2f}, {:.2f}, {:.2f}\n".format(
+                    t, nid, coords[ni, 0], coords[ni, 1], coords[ni, 2], v[0], v[1], v[2], v[3], peaks[0], peaks[1], peaks[2]))
+
+def write_permuted_profile(src_csv, dst_csv, perm):
+    """Copies a _PressureProfile.csv with its three pressure columns moved to their new bellows."""
+    with open(src_csv, "r") as src, open(dst_csv, "w") as dst:
+        dst.write(src.readline())
+        for line in src:
+            cols = [c.strip() for c in line.strip().split(",")]
+            if len(cols) < 4: continue
+            out = [None] * 3
+            for k in range(3):
+                out[perm[k]] = cols[1 + k]
+            dst.write("{}, {}, {}, {}\n".format(cols[0], out[0], out[1], out[2]))
+
+def format_peak(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def synthesize_run(run_folder, group="C3v"):
+    """Writes every missing member of each solved representative's class into the run folder."""
+    solved = {}
+    for folder in find_case_folders([run_folder]):
+        peaks = case_peaks(folder)
+        if peaks is not None:
+            solved[peaks] = folder
+
+    levels = sorted(set(p for peaks in solved for p in peaks))
+    maps = None
+    written = 0
+    for peaks, folder in sorted(solved.items()):
+        if representative(peaks, group) != peaks:
+            continue
+        times, node_ids, coords, values = read_node_data(node_data_path(folder))
+        if maps is None:
+            maps, _ = load_or_build_maps(node_ids, coords, group, run_folder)
+            invalid = [name for name, m in maps.items() if not m["valid"]]
+            if invalid:
+                raise ValueError("Mesh is not symmetric under {} (worst mismatch {:.3e} m); use a smaller group.".format(
+                    ", ".join(invalid), max(maps[n]["max_error"] for n in invalid)))
+
+        profile = glob.glob(os.path.join(folder, "*_PressureProfile.csv"))
+        for name, rot, mir in symmetry_ops(group):
+            perm = channel_permutation(rot, mir)
+            member = transform_case(peaks, perm)
+            if member in solved:
+                continue
+            solved[member] = None # Several operations can produce the same member (repeated pressures)
+
+            base_name = "3bellows_{}_{}_{}".format(*[format_peak(p) for p in member])
+            case_num = 1 + sum(levels.index(p) * len(levels) ** (2 - k) for k, p in enumerate(member))
+            out_folder = os.path.join(run_folder, "Case_{}_{}".format(case_num, base_name))
+            if not os.path.exists(out_folder): os.makedirs(out_folder)
+
+            new_values = synthesize_values(values, coords, maps[name]["index"], rot, mir)
+            write_node_data(os.path.join(out_folder, base_name + "_NodeData.csv"), times, node_ids, coords, new_values, member)
+            if profile:
+                write_permuted_profile(profile[0], os.path.join(out_folder, base_name + "_PressureProfile.csv"), perm)
+            with open(os.path.join(out_folder, "_SYNTHETIC.txt"), "w") as f:
+                f.write("Synthesized from {} by {} (no solve, no videos)\n".format(os.path.basename(folder), name))
+            written += 1
+            print("    {} -> {} ({})".format(os.path.basename(folder), os.path.basename(out_folder), name))
+    return written
+
+def verify_run(run_folder, group="C3v"):
+    """Checks the node maps against the mesh and, where two class members were both solved, the synthesis itself."""
+    folders = [f for f in find_case_folders([run_folder]) if case_peaks(f) is not None
+               and not os.path.exists(os.path.join(f, "_SYNTHETIC.txt"))]
+    if not folders:
+        print("No solved grid cases in " + run_folder)
+        return False
+
+    times, node_ids, coords, values = read_node_data(node_data_path(folders[0]))
+    maps, tol = build_node_maps(node_ids, coords, group)
+    ok = True
+    for name, m in maps.items():
+        print("    {:<10} max node mismatch {:.3e} m (tol {:.3e}) -> {}".format(name, m["max_error"], tol, "OK" if m["valid"] else "FAIL"))
+        ok = ok and m["valid"]
+
+    by_peaks = {case_peaks(f): f for f in folders}
+    for peaks, folder in sorted(by_peaks.items()):
+        for name, rot, mir in symmetry_ops(group)[1:]:
+            member = transform_case(peaks, channel_permutation(rot, mir))
+            if member == peaks or member not in by_peaks or not maps[name]["valid"]:
+                continue
+            _, _, _, src = read_node_data(node_data_path(folder))
+            _, _, _, ref = read_node_data(node_data_path(by_peaks[member]))
+            synth = synthesize_values(src, coords, maps[name]["index"], rot, mir)
+            scale = np.nanmax(np.abs(ref[:, :, :3])) + 1e-12
+            err = np.nanmax(np.abs(synth[:, :, :3] - ref[:, :, :3])) / scale
+            print("    {} vs solved {}: max displacement error {:.2%}".format(
+                os.path.basename(folder), os.path.basename(by_peaks[member]), err))
+    return ok
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Symmetry-aware deduplication of the three-bellow load grid.")
+    parser.add_argument("command", choices=["verify", "synthesize"])
+    parser.add_argument("run", help="Run_* folder")
+    parser.add_argument("--group", choices=["C3", "C3v"], default="C3v", help="Rotations only, or rotations and mirrors")
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        return 0 if verify_run(args.run, args.group) else 1
+    written = synthesize_run(args.run, args.group)
+    print("Synthesized {} cases from their symmetric representatives.".format(written))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
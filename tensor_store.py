@@ -0,0 +1,197 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from node_data import find_case_folders, case_peaks, node_data_path, read_node_data
+
+# ==========================================
+# --- CONFIGURATION (TENSOR STORE) ---
+# ==========================================
+STORE_DIR = "SoftRobot_Tensors"
+MANIFEST_FILE = "manifest.json"
+DTYPE = np.float32        # 1 nm resolution on a 0.1 m robot, half the size of float64
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# Consolidated arrays: (cases, frames, nodes, [dx, dy, dz, strain]) plus (cases, frames, [P1, P2, P3])
+CONSOLIDATED = {"values": "values.npy", "pressures": "pressures.npy", "times": "times.npy", "frames": "frames.npy"}
+
+# ==========================================
+# --- CONVERSION (ONE CASE PER WORKER) ---
+# ==========================================
+def case_key(folder):
+    return "{}__{}".format(os.path.basename(os.path.dirname(folder)), os.path.basename(folder))
+
+def aligned_pressures(folder, times):
+    """Per-frame P1..P3 (kPa) from the case's PressureProfile, interpolated onto the NodeData frame times."""
+    profile = glob.glob(os.path.join(folder, "*_PressureProfile.csv"))
+    if not profile:
+        return np.full((len(times), 3), np.nan, dtype=DTYPE)
+    data = np.genfromtxt(profile[0], delimiter=",", skip_header=1, ndmin=2)
+    return np.stack([np.interp(times, data[:, 0], data[:, 1 + ch]) for ch in range(3)], axis=1).astype(DTYPE)
+
+def convert_case(folder, store_dir):
+    """Writes one case as .npy chunks (values F x N x 4, pressures F x 3, times F) and returns its manifest entry."""
+    key = case_key(folder)
+    times, node_ids, coords, values = read_node_data(node_data_path(folder))
+    chunk_dir = os.path.join(store_dir, "cases")
+
+    paths = {}
+    for name, array in (("values", values.astype(DTYPE)), ("pressures", aligned_pressures(folder, times)), ("times", times)):
+        rel = os.path.join("cases", "{}_{}.npy".format(key, name))
+        # Written under a temporary name so a killed worker never leaves a half-written chunk behind
+        tmp = os.path.join(chunk_dir, "{}_{}.tmp.npy".format(key, name))
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=array.dtype, shape=array.shape)
+        out[...] = array
+        out.flush()
+        del out
+        os.replace(tmp, os.path.join(store_dir, rel))
+        paths[name] = rel
+
+    peaks = case_peaks(folder)
+    entry = {"key": key, "folder": os.path.abspath(folder), "peaks_pa": list(peaks) if peaks else None,
+             "frames": int(len(times)), "nodes": int(len(node_ids)), "duration": float(times[-1]), "files": paths}
+    return entry, node_ids, coords
+
+# ==========================================
+# --- STORE ---
+# ==========================================
+def load_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"dtype": np.dtype(DTYPE).name, "channels": ["DefX(m)", "DefY(m)", "DefZ(m)", "Strain"],
+                "pressure_units": "kPa", "cases": [], "consolidated": None}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_manifest(store_dir, manifest):
+    path = os.path.join(store_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def append_cases(run_folders, store_dir, workers=WORKERS):
+    """Converts every case not yet in the store in parallel; the manifest is updated as each one finishes."""
+    if not os.path.exists(os.path.join(store_dir, "cases")): os.makedirs(os.path.join(store_dir, "cases"))
+    manifest = load_manifest(store_dir)
+    done = set(c["key"] for c in manifest["cases"])
+    todo = [f for f in find_case_folders(run_folders) if case_key(f) not in done]
+    print("{} cases in store, {} to convert with {} workers".format(len(done), len(todo), workers))
+
+    added = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(convert_case, folder, store_dir): folder for folder in todo}
+        for future in as_completed(futures):
+            try:
+                entry, node_ids, coords = future.result()
+            except Exception as e:
+                print("    Failed {}: {}".format(os.path.basename(futures[future]), e))
+                continue
+
+            mesh_path = os.path.join(store_dir, "node_ids.npy")
+            if not os.path.exists(mesh_path):
+                np.save(mesh_path, node_ids)
+                np.save(os.path.join(store_dir, "coords.npy"), coords.astype(DTYPE))
+            elif not np.array_equal(np.load(mesh_path), node_ids):
+                print("    Skipped {}: node set differs from the store's mesh".format(entry["key"]))
+                continue
+
+            manifest["cases"].append(entry)
+            manifest["consolidated"] = None
+            save_manifest(store_dir, manifest)
+            added += 1
+            print("    [{}/{}] {}".format(added, len(todo), entry["key"]))
+    return added
+
+def consolidate(store_dir):
+    """Packs all case chunks into single (cases, frames, nodes, 4) / (cases, frames, 3) arrays.
+
+    Cases shorter than the longest are NaN-padded; frames.npy holds each case's real frame count.
+    """
+    manifest = load_manifest(store_dir)
+    cases = sorted(manifest["cases"], key=lambda c: c["key"])
+    if not cases:
+        print("Store is empty.")
+        return None
+    n_frames, n_nodes = max(c["frames"] for c in cases), cases[0]["nodes"]
+
+    out = {
+        "values": np.lib.format.open_memmap(os.path.join(store_dir, CONSOLIDATED["values"] + ".tmp"), mode="w+", dtype=DTYPE, shape=(len(cases), n_frames, n_nodes, 4)),
+        "pressures": np.lib.format.open_memmap(os.path.join(store_dir, CONSOLIDATED["pressures"] + ".tmp"), mode="w+", dtype=DTYPE, shape=(len(cases), n_frames, 3)),
+        "times": np.lib.format.open_memmap(os.path.join(store_dir, CONSOLIDATED["times"] + ".tmp"), mode="w+", dtype=np.float64, shape=(len(cases), n_frames)),
+    }
+    for i, case in enumerate(cases):
+        f = case["frames"]
+        for name, array in out.items():
+            array[i, f:] = np.nan
+            array[i, :f] = np.load(os.path.join(store_dir, case["files"][name]), mmap_mode="r")
+    for name, array in out.items():
+        array.flush()
+    del out
+    for name in ("values", "pressures", "times"):
+        os.replace(os.path.join(store_dir, CONSOLIDATED[name] + ".tmp"), os.path.join(store_dir, CONSOLIDATED[name]))
+    np.save(os.path.join(store_dir, CONSOLIDATED["frames"]), np.array([c["frames"] for c in cases]))
+
+    manifest["consolidated"] = {"keys": [c["key"] for c in cases], "shape": [len(cases), n_frames, n_nodes, 4], "files": CONSOLIDATED}
+    save_manifest(store_dir, manifest)
+    print("Consolidated {} cases into {} x {} x {} x 4".format(len(cases), len(cases), n_frames, n_nodes))
+    return manifest["consolidated"]
+
+class TensorStore:
+    """Read side: every array is opened with mmap_mode='r', so slicing touches only the bytes it needs."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self.manifest = load_manifest(store_dir)
+        self.entries = dict((c["key"], c) for c in self.manifest["cases"])
+        self.node_ids = np.load(os.path.join(store_dir, "node_ids.npy"))
+        self.coords = np.load(os.path.join(store_dir, "coords.npy"))
+
+    def keys(self):
+        return sorted(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def case(self, key):
+        """(times F, values F x N x 4, pressures F x 3) memory maps for one case."""
+        files = self.entries[key]["files"]
+        load = lambda name: np.load(os.path.join(self.store_dir, files[name]), mmap_mode="r")
+        return load("times"), load("values"), load("pressures")
+
+    def consolidated(self):
+        """(keys, values C x F x N x 4, pressures C x F x 3, times C x F, frames C) memory maps, if consolidated."""
+        info = self.manifest["consolidated"]
+        if info is None:
+            raise RuntimeError("Store changed since the last consolidation; run 'consolidate' first.")
+        load = lambda name: np.load(os.path.join(self.store_dir, info["files"][name]), mmap_mode="r")
+        return info["keys"], load("values"), load("pressures"), load("times"), load("frames")
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Packs NodeData sweeps into a memory-mapped (case, frame, node, channel) store.")
+    parser.add_argument("--store", default=STORE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    a = sub.add_parser("append", help="Convert new cases from Run_* folders (or a dataset root)")
+    a.add_argument("runs", nargs="+")
+    a.add_argument("--workers", type=int, default=WORKERS)
+    sub.add_parser("consolidate", help="Pack all cases into single arrays")
+    args = parser.parse_args()
+
+    if args.command == "append":
+        run_folders = []
+        for path in args.runs:
+            nested = sorted(glob.glob(os.path.join(path, "Run_*")))
+            run_folders.extend(nested if nested else [path])
+        append_cases(run_folders, args.store, args.workers)
+    else:
+        consolidate(args.store)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
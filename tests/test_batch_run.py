@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from batch_run import EXIT_OK, EXIT_CASES_FAILED, EXIT_ERROR, collect_status, status_path
+
+def write_status(run_folder, index, status):
+    with open(status_path(str(run_folder), index), "w") as f:
+        json.dump({"worker": index, "status": status}, f)
+
+@pytest.mark.parametrize("status, exit_code, expected", [
+    ("ok", 0, EXIT_OK),
+    ("ok", None, EXIT_OK),
+    ("failed", 0, EXIT_CASES_FAILED),
+    ("ok", 3, EXIT_ERROR),
+    ("failed", 3, EXIT_ERROR),
+    ("running", 0, EXIT_ERROR),
+    ("restart", 0, EXIT_ERROR),
+    (None, 0, EXIT_ERROR),
+    (None, 1, EXIT_ERROR),
+])
+def test_status_and_exit_code(tmp_path, status, exit_code, expected):
+    if status: write_status(tmp_path, 0, status)
+    summaries, code = collect_status(str(tmp_path), 1, [exit_code])
+    assert code == expected
+    assert summaries[0]["exit_code"] == exit_code
+    assert summaries[0]["status"] == (status or "missing")
+
+def test_worst_worker_wins(tmp_path):
+    write_status(tmp_path, 0, "failed")
+    write_status(tmp_path, 1, "ok")
+    assert collect_status(str(tmp_path), 2, [0, 0])[1] == EXIT_CASES_FAILED
+    assert collect_status(str(tmp_path), 2, [0, 5])[1] == EXIT_ERROR
+    assert "exited with code 5" in collect_status(str(tmp_path), 2, [0, 5])[0][1]["error"]
+
+def test_failed_after_error_stays_error(tmp_path):
+    write_status(tmp_path, 1, "failed")
+    assert collect_status(str(tmp_path), 2, [0, 0])[1] == EXIT_ERROR # Worker 0 never reported
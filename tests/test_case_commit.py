@@ -0,0 +1,82 @@
+import os
+import json
+import struct
+
+import pytest
+
+import case_commit
+
+def write_avi(path, frames, truncate=0):
+    """RIFF/AVI header chunks with the frame count in avih, as fake_extapi.py writes them."""
+    avih = struct.pack("<14I", 33333, 0, 0, 0x10, frames, 0, 1, 0, 64, 64, 0, 0, 0, 0)
+    hdrl = b"hdrl" + b"avih" + struct.pack("<I", len(avih)) + avih
+    body = b"AVI " + b"LIST" + struct.pack("<I", len(hdrl)) + hdrl
+    data = b"RIFF" + struct.pack("<I", len(body)) + body
+    with open(path, "wb") as f:
+        f.write(data[:len(data) - truncate])
+
+def write_case(folder, base_name="Case", frames=2, nodes=(2, 2), video_frames=2, views=("Top",)):
+    if not os.path.exists(folder): os.makedirs(folder)
+    with open(os.path.join(folder, base_name + "_PressureProfile.csv"), "w") as f:
+        f.write("Time(s), P1(kPa), P2(kPa), P3(kPa)\n" + "0.0, 0, 0, 0\n" * (frames + 1))
+    with open(os.path.join(folder, base_name + "_NodeData.csv"), "w") as f:
+        f.write("Time(s), NodeID\n")
+        for frame, count in enumerate(nodes):
+            f.write("".join("{:.1f}, {}\n".format(0.1 * (frame + 1), n) for n in range(count)))
+    for view in views:
+        write_avi(os.path.join(folder, base_name + "_View" + view + ".avi"), video_frames)
+
+def verify(folder, video_frames=2):
+    return case_commit.verify_case(folder, "Case", profile_rows=3, node_frames=2, video_frames=video_frames, views=("Top",))
+
+def test_avi_frame_count(tmp_path):
+    path = str(tmp_path / "a.avi")
+    write_avi(path, 900)
+    assert case_commit.avi_frame_count(path) == 900
+    write_avi(path, 900, truncate=8)
+    assert case_commit.avi_frame_count(path) is None
+    with open(path, "wb") as f:
+        f.write(b"RIFF\x04\x00\x00\x00AVI ")
+    assert case_commit.avi_frame_count(path) is None
+
+def test_verify_case_counts_frames_and_nodes(tmp_path):
+    write_case(str(tmp_path))
+    assert verify(str(tmp_path)) == {"frames": 2, "nodes": 2, "warnings": []}
+
+@pytest.mark.parametrize("kwargs, problem", [
+    ({"frames": 3}, "PressureProfile has 4 rows"),
+    ({"nodes": (2, 1)}, "node counts vary"),
+    ({"nodes": (2, 2, 2)}, "NodeData.csv has 3 frames"),
+    ({"views": ()}, "ViewTop video missing"),
+])
+def test_verify_case_rejects_incomplete_outputs(tmp_path, kwargs, problem):
+    write_case(str(tmp_path), **kwargs)
+    with pytest.raises(Exception, match=problem):
+        verify(str(tmp_path))
+
+def test_truncated_video_fails_but_other_frame_count_only_warns(tmp_path, capsys):
+    write_case(str(tmp_path), video_frames=3)
+    stats = verify(str(tmp_path))
+    assert stats["warnings"] == ["ViewTop video has 3 frames, expected 2"]
+    assert "WARNING" in capsys.readouterr().out
+    write_avi(str(tmp_path / "Case_ViewTop.avi"), 2, truncate=8)
+    with pytest.raises(Exception, match="truncated"):
+        verify(str(tmp_path))
+
+def test_commit_case_marks_and_replaces_an_older_attempt(tmp_path):
+    case_folder = str(tmp_path / "Case_1")
+    write_case(case_folder)
+    with open(os.path.join(case_folder, "stale.txt"), "w") as f: f.write("old attempt")
+    os.makedirs(case_folder + case_commit.REPLACED_SUFFIX) # Left by a crash between the renames
+
+    stage = case_commit.prepare_staging(case_folder)
+    write_case(stage, video_frames=3)
+    marker = case_commit.commit_case(case_folder, verify(stage), {"case": 1})
+
+    assert case_commit.is_complete(case_folder)
+    assert sorted(os.listdir(str(tmp_path))) == ["Case_1"]
+    assert not os.path.exists(os.path.join(case_folder, "stale.txt"))
+    assert marker["case"] == 1 and marker["frames"] == 2 and marker["warnings"]
+    with open(os.path.join(case_folder, case_commit.CASE_MARKER)) as f:
+        saved = json.load(f)
+    assert saved["files"]["Case_NodeData.csv"]["sha1"] == case_commit.file_sha1(os.path.join(case_folder, "Case_NodeData.csv"))
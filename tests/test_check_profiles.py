@@ -0,0 +1,81 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+import check_profiles
+from sweep_spec import validate_spec, build_cases, screen_profiles
+
+LIMITS = dict(check_profiles.DEFAULT_LIMITS)
+
+def ramp_hold(peaks, duration=10.0, rise=2.0, fps=30):
+    """Fade-in from the floor to one peak (kPa) per bellow, a hold, and a fade-out."""
+    t = np.arange(0.0, duration + 0.5 / fps, 1.0 / fps)
+    envelope = np.clip(np.minimum(t / rise, (duration - t) / rise), 0.0, 1.0)
+    floor = LIMITS["min_pressure"]
+    return t, floor + envelope[:, None] * (np.array(peaks, dtype=float) - floor)
+
+def test_gentle_profile_passes():
+    t, p = ramp_hold([40.0, 30.0, 20.0])
+    assert check_profiles.validate_profile(t, p, LIMITS)[1] == []
+
+@pytest.mark.parametrize("peaks, rise, expected", [
+    ([105.0, 50.0, 50.0], 2.0, "creep limit"),
+    ([95.0, 1.0, 1.0], 2.0, "Asymmetry"),
+    ([80.0, 40.0, 40.0], 0.1, "Slew"),
+])
+def test_violations_are_named(peaks, rise, expected):
+    t, p = ramp_hold(peaks, rise=rise)
+    violations = check_profiles.validate_profile(t, p, LIMITS)[1]
+    assert any(expected in v for v in violations)
+
+def test_loaded_start_and_long_hold_are_rejected():
+    t, p = ramp_hold([80.0, 80.0, 80.0], duration=30.0)
+    p[0] = 50.0
+    violations = check_profiles.validate_profile(t, p, LIMITS)[1]
+    assert any("Starts loaded" in v for v in violations)
+    assert any("Hold energy" in v for v in violations)
+
+def test_grid_peak_is_within_the_limit():
+    t, p = ramp_hold([100.0, 100.0, 100.0], duration=4.0)
+    assert not any("creep limit" in v for v in check_profiles.validate_profile(t, p, LIMITS)[1])
+
+def test_repair_pulls_a_profile_inside_the_limits():
+    t, p = ramp_hold([120.0, 10.0, 60.0], duration=5.0, rise=0.2)
+    p[0] = 30.0
+    assert check_profiles.validate_profile(t, p, LIMITS)[1]
+    repaired = check_profiles.repair_profile(t, p, LIMITS)
+    assert check_profiles.validate_profile(t, repaired, LIMITS)[1] == []
+    assert repaired.shape == p.shape
+
+def test_screen_profiles_repairs_csv_sweeps(tmp_path):
+    folder = tmp_path / "profiles"
+    folder.mkdir()
+    check_profiles.save_profile(str(folder / "Good.csv"), *ramp_hold([40.0, 30.0, 20.0]))
+    check_profiles.save_profile(str(folder / "Steep.csv"), *ramp_hold([80.0, 40.0, 40.0], rise=0.1))
+    spec = validate_spec({"name": "csv_test", "sweep": {"type": "csv", "folder": str(folder)}})
+
+    cases = build_cases(spec)
+    assert [case["label"] for case, _ in screen_profiles(spec, cases)] == ["Steep"]
+    assert screen_profiles(spec, cases, repair=True) == []
+    assert (folder / "Steep_repaired.csv").exists()
+
+    repaired_cases = build_cases(spec)
+    assert [c["label"] for c in repaired_cases] == ["Good", "Steep"]
+    assert repaired_cases[0]["key"] == cases[0]["key"]
+    assert repaired_cases[1]["key"] != cases[1]["key"]
+    assert screen_profiles(spec, repaired_cases) == []
+
+def test_screen_profiles_skips_shaped_sweeps():
+    spec = validate_spec({"name": "grid_test", "sweep": {"type": "grid", "levels": [1, 100000]},
+                          "profile": {"shape": [[0, 0], [1, 1], [2, 0]]}})
+    assert screen_profiles(spec, build_cases(spec)) == []
+
+def test_cli_reports_skipped_files_separately(tmp_path, capsys, monkeypatch):
+    check_profiles.save_profile(str(tmp_path / "Good.csv"), *ramp_hold([40.0, 30.0, 20.0]))
+    check_profiles.save_profile(str(tmp_path / "Good_repaired.csv"), *ramp_hold([40.0, 30.0, 20.0]))
+    monkeypatch.setattr(check_profiles, "LIMITS_FILE", str(tmp_path / "none.json"))
+    monkeypatch.setattr("sys.argv", ["check_profiles.py", str(tmp_path)])
+    assert check_profiles.main() == 0
+    assert "0 of 1 profiles rejected (1 repaired copies and node-data files skipped)" in capsys.readouterr().out
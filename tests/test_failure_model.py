@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import pytest
+
+import failure_model
+
+def write_profile(path, peaks):
+    times = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+    shape = [0.0, 0.5, 1.0, 1.0, 0.5, 0.0]
+    with open(path, "w") as f:
+        f.write("Time(s), P1(kPa), P2(kPa), P3(kPa)\n")
+        for t, s in zip(times, shape):
+            f.write("{}, {}, {}, {}\n".format(t, *[0.001 + s * (p - 0.001) for p in peaks]))
+
+def make_run(root, name="Run_424_Profile_2026-01-01_00-00-00"):
+    """Solved cases up to 60 kPa, logged failures from 80 kPa, solve times growing with the peak."""
+    run = os.path.join(str(root), name)
+    os.makedirs(run)
+    solved = [(p, q, 20) for p in (10, 20, 30, 40, 50, 60) for q in (10, 40)]
+    failed = [(p, q, 20) for p in (80, 90, 100) for q in (10, 40, 70)]
+    with open(os.path.join(run, "solve_log.csv"), "w") as log:
+        log.write("Case, Max_P1(Pa), Max_P2(Pa), Max_P3(Pa), Status, SolveTime(s)\n")
+        for num, peaks in enumerate(solved, 1):
+            folder = os.path.join(run, "Case_{}_3bellows_{}_{}_{}".format(num, *[p * 1000 for p in peaks]))
+            os.makedirs(folder)
+            write_profile(os.path.join(folder, "3bellows_{}_{}_{}_PressureProfile.csv".format(*peaks)), peaks)
+            log.write("{}, {}, {}, {}, Success, {}\n".format(num, *([p * 1000 for p in peaks] + [100.0 * np.exp(peaks[0] / 30.0)])))
+    with open(os.path.join(run, "failed_cases.txt"), "w") as f:
+        for num, peaks in enumerate(failed, len(solved) + 1):
+            f.write("Case {}: P1={}, P2={}, P3={} | Error: Solver did not converge\n".format(num, *[p * 1000 for p in peaks]))
+    return run, len(solved), len(failed)
+
+def test_profile_features():
+    times, p1, p2, p3 = [0.0, 1.0, 2.0], [0.0, 80.0, 0.0], [0.0, 20.0, 0.0], [0.0, 0.0, 0.0]
+    features = dict(zip(failure_model.FEATURE_NAMES, failure_model.profile_features(times, p1, p2, p3)))
+    assert features["peak_max"] == 80.0 and features["peak_min"] == 0.0
+    assert features["peak_mean"] == pytest.approx(100.0 / 3.0)
+    assert features["max_asymmetry"] == 80.0
+    assert features["max_slew_rate"] == 80.0
+    assert features["hold_energy"] == pytest.approx(2 * 0.5 * 20.0)
+    assert features["duration"] == 2.0
+
+def test_fit_logistic_separates_and_fit_ridge_recovers_a_line():
+    X = np.linspace(-2.0, 2.0, 40)[:, None]
+    y = (X[:, 0] > 0.3).astype(float)
+    w = failure_model.fit_logistic(X, y)
+    assert w[1] > 0 and -w[0] / w[1] == pytest.approx(0.3, abs=0.3)
+    w = failure_model.fit_ridge(X, 3.0 + 2.0 * X[:, 0])
+    assert w == pytest.approx([3.0, 2.0], rel=0.05)
+
+def test_collect_dataset_rebuilds_grid_failures(tmp_path):
+    run, solved, failed = make_run(tmp_path)
+    rows = failure_model.collect_dataset([run])
+    assert len(rows) == solved + failed
+    assert sum(r[1] for r in rows) == failed
+    # A failed 100 kPa case was rebuilt by scaling a solved case's profile
+    assert max(r[0][0] for r in rows if r[1]) == pytest.approx(100.0)
+
+def test_failed_case_without_template_uses_the_driver_schedule(tmp_path):
+    run = os.path.join(str(tmp_path), "Run_424_Profile_x")
+    os.makedirs(run)
+    with open(os.path.join(run, "failed_cases.txt"), "w") as f:
+        f.write("Case 1: P1=90000, P2=10000, P3=1 | Error: diverged\n")
+    (features, failed, _), = failure_model.collect_dataset([run])
+    assert failed == 1 and features[0] == pytest.approx(90.0) and features[-1] == 10.0
+
+def test_trained_model_ranks_risk_and_predicts_solve_time(tmp_path):
+    run, _, _ = make_run(tmp_path)
+    model_path = str(tmp_path / "model.json")
+    failure_model.train([run], model_path)
+    model = failure_model.load_model(model_path)
+    assert model["features"] == failure_model.FEATURE_NAMES
+
+    def features(peaks):
+        path = str(tmp_path / "probe.csv")
+        write_profile(path, peaks)
+        return failure_model.model_features(model, *failure_model.read_pressure_profile(path))
+
+    assert failure_model.predict_failure_risk(model, features((95, 40, 20))) > 0.5
+    assert failure_model.predict_failure_risk(model, features((20, 10, 20))) < 0.5
+    fast, slow = (failure_model.predict_solve_time(model, features(p)) for p in ((15, 10, 20), (55, 40, 20)))
+    assert 0 < fast < slow
@@ -0,0 +1,30 @@
+import pytest
+
+import sweep_spec
+from sweep_spec import SpecError, random_walk_schedule
+
+WALK = {"seed": 0, "waypoint_interval": 3.0, "max_slew_rate": 20000.0, "max_asymmetry": 80000.0}
+
+@pytest.mark.parametrize("case_num", [1, 2, 7])
+def test_walks_are_reproducible_and_within_the_limits(case_num):
+    times, paths = random_walk_schedule(WALK, case_num, 30.0, 1, 90000)
+    assert (times, paths) == random_walk_schedule(WALK, case_num, 30.0, 1, 90000)
+    assert times[0] == 0.0 and times[-1] == 30.0
+    for path in paths:
+        assert path[0] == 1 and path[-1] == 1
+        assert max(path) <= 90000
+        assert sweep_spec.hold_energy(times, path) <= sweep_spec.MAX_HOLD_ENERGY
+        for k in range(1, len(times)):
+            assert abs(path[k] - path[k - 1]) <= WALK["max_slew_rate"] * (times[k] - times[k - 1]) + 1e-6
+    for k in range(len(times)):
+        spread = [path[k] for path in paths]
+        assert max(spread) - min(spread) <= WALK["max_asymmetry"]
+
+def test_seed_changes_the_walk():
+    assert random_walk_schedule(WALK, 1, 30.0, 1, 90000) != random_walk_schedule(dict(WALK, seed=1), 1, 30.0, 1, 90000)
+
+def test_walk_over_the_hold_limit_raises(monkeypatch):
+    monkeypatch.setattr(sweep_spec, "HOLD_PRESSURE", 0.0)
+    monkeypatch.setattr(sweep_spec, "MAX_HOLD_ENERGY", 0.0)
+    with pytest.raises(SpecError):
+        random_walk_schedule(WALK, 1, 30.0, 1, 90000)
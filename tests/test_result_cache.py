@@ -0,0 +1,74 @@
+import os
+
+import result_cache
+import case_commit
+
+def write_case(folder, base_name, payload="1.0\n"):
+    if not os.path.exists(folder): os.makedirs(folder)
+    with open(os.path.join(folder, base_name + "_PressureProfile.csv"), "w") as f:
+        f.write("Time(s), P1(kPa), P2(kPa), P3(kPa)\n" + "0.0, 0, 0, 0\n" * 3)
+    with open(os.path.join(folder, base_name + "_NodeData.csv"), "w") as f:
+        f.write("Time(s), NodeID\n0.1, 1\n0.1, 2\n0.2, 1\n0.2, 2\n")
+
+def verify(folder, base_name):
+    return case_commit.verify_case(folder, base_name, profile_rows=3, node_frames=2)
+
+def test_key_ignores_dict_order_but_not_values():
+    a = result_cache.cache_key({"mesh": "m", "loads": [["0.0000"], ["1.00"]], "exports": ["simulate.py", 30]})
+    b = result_cache.cache_key({"exports": ["simulate.py", 30], "loads": [["0.0000"], ["1.00"]], "mesh": "m"})
+    c = result_cache.cache_key({"mesh": "m", "loads": [["0.0000"], ["2.00"]], "exports": ["simulate.py", 30]})
+    assert a == b
+    assert a != c
+    assert len(a) == 20
+
+def test_store_restore_under_another_name(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    write_case(str(tmp_path / "a"), "3bellows_1_2_3")
+    result_cache.store(cache_dir, "k" * 20, str(tmp_path / "a"), "3bellows_1_2_3", 12.5)
+    meta = result_cache.restore_case(cache_dir, "k" * 20, str(tmp_path / "b"), "Case_7", verify, {"case": 7})
+    assert meta["solve_seconds"] == 12.5
+    assert case_commit.is_complete(str(tmp_path / "b"))
+    assert sorted(os.listdir(str(tmp_path / "b"))) == ["Case_7_NodeData.csv", "Case_7_PressureProfile.csv", case_commit.CASE_MARKER]
+    assert result_cache.lookup(cache_dir, "k" * 20)["hits"] == 2
+
+def test_corrupt_entry_is_discarded(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    write_case(str(tmp_path / "a"), "x")
+    result_cache.store(cache_dir, "k" * 20, str(tmp_path / "a"), "x", 1.0)
+    with open(os.path.join(result_cache.entry_path(cache_dir, "k" * 20), "file_NodeData.csv"), "a") as f:
+        f.write("0.3, 1\n")
+    assert result_cache.restore_case(cache_dir, "k" * 20, str(tmp_path / "b"), "x", verify) is None
+    assert not os.path.exists(result_cache.entry_path(cache_dir, "k" * 20))
+    assert not case_commit.is_complete(str(tmp_path / "b"))
+
+def test_evicts_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    write_case(str(tmp_path / "a"), "x")
+    for i, key in enumerate(["a" * 20, "b" * 20, "c" * 20]):
+        result_cache.store(cache_dir, key, str(tmp_path / "a"), "x", 1.0)
+        path = result_cache.entry_path(cache_dir, key)
+        meta = result_cache.read_meta(path)
+        meta["last_used"] = 100.0 + i
+        result_cache.write_meta(path, meta)
+    result_cache.lookup(cache_dir, "a" * 20) # Now the most recently used
+    size = result_cache.read_meta(result_cache.entry_path(cache_dir, "a" * 20))["size"]
+    assert result_cache.evict(cache_dir, 2.5 * size / 1e9) == 1
+    assert sorted(meta["key"] for _, meta in result_cache.entries(cache_dir)) == ["a" * 20, "c" * 20]
+
+def test_unreadable_meta_is_dropped(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    write_case(str(tmp_path / "a"), "x")
+    result_cache.store(cache_dir, "k" * 20, str(tmp_path / "a"), "x", 1.0)
+    with open(os.path.join(result_cache.entry_path(cache_dir, "k" * 20), result_cache.META_FILE), "w") as f:
+        f.write("{")
+    assert result_cache.entries(cache_dir) == []
+
+def test_session_stats(tmp_path, capsys):
+    cache_dir = str(tmp_path / "cache")
+    stats = result_cache.new_stats()
+    result_cache.record_lookup(cache_dir, stats, "Run_1", 1, "k", "hit", 3600.0)
+    result_cache.record_lookup(cache_dir, stats, "Run_1", 2, "k", "miss", 1800.0)
+    assert stats == {"hit": 1, "miss": 1, "hit_seconds": 3600.0, "miss_seconds": 1800.0}
+    assert result_cache.sweep_stats(cache_dir) == {"Run_1": [1, 1, 3600.0, 1800.0]}
+    result_cache.report_stats(stats)
+    assert "1 of 2 cases restored (50%)" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+import pytest
+
+import step_planner
+from sweep_spec import validate_spec, build_cases, step_plan
+
+def test_common_schedule_merges_independent_channel_times():
+    times, (a, b, c) = step_planner.common_schedule([([0.0, 2.0, 4.0], [1.0, 2001.0, 1.0]),
+                                                      ([0.0, 1.0, 4.0], [1.0, 1001.0, 1.0]),
+                                                      ([0.0, 4.0], [1.0, 1.0])])
+    assert times == [0.0, 1.0, 2.0, 4.0]
+    assert a == [1.0, 1001.0, 2001.0, 1.0]
+    assert b == [1.0, 1001.0, 1001.0 - 1000.0 / 3.0, 1.0]
+    assert c == [1.0, 1.0, 1.0, 1.0]
+
+def test_common_schedule_drops_collinear_breakpoints():
+    times, channels = step_planner.common_schedule([([0.0, 1.0, 2.0, 3.0], [1.0, 1001.0, 2001.0, 1.0])] * 3)
+    assert times == [0.0, 2.0, 3.0]
+    assert channels[0] == [1.0, 2001.0, 1.0]
+
+def test_shaped_sweeps_keep_one_step_per_breakpoint():
+    spec = validate_spec({"name": "grid_test", "sweep": {"type": "grid", "levels": [1, 50000]},
+                          "profile": {"shape": [[0, 0], [2, 0.5], [4, 1], [6, 1], [10, 0]]}})
+    case = build_cases(spec)[-1]
+    times, _, plan = step_plan(spec, case)
+    assert times == [0, 4, 6, 10]
+    assert plan == [(4, 100, 20), (6, 100, 20), (10, 100, 20)]
+
+def test_random_walk_sweeps_use_the_planner_of_random_walk_py():
+    spec = validate_spec({"name": "walk_test", "duration": 30.0,
+                          "sweep": {"type": "random_walk", "count": 2, "waypoint_interval": 3.0, "max_slew_rate": 20000.0, "max_asymmetry": 80000.0}})
+    for case in build_cases(spec):
+        times, pressures, plan = step_plan(spec, case)
+        assert plan == step_planner.plan_analysis_steps(times, pressures, spec["fps"])
+        assert plan[-1][0] == 30.0
+
+def test_flat_plan_is_one_step_per_breakpoint():
+    assert step_planner.flat_step_plan([0.0, 3.0, 6.0]) == [(3.0, 100, 20), (6.0, 100, 20)]
+
+def test_similar_slopes_share_a_step_and_turning_points_split():
+    times = [0.0, 3.0, 6.0, 9.0, 12.0]
+    rising = [1.0, 30001.0, 60001.0, 30001.0, 1.0] # Two equal ramps up, two down
+    plan = step_planner.plan_analysis_steps(times, [rising, rising, [1.0] * 5])
+    assert [p[0] for p in plan] == [6.0, 12.0]
+    # 60 kPa of travel per step at 1 kPa per initial substep
+    assert [p[1] for p in plan] == [60, 60]
+
+def test_slope_change_beyond_the_tolerance_splits():
+    times = [0.0, 3.0, 6.0]
+    plan = step_planner.plan_analysis_steps(times, [[1.0, 3001.0, 6001.0 + 3.0 * (step_planner.SLOPE_MERGE_TOLERANCE + 1.0)]] * 3)
+    assert [p[0] for p in plan] == [3.0, 6.0]
+
+@pytest.mark.parametrize("travel, initial", [(0.0, 10), (45000.0, 45), (250000.0, 100)])
+def test_initial_substeps_follow_the_pressure_change_within_bounds(travel, initial):
+    plan = step_planner.plan_analysis_steps([0.0, 1.0], [[1.0, 1.0 + travel]] * 3)
+    assert plan[0][1] == initial
+
+def test_minimum_substeps_keep_the_video_frame_floor():
+    for times in ([0.0, 30.0], [0.0, 0.5, 30.0]):
+        plan = step_planner.plan_analysis_steps(times, [[1.0] * len(times)] * 3)
+        start = 0.0
+        for end, initial, minimum in plan:
+            assert (end - start) * step_planner.FPS / minimum <= step_planner.MAX_FRAMES_PER_SUBSTEP
+            assert initial >= minimum
+            start = end
+    assert step_planner.minimum_substeps(3.0) == 20
+
+def test_slope_change_within_the_tolerance_merges():
+    plan = step_planner.plan_analysis_steps([0.0, 3.0, 6.0], [[1.0, 3001.0, 6001.0 + 3.0 * (step_planner.SLOPE_MERGE_TOLERANCE - 1.0)]] * 3)
+    assert [p[0] for p in plan] == [6.0]
@@ -0,0 +1,70 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import symmetry
+
+def permutations(group):
+    return [symmetry.channel_permutation(rot, mir) for _, rot, mir in symmetry.symmetry_ops(group)]
+
+def test_identity_and_rotations_are_cyclic_shifts():
+    perms = permutations("C3")
+    assert perms[0] == [0, 1, 2]
+    assert sorted(perms) == [[0, 1, 2], [1, 2, 0], [2, 0, 1]]
+    # Counter-clockwise numbering: a +120 degree turn carries bellow 1 onto bellow 2
+    assert perms[1] == [1, 2, 0]
+
+def test_mirrors_complete_the_full_permutation_group():
+    perms = permutations("C3v")
+    assert sorted(map(tuple, perms)) == sorted(itertools.permutations(range(3)))
+    # The first mirror is across bellow 1's radial line, so bellow 1 stays put
+    assert perms[3] == [0, 2, 1]
+
+def test_clockwise_numbering_reverses_the_rotation(monkeypatch):
+    monkeypatch.setattr(symmetry, "CHANNEL_DIRECTION", -1)
+    assert symmetry.channel_permutation(120.0, False) == [2, 0, 1]
+
+@pytest.mark.parametrize("group, classes", [("C3", 76), ("C3v", 56)])
+def test_grid_class_counts(group, classes):
+    levels = [1, 20000, 40000, 60000, 80000, 100000]
+    grid = list(itertools.product(levels, repeat=3))
+    found = symmetry.equivalence_classes(grid, group)
+    assert len(found) == classes
+    assert sum(len(members) for members in found.values()) == len(grid)
+    for rep, members in found.items():
+        assert all(symmetry.representative(m, group) == rep for m in members)
+
+def test_transform_case_moves_each_pressure_to_its_bellow():
+    assert symmetry.transform_case((10, 20, 30), [1, 2, 0]) == (30, 10, 20)
+
+def three_fold_mesh():
+    """Nodes on the three bellow axes and between them, along z, so C3v maps the mesh onto itself."""
+    angles = np.radians(symmetry.BELLOW_1_ANGLE + np.arange(0.0, 360.0, 60.0))
+    ring = [(r * np.cos(a), r * np.sin(a), z) for z in (0.0, 0.05, 0.1, 0.15) for r in (0.005, 0.01) for a in angles]
+    coords = np.array([(0.0, 0.0, z) for z in (0.0, 0.05, 0.1, 0.15)] + ring)
+    return np.arange(1, len(coords) + 1), coords
+
+def test_node_maps_are_bijective_on_a_symmetric_mesh():
+    node_ids, coords = three_fold_mesh()
+    maps, _ = symmetry.build_node_maps(node_ids, coords, "C3v")
+    assert all(m["valid"] for m in maps.values())
+    assert list(maps["rot0"]["index"]) == list(range(len(coords)))
+
+def test_node_maps_flag_an_asymmetric_mesh():
+    node_ids, coords = three_fold_mesh()
+    coords[-1, 0] += 0.004
+    maps, _ = symmetry.build_node_maps(node_ids, coords, "C3")
+    assert maps["rot0"]["valid"]
+    assert not maps["rot120"]["valid"]
+
+def test_synthesized_rotation_moves_and_turns_the_displacements():
+    node_ids, coords = three_fold_mesh()
+    maps, _ = symmetry.build_node_maps(node_ids, coords, "C3")
+    values = np.zeros((1, len(coords), 4))
+    values[0, :, :3] = coords * 0.1 # Radial bulge along z
+    values[0, :, 3] = np.arange(len(coords))
+    out = symmetry.synthesize_values(values, coords, maps["rot120"]["index"], 120.0, False)
+    # A rotationally symmetric field is its own image
+    np.testing.assert_allclose(out[0, :, :3], values[0, :, :3], atol=1e-12)
+    assert sorted(out[0, :, 3]) == sorted(values[0, :, 3])
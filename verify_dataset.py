@@ -0,0 +1,238 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from case_commit import avi_frame_count, file_sha1, CASE_MARKER, STAGING_SUFFIX, REPLACED_SUFFIX
+
+# ==========================================
+# --- CONFIGURATION (DATASET VERIFICATION) ---
+# ==========================================
+CHUNK_ROWS = 1000000      # NodeData rows parsed at a time; memory per worker stays at one chunk plus per-node counters
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+FPS = 30
+EXPECTED_VIEWS = ["Side1", "Side2", "Side3", "Top"]
+REPORT_FILE = "dataset_verification.json"
+
+# A case fails a check above these rates
+MAX_NAN_RATE = 0.0               # Rows with a NaN or unparsable value
+MAX_PLACEHOLDER_ZERO_RATE = 0.0  # Rows with DefX = DefY = DefZ = 0 for a node that moves in other frames
+
+NODE_COLUMNS = ["Time(s)", "NodeID", "DefX(m)", "DefY(m)", "DefZ(m)", "Strain"]
+
+# ==========================================
+# --- PER-FILE CHECKS ---
+# ==========================================
+def scan_node_data(csv_path, chunk_rows=CHUNK_ROWS):
+    """Streams a NodeData/SubstepData CSV: rows per frame, last frame time, NaN rows and placeholder zeros.
+
+    Frames are runs of equal time values, so a frame split across two chunks is stitched back together.
+    Placeholder zeros (a node missing from one PlotData is written as 0, 0, 0) are told apart from fixed
+    nodes by needing the same node to move in some other frame.
+    """
+    frame_counts, last_t = [], None
+    rows = nan_rows = 0
+    zero_counts = np.zeros(0, dtype=np.int64)
+    moved = np.zeros(0, dtype=bool)
+    reader = pd.read_csv(csv_path, skipinitialspace=True, usecols=lambda c: c.strip() in NODE_COLUMNS,
+                         chunksize=chunk_rows, engine="c")
+    for chunk in reader:
+        chunk.columns = [c.strip() for c in chunk.columns]
+        values = chunk[NODE_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        bad = np.isnan(values).any(axis=1)
+        nan_rows += int(bad.sum())
+        rows += len(values)
+        values = values[~bad]
+        if not len(values): continue
+
+        t = values[:, 0]
+        new_frame = np.empty(len(t), dtype=bool)
+        new_frame[0] = last_t is None or t[0] != last_t
+        new_frame[1:] = t[1:] != t[:-1]
+        counts = np.bincount(np.cumsum(new_frame) - int(new_frame[0]))
+        if not new_frame[0]: # First rows finish the previous chunk's last frame
+            frame_counts[-1] += int(counts[0])
+            counts = counts[1:]
+        frame_counts.extend(int(c) for c in counts)
+        last_t = t[-1]
+
+        ids = values[:, 1].astype(np.int64)
+        if ids.max() >= len(moved):
+            grow = int(ids.max()) + 1 - len(moved)
+            zero_counts = np.concatenate([zero_counts, np.zeros(grow, dtype=np.int64)])
+            moved = np.concatenate([moved, np.zeros(grow, dtype=bool)])
+        zero = (values[:, 2] == 0) & (values[:, 3] == 0) & (values[:, 4] == 0)
+        np.add.at(zero_counts, ids[zero], 1)
+        moved[ids[~zero]] = True
+
+    nodes_seen = int(((zero_counts > 0) | moved).sum())
+    return {"rows": rows, "frames": len(frame_counts), "min_nodes_per_frame": min(frame_counts) if frame_counts else 0,
+            "max_nodes_per_frame": max(frame_counts) if frame_counts else 0, "nodes": nodes_seen,
+            "last_time": float(last_t) if last_t is not None else None, "nan_rows": nan_rows,
+            "placeholder_zero_rows": int(zero_counts[moved].sum()), "fixed_nodes": int(((zero_counts > 0) & ~moved).sum())}
+
+def profile_rows(csv_path):
+    """Data rows and the last time of a PressureProfile CSV."""
+    rows, last = 0, None
+    with open(csv_path, "r") as f:
+        f.readline()
+        for line in f:
+            if not line.strip(): continue
+            rows += 1
+            last = line.split(",")[0]
+    try: last = float(last)
+    except (TypeError, ValueError): last = None
+    return rows, last
+
+def count_lines(csv_path):
+    with open(csv_path, "r") as f:
+        return sum(1 for line in f if line.strip()) - 1
+
+# ==========================================
+# --- PER-CASE CHECKS ---
+# ==========================================
+def verify_case(folder, views=EXPECTED_VIEWS, fps=FPS, chunk_rows=CHUNK_ROWS, checksums=False):
+    """All checks for one case folder; returns a JSON-able record with a list of problems."""
+    record = {"folder": os.path.abspath(folder), "problems": []}
+    problems = record["problems"]
+    if folder.rstrip("\\/").endswith(STAGING_SUFFIX):
+        problems.append("staging folder that never committed")
+    if folder.rstrip("\\/").endswith(REPLACED_SUFFIX):
+        problems.append("older attempt left behind by a crash during its replacement")
+
+    node_files = glob.glob(os.path.join(folder, "*_NodeData.csv")) or glob.glob(os.path.join(folder, "*_SubstepData.csv"))
+    if not node_files:
+        problems.append("no NodeData")
+        return record
+    node_file = node_files[0]
+    substeps = node_file.endswith("_SubstepData.csv")
+    base_name = os.path.basename(node_file).rsplit("_", 1)[0]
+    record["base_name"] = base_name
+
+    # Expected frame count: the case duration at the video frame rate (the longer file wins, so a cut-short one shows up)
+    duration = None
+    profile = os.path.join(folder, base_name + "_PressureProfile.csv")
+    if os.path.exists(profile):
+        rows, duration = profile_rows(profile)
+        record["profile_rows"] = rows
+    else:
+        problems.append("no PressureProfile")
+
+    scan = scan_node_data(node_file, chunk_rows)
+    record.update(scan)
+    duration = max(t for t in [duration, scan["last_time"], 0.0] if t is not None)
+    expected = int(round(duration * fps)) if duration else None
+    record["expected_frames"] = expected
+
+    if expected is not None and "profile_rows" in record and record["profile_rows"] != expected + 1:
+        problems.append("PressureProfile has {} rows, expected {}".format(record["profile_rows"], expected + 1))
+    frame_times = os.path.join(folder, base_name + "_FrameTimes.csv")
+    node_expected = count_lines(frame_times) if os.path.exists(frame_times) else expected # Adaptive exports
+    if not substeps and node_expected is not None and scan["frames"] != node_expected:
+        problems.append("NodeData has {} frames, expected {}".format(scan["frames"], node_expected))
+    if scan["min_nodes_per_frame"] != scan["max_nodes_per_frame"]:
+        problems.append("nodes per frame vary from {} to {}".format(scan["min_nodes_per_frame"], scan["max_nodes_per_frame"]))
+    if scan["rows"] and scan["nan_rows"] / float(scan["rows"]) > MAX_NAN_RATE:
+        problems.append("{} NaN rows ({:.3%})".format(scan["nan_rows"], scan["nan_rows"] / float(scan["rows"])))
+    if scan["rows"] and scan["placeholder_zero_rows"] / float(scan["rows"]) > MAX_PLACEHOLDER_ZERO_RATE:
+        problems.append("{} placeholder-zero rows ({:.3%})".format(scan["placeholder_zero_rows"], scan["placeholder_zero_rows"] / float(scan["rows"])))
+
+    record["videos"] = {}
+    for path in sorted(glob.glob(os.path.join(folder, base_name + "_View*.avi"))):
+        view = os.path.basename(path)[len(base_name) + len("_View"):-len(".avi")]
+        frames = avi_frame_count(path)
+        record["videos"][view] = frames
+        if frames is None: problems.append("View{} video truncated or unreadable".format(view))
+        elif expected is not None and frames != expected: problems.append("View{} video has {} frames, expected {}".format(view, frames, expected))
+    for view in views:
+        if view not in record["videos"]: problems.append("no View{} video".format(view))
+
+    marker = os.path.join(folder, CASE_MARKER)
+    record["committed"] = os.path.exists(marker)
+    if checksums and record["committed"]:
+        with open(marker, "r") as f:
+            files = json.load(f)["files"]
+        for name, info in sorted(files.items()):
+            path = os.path.join(folder, name)
+            if not os.path.exists(path) or file_sha1(path) != info["sha1"]:
+                problems.append("{} does not match its commit checksum".format(name))
+    return record
+
+# ==========================================
+# --- DATASET ---
+# ==========================================
+def find_cases(paths):
+    """Case_* folders (committed or staging) under run folders or a dataset root."""
+    folders = []
+    for path in paths:
+        runs = [path] if glob.glob(os.path.join(path, "Case_*")) else sorted(glob.glob(os.path.join(path, "Run_*")))
+        for run in runs:
+            folders.extend(f for f in sorted(glob.glob(os.path.join(run, "Case_*"))) if os.path.isdir(f))
+    return folders
+
+def check_node_coverage(records):
+    """Flags cases with fewer nodes than most cases of their run (nodes dropped by the exporter's node filter)."""
+    runs = {}
+    for record in records:
+        if record.get("nodes"): runs.setdefault(os.path.dirname(record["folder"]), []).append(record)
+    for run_records in runs.values():
+        typical = Counter(r["nodes"] for r in run_records).most_common(1)[0][0]
+        for record in run_records:
+            record["run_typical_nodes"] = typical
+            if record["nodes"] < typical:
+                record["problems"].append("{} nodes, {} fewer than the run's usual {}".format(record["nodes"], typical - record["nodes"], typical))
+
+def verify_dataset(paths, views=EXPECTED_VIEWS, fps=FPS, workers=WORKERS, chunk_rows=CHUNK_ROWS, checksums=False):
+    folders = find_cases(paths)
+    print("Verifying {} case folders with {} workers".format(len(folders), workers))
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = dict((pool.submit(verify_case, folder, views, fps, chunk_rows, checksums), folder) for folder in folders)
+        for future in as_completed(futures):
+            try:
+                records.append(future.result())
+            except Exception as e:
+                records.append({"folder": os.path.abspath(futures[future]), "problems": ["unreadable: {}".format(e)]})
+    records.sort(key=lambda r: r["folder"])
+    check_node_coverage(records)
+    return records
+
+# ==========================================
+# --- EXECUTION ---
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Checks every case of a dataset for frame counts, NaNs, placeholder zeros, node coverage and video length.")
+    parser.add_argument("paths", nargs="+", help="Run_* folders or the dataset root")
+    parser.add_argument("--report", help="JSON report path (default: {} in the first path)".format(REPORT_FILE))
+    parser.add_argument("--views", default=",".join(EXPECTED_VIEWS), help="Comma-separated views every case must have ('' = none)")
+    parser.add_argument("--fps", type=int, default=FPS)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--checksums", action="store_true", help="Also re-hash committed files against their _COMPLETE.json")
+    args = parser.parse_args()
+
+    views = [v for v in args.views.split(",") if v]
+    records = verify_dataset(args.paths, views, args.fps, args.workers, args.chunk_rows, args.checksums)
+    bad = [r for r in records if r["problems"]]
+
+    report = {"paths": [os.path.abspath(p) for p in args.paths], "time": datetime.datetime.now().isoformat(), "fps": args.fps,
+              "views": views, "cases": len(records), "ok": len(records) - len(bad), "with_problems": len(bad),
+              "uncommitted": sum(1 for r in records if not r.get("committed")), "records": records}
+    report_path = args.report or os.path.join(args.paths[0], REPORT_FILE)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=1)
+
+    for r in bad:
+        print("    {}: {}".format(os.path.relpath(r["folder"]), "; ".join(r["problems"])))
+    print("\n{} of {} cases passed; {} with problems, {} without a commit marker. Report: {}".format(
+        report["ok"], len(records), len(bad), report["uncommitted"], report_path))
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())